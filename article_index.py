@@ -0,0 +1,142 @@
+"""
+Index exact des références d'articles pour LegalDocBot
+Associe chaque article normalisé (L.1142-1, R.4127-35, 1240, ...) aux chunks ChromaDB qui le portent
+"""
+
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sparse_index import fold_accents
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Articles codifiés L./R./D. (CSP, CSS, déontologie R.4127-x)
+CODIFIED_REF_PATTERN = re.compile(r"\b([lrd])\s*\.?\s*(\d+(?:-\d+)*)\b")
+# Articles numérotés sans préfixe (Code civil, Code pénal) : 1240, 121-3
+NUMBERED_REF_PATTERN = re.compile(r"^\s*(?:art(?:icle)?s?\.?\s*)?(\d+(?:-\d+)*)\b")
+# Dans un texte libre, un numéro nu n'est une référence que s'il suit "article" / "art."
+CITED_NUMBER_PATTERN = re.compile(r"\bart(?:icle)?s?\.?\s+(\d+(?:-\d+)*)\b")
+
+
+def normalize_article_ref(ref: str) -> Optional[str]:
+    """
+    Normalise une référence d'article
+
+    Exemples : "Article L. 1142-1 du CSP" -> "L.1142-1", "r4127-35" -> "R.4127-35",
+    "art. 1240 du Code civil" -> "1240"
+
+    Args:
+        ref: Référence brute (métadonnée ou citation)
+
+    Returns:
+        Identifiant normalisé, ou None si aucune référence n'est reconnue
+    """
+    if not ref:
+        return None
+
+    folded = fold_accents(str(ref))
+    match = CODIFIED_REF_PATTERN.search(folded)
+    if match:
+        return f"{match.group(1).upper()}.{match.group(2)}"
+
+    match = NUMBERED_REF_PATTERN.match(folded)
+    if match:
+        return match.group(1)
+
+    return None
+
+
+def extract_article_refs(text: str) -> List[str]:
+    """
+    Extrait les références d'articles citées dans un texte libre
+
+    Args:
+        text: Situation, analyse ou chunk
+
+    Returns:
+        Références normalisées, sans doublon, dans l'ordre d'apparition
+    """
+    folded = fold_accents(text or "")
+    refs = [f"{letter.upper()}.{number}" for letter, number in CODIFIED_REF_PATTERN.findall(folded)]
+    refs.extend(CITED_NUMBER_PATTERN.findall(CODIFIED_REF_PATTERN.sub(" ", folded)))
+    return list(dict.fromkeys(refs))
+
+
+class ArticleIndex:
+    """
+    Index en mémoire : article normalisé -> chunks ChromaDB (collection, id)
+    """
+
+    def __init__(self):
+        """Initialise un index vide"""
+        self._entries = {}
+        self._raw_values = {}
+        self._lock = threading.Lock()
+
+    def add(self, collection_name: str, chunk_id: str, metadata: Optional[Dict]):
+        """
+        Indexe un chunk d'après sa métadonnée article
+
+        Args:
+            collection_name: Clé de la collection
+            chunk_id: Identifiant ChromaDB du chunk
+            metadata: Métadonnées du chunk
+        """
+        raw_value = (metadata or {}).get('article', '')
+        article_id = normalize_article_ref(raw_value)
+        if not article_id:
+            return
+        with self._lock:
+            self._entries.setdefault(article_id, []).append((collection_name, chunk_id))
+            self._raw_values.setdefault((collection_name, article_id), set()).add(raw_value)
+
+    def lookup(self, ref: str, collection_name: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        Retourne les chunks d'un article
+
+        Args:
+            ref: Référence d'article (brute ou normalisée)
+            collection_name: Restreindre à une collection
+
+        Returns:
+            Liste de tuples (collection, id du chunk)
+        """
+        article_id = normalize_article_ref(ref)
+        if not article_id:
+            return []
+        chunks = self._entries.get(article_id, [])
+        if collection_name is not None:
+            chunks = [chunk for chunk in chunks if chunk[0] == collection_name]
+        return list(chunks)
+
+    def match_prefix(self, prefix: str, collection_name: str) -> List[str]:
+        """
+        Retourne les valeurs brutes de la métadonnée article dont la référence commence par un préfixe
+
+        Sert à traduire un filtre "L.114*" en clause ChromaDB {"article": {"$in": [...]}}.
+
+        Args:
+            prefix: Préfixe de référence ("L.114*", "R.4127", ...)
+            collection_name: Collection concernée
+
+        Returns:
+            Valeurs de métadonnée article, triées
+        """
+        normalized_prefix = normalize_article_ref(prefix.rstrip("*"))
+        if not normalized_prefix:
+            return []
+        values = set()
+        for (name, article_id), raw_values in self._raw_values.items():
+            if name == collection_name and article_id.startswith(normalized_prefix):
+                values.update(raw_values)
+        return sorted(values)
+
+    def __contains__(self, ref: str) -> bool:
+        return normalize_article_ref(ref) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -5,44 +5,140 @@ Système de reranking spécialisé pour les résultats ChromaDB avec cross-encod
 
 import json
 import re
+import threading
+import time
 from typing import List, Dict, Optional, Tuple
 import logging
-from sentence_transformers import CrossEncoder
 import numpy as np
+from config import CHROMADB_COLLECTIONS, RAG_CONFIG
+from model_registry import get_model_registry
+from ranking_features import ChunkFeatureStore, article_bonuses, deontologie_bonuses, type_bonuses, unified_source_bonuses
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pondération du score final unifié (cross-encoder + ChromaDB + bonus de source)
+UNIFIED_CROSS_ENCODER_WEIGHT = 0.7
+UNIFIED_CHROMADB_WEIGHT = 0.2
+UNIFIED_SOURCE_BONUS_WEIGHT = 0.1
+
+class CascadePolicy:
+    """
+    Politique de reranking en cascade : seuls les meilleurs candidats au score bon marché
+    (distance ChromaDB + bonus de source) passent par le cross-encoder
+    """
+    
+    def __init__(self, cascade_config: Optional[Dict] = None):
+        """
+        Initialise la politique avec son budget
+        
+        Args:
+            cascade_config: Paramètres de la cascade (défaut: RAG_CONFIG["reranking"]["cascade"])
+        """
+        cascade_config = cascade_config or RAG_CONFIG["reranking"]["cascade"]
+        self.enabled = cascade_config["enabled"]
+        self.keep = cascade_config["keep"]
+        self.min_candidates = max(cascade_config["min_candidates"], self.keep)
+        self.max_candidates = max(cascade_config["max_candidates"], self.min_candidates)
+        self.latency_budget_ms = cascade_config["latency_budget_ms"]
+        self.step = cascade_config["step"]
+        self.ms_per_pair = None  # Moyenne glissante mesurée sur les appels au cross-encoder
+        self.last_stats = {}
+        self._totals = {'requests': 0, 'candidates': 0, 'scored': 0, 'skipped_budget': 0, 'skipped_cutoff': 0}
+        self._lock = threading.Lock()
+    
+    def candidate_budget(self, n_candidates: int) -> int:
+        """
+        Nombre de candidats envoyés au cross-encoder, adapté au budget de latence
+        
+        Args:
+            n_candidates: Nombre de candidats disponibles
+            
+        Returns:
+            Budget N (entre min_candidates et max_candidates, borné par n_candidates)
+        """
+        if not self.enabled:
+            return n_candidates
+        budget = self.max_candidates
+        if self.ms_per_pair:
+            budget = int(self.latency_budget_ms / self.ms_per_pair)
+        return min(n_candidates, max(self.min_candidates, min(self.max_candidates, budget)))
+    
+    def record_latency(self, n_pairs: int, elapsed: float):
+        """
+        Met à jour la latence moyenne par paire (moyenne glissante exponentielle)
+        
+        Args:
+            n_pairs: Paires réellement passées par le modèle (hors cache de scores)
+            elapsed: Durée de la prédiction en secondes
+        """
+        if n_pairs <= 0:
+            return
+        ms_per_pair = elapsed * 1000 / n_pairs
+        with self._lock:
+            self.ms_per_pair = ms_per_pair if self.ms_per_pair is None else 0.7 * self.ms_per_pair + 0.3 * ms_per_pair
+    
+    def record_request(self, stats: Dict):
+        """Enregistre les statistiques d'une requête rerankée"""
+        with self._lock:
+            self.last_stats = stats
+            self._totals['requests'] += 1
+            for key in ('candidates', 'scored', 'skipped_budget', 'skipped_cutoff'):
+                self._totals[key] += stats[key]
+    
+    def get_stats(self) -> Dict:
+        """
+        Retourne les paramètres de budget et les statistiques cumulées de la cascade
+        
+        Returns:
+            Dictionnaire avec budget, latence par paire, totaux et dernière requête
+        """
+        with self._lock:
+            totals = dict(self._totals)
+            return {
+                'enabled': self.enabled,
+                'keep': self.keep,
+                'min_candidates': self.min_candidates,
+                'max_candidates': self.max_candidates,
+                'latency_budget_ms': self.latency_budget_ms,
+                'ms_per_pair': round(self.ms_per_pair, 3) if self.ms_per_pair else None,
+                **totals,
+                'scored_ratio': round(totals['scored'] / totals['candidates'], 3) if totals['candidates'] else 0.0,
+                'last_request': dict(self.last_stats)
+            }
+
 class ChromaDBReranker:
     """
     Système de reranking avec cross-encoder spécialisé pour les résultats ChromaDB
     """
     
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None):
         """
-        Initialise le cross-encoder pour ChromaDB
+        Initialise le reranker sur le cross-encoder partagé du registre des modèles
         
         Args:
-            model_name: Nom du modèle cross-encoder à utiliser
+            model_name: Nom du modèle cross-encoder à utiliser (défaut: RAG_CONFIG)
+            batch_size: Taille des mini-batches de scoring (défaut: RAG_CONFIG)
         """
-        try:
-            # Correction de l'erreur PyTorch
-            import torch
-            self.model = CrossEncoder(model_name)
-            
-            # Utiliser to_empty() au lieu de to() pour éviter l'erreur meta tensor
-            if torch.cuda.is_available():
-                self.model.model = self.model.model.to_empty(device='cuda')
-            else:
-                self.model.model = self.model.model.to_empty(device='cpu')
-                
-            logger.info(f"✅ Cross-encoder ChromaDB chargé: {model_name}")
-            self.is_available = True
-        except Exception as e:
-            logger.error(f"❌ Erreur chargement cross-encoder ChromaDB: {e}")
-            self.is_available = False
-            self.model = None
+        self.batch_size = batch_size or RAG_CONFIG["reranking"]["batch_size"]
+        self.scorer = get_model_registry().get_cross_encoder(model_name)
+        self.cascade = CascadePolicy()
+        
+        # Caractéristiques de classement précalculées (métadonnées ou table annexe)
+        self.features = ChunkFeatureStore(collection_names=CHROMADB_COLLECTIONS)
+        if self.scorer.is_available:
+            logger.info(f"✅ Cross-encoder ChromaDB prêt: {self.scorer.model_name}")
+    
+    @property
+    def is_available(self) -> bool:
+        """Le cross-encoder partagé est chargé"""
+        return self.scorer.is_available
+    
+    @property
+    def model(self):
+        """Modèle CrossEncoder partagé (None s'il n'a pas pu être chargé)"""
+        return self.scorer.model
     
     def calculate_relevance_score(self, query: str, document: str) -> float:
         """
@@ -55,25 +151,50 @@ class ChromaDBReranker:
         Returns:
             Score de pertinence (0-1)
         """
-        if not self.is_available or not self.model:
-            return 0.5  # Score par défaut
+        return self.score_pairs([(query, document)])[0]
+    
+    def calculate_relevance_scores(self, query: str, documents: List[str]) -> List[float]:
+        """
+        Calcule les scores de pertinence d'une requête contre plusieurs documents
+        en un seul appel au cross-encoder
         
-        try:
-            # Préparation des paires query-document
-            pairs = [[query, document]]
-            
-            # Calcul des scores
-            scores = self.model.predict(pairs)
+        Args:
+            query: Requête utilisateur
+            documents: Documents à évaluer
             
-            # Normalisation (les scores peuvent être négatifs)
-            score = float(scores[0])
-            normalized_score = max(0.0, min(1.0, (score + 1) / 2))  # Normalisation 0-1
+        Returns:
+            Scores de pertinence (0-1), dans l'ordre des documents
+        """
+        return self.score_pairs([(query, document) for document in documents])
+    
+    def score_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """
+        Score un lot de paires (requête, document) avec le cross-encoder partagé
+        
+        Args:
+            pairs: Liste de paires (requête, document)
             
-            return normalized_score
+        Returns:
+            Scores de pertinence (0-1), dans l'ordre des paires
+        """
+        return self.scorer.score_pairs(pairs, batch_size=self.batch_size)
+    
+    def _score_cascade_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """
+        Score un lot de paires de la cascade et mesure la latence du modèle
+        
+        Seules les paires réellement prédites (absentes du cache de scores) alimentent
+        la latence par paire : un lot servi entièrement par le cache n'est pas mesuré.
+        
+        Args:
+            pairs: Liste de paires (requête, document)
             
-        except Exception as e:
-            logger.error(f"❌ Erreur calcul score ChromaDB: {e}")
-            return 0.5
+        Returns:
+            Scores de pertinence (0-1), dans l'ordre des paires
+        """
+        scores, predicted, elapsed = self.scorer.score_pairs_with_stats(pairs, batch_size=self.batch_size)
+        self.cascade.record_latency(predicted, elapsed)
+        return scores
     
     def rerank_chromadb_results(self, results: List[Dict], query: str) -> List[Dict]:
         """
@@ -91,24 +212,21 @@ class ChromaDBReranker:
         
         logger.info(f"🔍 Reranking {len(results)} résultats ChromaDB avec cross-encoder...")
         
-        # Calcul des scores pour chaque résultat
+        # Calcul des scores cross-encoder en un seul batch
+        document_texts = [f"{result.get('content', '')}" for result in results]
+        cross_encoder_scores = self.calculate_relevance_scores(query, document_texts)
+        
+        # Bonus selon le type de document et l'article (calcul vectoriel)
+        features = self.features.features_for(results)
+        type_bonus_values = type_bonuses(features).tolist()
+        article_bonus_values = article_bonuses(features, query).tolist()
+        
         scored_results = []
-        for result in results:
-            # Création du texte du document
-            document_text = f"{result.get('content', '')}"
-            
-            # Calcul du score de pertinence cross-encoder
-            cross_encoder_score = self.calculate_relevance_score(query, document_text)
-            
+        for result, cross_encoder_score, type_bonus, article_bonus in zip(
+                results, cross_encoder_scores, type_bonus_values, article_bonus_values):
             # Score ChromaDB original (distance inverse)
             chromadb_score = result.get('relevance_score', 0.5)
             
-            # Score bonus selon le type de document
-            type_bonus = self._calculate_type_bonus(result.get('collection', ''), result.get('doc_type', ''))
-            
-            # Score bonus selon l'article
-            article_bonus = self._calculate_article_bonus(result.get('article', ''), query)
-            
             # Score final pondéré (70% cross-encoder + 20% ChromaDB + 10% bonus)
             final_score = (cross_encoder_score * 0.7) + (chromadb_score * 0.2) + (type_bonus + article_bonus) * 0.1
             
@@ -132,6 +250,11 @@ class ChromaDBReranker:
         Rerank UNIFIÉ pour TOUS les résultats de TOUTES les sources juridiques
         Sélectionne les MEILLEURS articles de CSP, déontologie, CSS, civil, pénal
         
+        Reranking en cascade : les candidats sont classés par score bon marché
+        (ChromaDB + bonus de source), seuls les N premiers (budget de latence) sont
+        scorés par paquets, et le scoring s'arrête dès qu'aucun candidat restant
+        ne peut plus dépasser le 10e score final.
+        
         Args:
             results: Liste des résultats de toutes les sources
             query: Requête originale
@@ -142,25 +265,145 @@ class ChromaDBReranker:
         if not results:
             return []
         
-        logger.info(f"🔍 Reranking UNIFIÉ {len(results)} résultats de toutes les sources avec cross-encoder...")
+        start = time.perf_counter()
+        keep = self.cascade.keep
+        source_bonuses, cheap_scores = self._cheap_unified_scores(results, query)
+        order = sorted(range(len(results)), key=lambda index: cheap_scores[index], reverse=True)
+        budget = self.cascade.candidate_budget(len(results))
+        
+        logger.info(f"🔍 Reranking UNIFIÉ {len(results)} résultats de toutes les sources avec cross-encoder "
+                    f"(budget: {budget} candidats)...")
+        
+        scored_indices = []
+        cross_encoder_scores = []
+        final_scores = []
+        step = self.cascade.step if self.cascade.enabled else budget
+        position = 0
+        while position < budget:
+            # Coupure anticipée : même avec un score cross-encoder de 1, le candidat suivant
+            # (et donc tous les suivants) ne dépasserait pas le k-ième score final
+            if len(final_scores) >= keep:
+                kth_score = sorted(final_scores, reverse=True)[keep - 1]
+                if UNIFIED_CROSS_ENCODER_WEIGHT + cheap_scores[order[position]] <= kth_score:
+                    break
+            
+            chunk = order[position:min(position + step, budget)]
+            chunk_scores = self._score_cascade_pairs([(query, f"{results[index].get('content', '')}") for index in chunk])
+            
+            scored_indices.extend(chunk)
+            cross_encoder_scores.extend(chunk_scores)
+            final_scores.extend(
+                UNIFIED_CROSS_ENCODER_WEIGHT * score + cheap_scores[index] for index, score in zip(chunk, chunk_scores)
+            )
+            position += len(chunk)
+        
+        scored_results = self._score_unified_results(
+            [results[index] for index in scored_indices], query, cross_encoder_scores,
+            [source_bonuses[index] for index in scored_indices]
+        )
+        
+        stats = {
+            'candidates': len(results),
+            'budget': budget,
+            'scored': len(scored_indices),
+            'skipped_budget': len(results) - budget,
+            'skipped_cutoff': budget - len(scored_indices),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+        self.cascade.record_request(stats)
         
-        # Calcul des scores pour chaque résultat
-        scored_results = []
-        for result in results:
-            # Création du texte du document
-            document_text = f"{result.get('content', '')}"
+        logger.info(f"✅ Reranking UNIFIÉ terminé - {len(scored_results[:keep])} meilleurs résultats de toutes les sources "
+                    f"sélectionnés ({stats['scored']} paires scorées, {stats['skipped_budget']} hors budget, "
+                    f"{stats['skipped_cutoff']} coupées)")
+        return scored_results[:keep]  # Retourner les meilleurs de toutes les sources
+    
+    def rerank_unified_batch(self, results_per_query: List[List[Dict]], queries: List[str]) -> List[List[Dict]]:
+        """
+        Rerank UNIFIÉ de plusieurs requêtes avec un seul appel au cross-encoder
+        
+        Le budget de la cascade s'applique à chaque requête (pas de coupure anticipée :
+        toutes les paires retenues partent dans le même batch).
+        
+        Args:
+            results_per_query: Résultats de toutes les sources, une liste par requête
+            queries: Requêtes originales, dans le même ordre
             
-            # Calcul du score de pertinence cross-encoder
-            cross_encoder_score = self.calculate_relevance_score(query, document_text)
+        Returns:
+            Les MEILLEURS résultats de chaque requête
+        """
+        candidates_per_query = []
+        for query, results in zip(queries, results_per_query):
+            source_bonuses, cheap_scores = self._cheap_unified_scores(results, query)
+            order = sorted(range(len(results)), key=lambda index: cheap_scores[index], reverse=True)
+            selected = order[:self.cascade.candidate_budget(len(results))]
+            candidates_per_query.append(([results[index] for index in selected], [source_bonuses[index] for index in selected]))
+        
+        pairs = [
+            (query, f"{result.get('content', '')}")
+            for query, (results, _) in zip(queries, candidates_per_query)
+            for result in results
+        ]
+        
+        logger.info(f"🔍 Reranking UNIFIÉ batch: {len(queries)} requêtes, {len(pairs)} paires...")
+        all_scores = self._score_cascade_pairs(pairs)
+        
+        reranked = []
+        offset = 0
+        for query, all_results, (results, source_bonuses) in zip(queries, results_per_query, candidates_per_query):
+            cross_encoder_scores = all_scores[offset:offset + len(results)]
+            offset += len(results)
+            self.cascade.record_request({
+                'candidates': len(all_results),
+                'budget': len(results),
+                'scored': len(results),
+                'skipped_budget': len(all_results) - len(results),
+                'skipped_cutoff': 0
+            })
+            reranked.append(self._score_unified_results(results, query, cross_encoder_scores, source_bonuses)[:self.cascade.keep])
+        
+        return reranked
+    
+    def _cheap_unified_scores(self, results: List[Dict], query: str) -> Tuple[List[float], List[float]]:
+        """
+        Calcule la partie du score final qui ne dépend pas du cross-encoder
+        
+        Args:
+            results: Résultats de toutes les sources
+            query: Requête originale
+            
+        Returns:
+            Bonus de source et score bon marché (ChromaDB + bonus pondérés), dans l'ordre des résultats
+        """
+        source_bonuses = unified_source_bonuses(self.features.features_for(results), query)
+        chromadb_scores = np.array([result.get('relevance_score', 0.5) for result in results], dtype=float)
+        cheap_scores = chromadb_scores * UNIFIED_CHROMADB_WEIGHT + source_bonuses * UNIFIED_SOURCE_BONUS_WEIGHT
+        return source_bonuses.tolist(), cheap_scores.tolist()
+    
+    def _score_unified_results(self, results: List[Dict], query: str, cross_encoder_scores: List[float],
+                               source_bonuses: Optional[List[float]] = None) -> List[Dict]:
+        """
+        Combine scores cross-encoder, ChromaDB et bonus de source, puis trie
+        
+        Args:
+            results: Résultats de toutes les sources
+            query: Requête originale
+            cross_encoder_scores: Scores cross-encoder, dans l'ordre des résultats
+            source_bonuses: Bonus de source déjà calculés (sinon calculés ici)
             
+        Returns:
+            Résultats enrichis des scores, par score final décroissant
+        """
+        if source_bonuses is None:
+            source_bonuses = self._cheap_unified_scores(results, query)[0]
+        
+        scored_results = []
+        for result, cross_encoder_score, source_bonus in zip(results, cross_encoder_scores, source_bonuses):
             # Score ChromaDB original
             chromadb_score = result.get('relevance_score', 0.5)
             
-            # Bonus selon le type de source
-            source_bonus = self._calculate_unified_source_bonus(result.get('collection', ''), result.get('article', ''), query)
-            
             # Score final pondéré (70% cross-encoder + 20% ChromaDB + 10% bonus source)
-            final_score = (cross_encoder_score * 0.7) + (chromadb_score * 0.2) + (source_bonus * 0.1)
+            final_score = (cross_encoder_score * UNIFIED_CROSS_ENCODER_WEIGHT) + (chromadb_score * UNIFIED_CHROMADB_WEIGHT) \
+                + (source_bonus * UNIFIED_SOURCE_BONUS_WEIGHT)
             
             scored_results.append({
                 **result,
@@ -172,9 +415,7 @@ class ChromaDBReranker:
         
         # Tri par score final décroissant
         scored_results.sort(key=lambda x: x['final_score'], reverse=True)
-        
-        logger.info(f"✅ Reranking UNIFIÉ terminé - {len(scored_results[:10])} meilleurs résultats de toutes les sources sélectionnés")
-        return scored_results[:10]  # Retourner les 10 meilleurs de toutes les sources
+        return scored_results
     
     def rerank_deontologie_results(self, results: List[Dict], query: str) -> List[Dict]:
         """
@@ -192,21 +433,18 @@ class ChromaDBReranker:
         
         logger.info(f"🔍 Reranking {len(results)} résultats déontologie avec cross-encoder...")
         
-        # Calcul des scores pour chaque résultat
+        # Calcul des scores cross-encoder en un seul batch
+        document_texts = [f"{result.get('content', '')}" for result in results]
+        cross_encoder_scores = self.calculate_relevance_scores(query, document_texts)
+        
+        # Bonus spécial pour la déontologie (calcul vectoriel)
+        deontologie_bonus_values = deontologie_bonuses(self.features.features_for(results), query).tolist()
+        
         scored_results = []
-        for result in results:
-            # Création du texte du document
-            document_text = f"{result.get('content', '')}"
-            
-            # Calcul du score de pertinence cross-encoder
-            cross_encoder_score = self.calculate_relevance_score(query, document_text)
-            
+        for result, cross_encoder_score, deontologie_bonus in zip(results, cross_encoder_scores, deontologie_bonus_values):
             # Score ChromaDB original
             chromadb_score = result.get('relevance_score', 0.5)
             
-            # Bonus spécial pour la déontologie
-            deontologie_bonus = self._calculate_deontologie_bonus(result.get('article', ''), query)
-            
             # Score final pondéré (60% cross-encoder + 20% ChromaDB + 20% bonus déontologie)
             final_score = (cross_encoder_score * 0.6) + (chromadb_score * 0.2) + (deontologie_bonus * 0.2)
             
@@ -223,180 +461,6 @@ class ChromaDBReranker:
         
         logger.info(f"✅ Reranking déontologie terminé - {len(scored_results[:3])} meilleurs résultats sélectionnés")
         return scored_results[:3]
-    
-    def _calculate_type_bonus(self, collection: str, doc_type: str) -> float:
-        """
-        Calcule un bonus selon le type de document
-        
-        Args:
-            collection: Collection ChromaDB
-            doc_type: Type de document
-            
-        Returns:
-            Bonus de score (0-0.3)
-        """
-        collection_lower = collection.lower()
-        doc_type_lower = doc_type.lower()
-        
-        # Bonus pour la déontologie (priorité haute)
-        if 'deontologie' in collection_lower or 'deontologie' in doc_type_lower:
-            return 0.3
-        
-        # Bonus pour le CSP (priorité moyenne)
-        elif 'csp' in collection_lower or 'santé' in doc_type_lower:
-            return 0.2
-        
-        # Bonus pour le code civil (priorité moyenne)
-        elif 'civil' in collection_lower:
-            return 0.15
-        
-        # Bonus pour le code pénal (priorité moyenne)
-        elif 'penal' in collection_lower:
-            return 0.15
-        
-        # Bonus pour le CSS (priorité basse)
-        elif 'css' in collection_lower:
-            return 0.1
-        
-        return 0.0
-    
-    def _calculate_article_bonus(self, article: str, query: str) -> float:
-        """
-        Calcule un bonus selon la pertinence de l'article
-        
-        Args:
-            article: Numéro d'article
-            query: Requête utilisateur
-            
-        Returns:
-            Bonus de score (0-0.2)
-        """
-        if not article:
-            return 0.0
-        
-        query_lower = query.lower()
-        article_lower = article.lower()
-        
-        # Articles déontologie importants
-        deontologie_keywords = ['secret', 'consentement', 'information', 'responsabilité', 'confidentialité']
-        if any(keyword in query_lower for keyword in deontologie_keywords):
-            if 'r.4127' in article_lower:
-                return 0.2
-        
-        # Articles CSP importants
-        csp_keywords = ['responsabilité', 'faute', 'accident', 'erreur', 'maladie']
-        if any(keyword in query_lower for keyword in csp_keywords):
-            if 'l.1142' in article_lower or 'l.1143' in article_lower:
-                return 0.2
-        
-        return 0.0
-    
-    def _calculate_deontologie_bonus(self, article: str, query: str) -> float:
-        """
-        Calcule un bonus spécial pour les articles de déontologie
-        
-        Args:
-            article: Numéro d'article
-            query: Requête utilisateur
-            
-        Returns:
-            Bonus de score (0-0.4)
-        """
-        if not article:
-            return 0.0
-        
-        query_lower = query.lower()
-        article_lower = article_lower = article.lower()
-        
-        # Mapping des articles déontologie par thème
-        deontologie_mapping = {
-            'secret': ['r.4127-4', 'r.4127-72', 'r.4127-104'],
-            'consentement': ['r.4127-36', 'r.4127-37', 'r.4127-38'],
-            'information': ['r.4127-35', 'r.4127-47', 'r.4127-48'],
-            'responsabilité': ['r.4127-95', 'r.4127-96', 'r.4127-97'],
-            'confidentialité': ['r.4127-4', 'r.4127-72', 'r.4127-104'],
-            'éthique': ['r.4127-1', 'r.4127-2', 'r.4127-3']
-        }
-        
-        # Vérifier la correspondance
-        for theme, articles in deontologie_mapping.items():
-            if theme in query_lower:
-                if any(art in article_lower for art in articles):
-                    return 0.4
-        
-        # Bonus général pour les articles R.4127
-        if 'r.4127' in article_lower:
-            return 0.2
-        
-        return 0.0
-    
-    def _calculate_unified_source_bonus(self, collection: str, article: str, query: str) -> float:
-        """
-        Calcule un bonus unifié pour toutes les sources juridiques
-        
-        Args:
-            collection: Collection ChromaDB
-            article: Numéro d'article
-            query: Requête utilisateur
-            
-        Returns:
-            Bonus de score (0-0.4)
-        """
-        if not article:
-            return 0.0
-        
-        query_lower = query.lower()
-        collection_lower = collection.lower()
-        article_lower = article.lower()
-        
-        # Bonus selon le type de collection
-        collection_bonus = 0.0
-        
-        # Déontologie (priorité haute)
-        if 'deontologie' in collection_lower:
-            collection_bonus = 0.4
-            # Bonus spécifique pour articles déontologie
-            deontologie_keywords = ['secret', 'consentement', 'information', 'responsabilité', 'confidentialité', 'éthique']
-            if any(keyword in query_lower for keyword in deontologie_keywords):
-                if 'r.4127' in article_lower:
-                    return 0.4
-        
-        # CSP (priorité haute)
-        elif 'csp' in collection_lower:
-            collection_bonus = 0.3
-            # Bonus spécifique pour articles CSP
-            csp_keywords = ['responsabilité', 'faute', 'accident', 'erreur', 'maladie', 'santé']
-            if any(keyword in query_lower for keyword in csp_keywords):
-                if 'l.1142' in article_lower or 'l.1143' in article_lower:
-                    return 0.4
-        
-        # Code civil (priorité moyenne)
-        elif 'civil' in collection_lower:
-            collection_bonus = 0.25
-            # Bonus spécifique pour articles civil
-            civil_keywords = ['responsabilité', 'dommage', 'faute', 'réparation']
-            if any(keyword in query_lower for keyword in civil_keywords):
-                if '1382' in article_lower or '1383' in article_lower:
-                    return 0.3
-        
-        # Code pénal (priorité moyenne)
-        elif 'penal' in collection_lower:
-            collection_bonus = 0.25
-            # Bonus spécifique pour articles pénal
-            penal_keywords = ['faute', 'délit', 'infraction', 'sanction']
-            if any(keyword in query_lower for keyword in penal_keywords):
-                if '121-1' in article_lower or '121-2' in article_lower:
-                    return 0.3
-        
-        # CSS (priorité basse)
-        elif 'css' in collection_lower:
-            collection_bonus = 0.2
-            # Bonus spécifique pour articles CSS
-            css_keywords = ['sécurité sociale', 'assurance', 'remboursement']
-            if any(keyword in query_lower for keyword in css_keywords):
-                return 0.25
-        
-        return collection_bonus
 
 # Instance globale
 chromadb_reranker = None
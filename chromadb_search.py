@@ -1,11 +1,23 @@
 """
 Système de Recherche ChromaDB pour LegalDocBot
-Utilise la base ChromaDB avec 12,024 chunks pour enrichir l'analyse
+Utilise la base ChromaDB (voir chroma_db/corpus_manifest.json) pour enrichir l'analyse
 """
 
-import chromadb
-from typing import List, Dict, Optional
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterator, List, Dict, Optional, Tuple
 import logging
+from config import CHROMADB_COLLECTIONS, RAG_CONFIG
+from article_index import ArticleIndex, extract_article_refs
+from chunk_neighbours import collect_neighbour_ids, get_neighbour_index_path, load_neighbour_index, merge_overlapping
+from corpus_manifest import get_manifest_path, load_corpus_manifest
+from embedding_cache import QueryEmbeddingCache
+from query_expansion import get_query_expander, segment_situation
+from result_cache import get_search_result_cache
+from sparse_index import SparseIndex, reciprocal_rank_fusion
+from vector_backends import CodeCollectionView, VectorBackend, create_vector_backend, matches_where
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -16,47 +28,239 @@ class ChromaDBSearch:
     Système de recherche ChromaDB pour la base de connaissances juridique
     """
     
+    # Clé interne -> nom de la collection ChromaDB
+    EXPECTED_COLLECTIONS = CHROMADB_COLLECTIONS
+    
+    # Source affichée quand la métadonnée source_file est absente
+    DEFAULT_SOURCES = {
+        'deontologie': 'codedeont.pdf',
+        'csp': 'Code de la santé publique.pdf'
+    }
+    
     def __init__(self):
-        """Initialise la connexion à ChromaDB"""
+        """
+        Prépare le système de recherche
+        
+        La connexion à ChromaDB et l'ouverture des collections sont différées
+        jusqu'à la première utilisation (ou au préchauffage en arrière-plan).
+        """
+        retrieval_config = RAG_CONFIG["retrieval"]
+        self.retrieval_config = retrieval_config
+        self.retrieval_mode = retrieval_config["mode"]
+        self.rrf_k = retrieval_config["rrf_k"]
+        self.parallel_search = retrieval_config["parallel_search"]
+        self.max_workers = retrieval_config["max_workers"]
+        self.collection_timeout = retrieval_config["collection_timeout"]
+        self.two_phase_fetch = retrieval_config["two_phase_fetch"]
+        self.preselect_candidates = retrieval_config["preselect_candidates"]
+        self.snippet_length = retrieval_config["snippet_length"]
+        self.segmentation_min_words = retrieval_config["segmentation_min_words"]
+        self.segment_window_sentences = retrieval_config["segment_window_sentences"]
+        self.segment_max_windows = retrieval_config["segment_max_windows"]
+        self.segment_pooling = retrieval_config["segment_pooling"]
+        self.collection_layout = retrieval_config["collection_layout"]
+        self.merged_collection_name = retrieval_config["merged_collection"]
+        self.merged_oversample = retrieval_config["merged_oversample"]
+        self.merged_collection = None
+        self.neighbour_expansion = retrieval_config["neighbour_expansion"]
+        self.neighbour_window = retrieval_config["neighbour_window"]
+        self.neighbour_expand_top = retrieval_config["neighbour_expand_top"]
+        self.result_cache_enabled = RAG_CONFIG["result_cache"]["enabled"]
+        self._executor = None
+        self.embedding_cache = QueryEmbeddingCache(max_size=retrieval_config["embedding_cache_size"])
+        self._sparse_index = None
+        self._article_index = None
+        self._index_lock = threading.Lock()
+        self._manifest = None
+        self._manifest_mtime = None
+        self._neighbour_index = None
+        self._neighbour_index_mtime = None
+        self._live_stats = None
+        
+        self.backend = None
+        self.client = None
+        self._collections = None
+        self._is_available = False
+        self._load_lock = threading.Lock()
+        self._warm_up_thread = None
+        self._readiness = {
+            'state': 'idle',
+            'collections': {key: 'pending' for key in self.EXPECTED_COLLECTIONS},
+            'embedding_model': 'pending',
+            'warm_up_seconds': None
+        }
+    
+    @property
+    def collections(self) -> Dict:
+        """Collections chargées (ouvertes à la première utilisation)"""
+        self._ensure_loaded()
+        return self._collections
+    
+    @property
+    def is_available(self) -> bool:
+        """True si au moins une collection a pu être ouverte"""
+        self._ensure_loaded()
+        return self._is_available
+    
+    def _ensure_loaded(self):
+        """Ouvre le backend et les collections attendues, une seule fois"""
+        if self._collections is not None:
+            return
+        with self._load_lock:
+            if self._collections is None:
+                self._load_collections()
+    
+    def _load_collections(self):
+        """Initialise la connexion à ChromaDB et charge les collections attendues"""
+        collections = {}
         try:
-            self.client = chromadb.PersistentClient(path='chroma_db')
+            self.backend = self._create_backend(self.retrieval_config)
+            self.client = getattr(self.backend, 'client', None)
             
             # Vérifier si les collections existent
-            available_collections = [c.name for c in self.client.list_collections()]
+            available_collections = self.backend.list_collections()
             logger.info(f"📚 Collections disponibles: {available_collections}")
             
-            # Essayer de charger les collections attendues
-            self.collections = {}
-            expected_collections = {
-                'deontologie': 'deontologie',
-                'csp': 'csp_legislation',
-                'css': 'css_legislation', 
-                'penal': 'penal_legislation',
-                'civil': 'civil_legislation'
-            }
+            if self.collection_layout == 'merged':
+                if self.merged_collection_name in available_collections:
+                    self.merged_collection = self.backend.get_collection(self.merged_collection_name)
+                    # Une vue filtrée par famille de codes pour chaque clé attendue
+                    for key in self.EXPECTED_COLLECTIONS:
+                        collections[key] = CodeCollectionView(self.merged_collection, key)
+                        self._readiness['collections'][key] = 'loaded'
+                    logger.info(f"✅ Collection fusionnée {self.merged_collection_name} chargée")
+                else:
+                    logger.warning(f"⚠️ Collection fusionnée {self.merged_collection_name} manquante, "
+                                   "utilisation des collections séparées")
             
-            for key, collection_name in expected_collections.items():
+            # Essayer de charger les collections attendues
+            for key, collection_name in self.EXPECTED_COLLECTIONS.items():
+                if self.merged_collection is not None:
+                    break
                 if collection_name in available_collections:
                     try:
-                        self.collections[key] = self.client.get_collection(collection_name)
+                        collections[key] = self.backend.get_collection(collection_name)
+                        self._readiness['collections'][key] = 'loaded'
                         logger.info(f"✅ Collection {collection_name} chargée")
                     except Exception as e:
+                        self._readiness['collections'][key] = 'error'
                         logger.warning(f"⚠️ Erreur chargement {collection_name}: {e}")
                 else:
+                    self._readiness['collections'][key] = 'missing'
                     logger.warning(f"⚠️ Collection {collection_name} manquante")
             
-            if self.collections:
+            if collections:
                 logger.info("✅ ChromaDB connecté avec succès")
-                self.is_available = True
+                self._is_available = True
             else:
                 logger.warning("⚠️ Aucune collection ChromaDB disponible")
-                self.is_available = False
+                self._is_available = False
                 
         except Exception as e:
             logger.error(f"❌ Erreur connexion ChromaDB: {e}")
-            self.is_available = False
+            self._is_available = False
+        
+        self._collections = collections
+    
+    def start_warm_up(self, build_indexes: bool = False) -> bool:
+        """
+        Précharge en arrière-plan les collections, le modèle d'embedding et les
+        segments HNSW, pour que la première recherche ne paie pas le démarrage à froid
+        
+        Args:
+            build_indexes: Construire aussi les index BM25 et articles
+            
+        Returns:
+            True si un préchauffage a été lancé (False s'il est déjà en cours ou terminé)
+        """
+        if self._warm_up_thread is not None:
+            return False
+        self._warm_up_thread = threading.Thread(
+            target=self._warm_up, args=(build_indexes,),
+            name="chromadb-warm-up", daemon=True
+        )
+        self._warm_up_thread.start()
+        return True
+    
+    def _warm_up(self, build_indexes: bool):
+        """Corps du thread de préchauffage"""
+        start_time = time.time()
+        self._readiness['state'] = 'warming'
+        try:
+            if not self.is_available:
+                self._readiness['state'] = 'unavailable'
+                return
+            
+            query_embedding = self._embed_query("préchauffage")
+            self._readiness['embedding_model'] = 'ready' if query_embedding is not None else 'error'
+            
+            # Une requête minimale par collection charge son segment HNSW en mémoire
+            for collection_name in self.collections:
+                try:
+                    self._query_collection(collection_name, "préchauffage", 1, query_embedding)
+                    self._readiness['collections'][collection_name] = 'ready'
+                except Exception as e:
+                    self._readiness['collections'][collection_name] = 'error'
+                    logger.warning(f"⚠️ Préchauffage {collection_name} échoué: {e}")
+            
+            if build_indexes:
+                self.get_sparse_index()
+                self.get_article_index()
+            
+            self._readiness['state'] = 'ready'
+            logger.info(f"✅ Préchauffage ChromaDB terminé en {time.time() - start_time:.1f}s")
+        except Exception as e:
+            self._readiness['state'] = 'error'
+            logger.error(f"❌ Erreur préchauffage ChromaDB: {e}")
+        finally:
+            self._readiness['warm_up_seconds'] = round(time.time() - start_time, 2)
     
-    def search_legal_knowledge(self, query: str, top_k: int = 10, use_reranking: bool = True) -> List[Dict]:
+    def get_readiness(self) -> Dict:
+        """
+        Retourne l'état de préparation du système de recherche, sans rien charger
+        
+        Returns:
+            Dictionnaire avec l'état global (idle, warming, ready, unavailable, error),
+            l'état de chaque collection (pending, missing, loaded, ready, error) et
+            celui du modèle d'embedding
+        """
+        return {
+            'state': self._readiness['state'],
+            'collections': dict(self._readiness['collections']),
+            'embedding_model': self._readiness['embedding_model'],
+            'warm_up_seconds': self._readiness['warm_up_seconds'],
+            'sparse_index': self._sparse_index is not None,
+            'article_index': self._article_index is not None
+        }
+    
+    @staticmethod
+    def _create_backend(retrieval_config: Dict) -> VectorBackend:
+        """
+        Instancie le backend vectoriel configuré (repli sur ChromaDB en cas d'échec)
+        
+        Args:
+            retrieval_config: RAG_CONFIG["retrieval"]
+            
+        Returns:
+            Backend vectoriel
+        """
+        backend_name = retrieval_config["vector_backend"]
+        if backend_name in ("numpy_flat", "numpy_int8"):
+            try:
+                backend_options = {'index_dir': retrieval_config["flat_index_path"]}
+                if backend_name == "numpy_int8":
+                    backend_options['rescore_factor'] = retrieval_config["int8_rescore_factor"]
+                backend = create_vector_backend(backend_name, **backend_options)
+                logger.info(f"✅ Backend vectoriel {backend_name} chargé")
+                return backend
+            except Exception as e:
+                logger.warning(f"⚠️ Backend {backend_name} indisponible, repli sur ChromaDB: {e}")
+        elif backend_name != "chroma":
+            logger.warning(f"⚠️ Backend vectoriel inconnu '{backend_name}', repli sur ChromaDB")
+        return create_vector_backend("chroma", chroma_path='chroma_db')
+    
+    def search_legal_knowledge(self, query: str, top_k: int = 10, use_reranking: bool = True,
+                               mode: Optional[str] = None, filters: Optional[Dict] = None) -> List[Dict]:
         """
         Recherche dans toute la base de connaissances ChromaDB avec reranking optionnel
         
@@ -64,6 +268,8 @@ class ChromaDBSearch:
             query: Requête de recherche
             top_k: Nombre maximum de résultats par collection
             use_reranking: Utiliser le cross-encoder pour reranker les résultats
+            mode: "dense" ou "hybrid" (défaut: RAG_CONFIG)
+            filters: Filtres appliqués avant la requête (voir _plan_filters)
             
         Returns:
             Liste des chunks pertinents avec métadonnées
@@ -76,36 +282,7 @@ class ChromaDBSearch:
         
         try:
             # Recherche dans toutes les collections
-            for collection_name, collection in self.collections.items():
-                try:
-                    results = collection.query(
-                        query_texts=[query],
-                        n_results=top_k,
-                        include=['metadatas', 'documents', 'distances']
-                    )
-                    
-                    if results['documents'] and results['documents'][0]:
-                        for i, (doc, metadata, distance) in enumerate(zip(
-                            results['documents'][0],
-                            results['metadatas'][0],
-                            results['distances'][0]
-                        )):
-                            # Calculer un score de pertinence (distance inverse)
-                            relevance_score = max(0, 1 - distance)
-                            
-                            result = {
-                                'content': doc,
-                                'metadata': metadata,
-                                'collection': collection_name,
-                                'relevance_score': relevance_score,
-                                'source': metadata.get('source_file', 'Inconnu'),
-                                'article': metadata.get('article', ''),
-                                'doc_type': metadata.get('doc_type', '')
-                            }
-                            all_results.append(result)
-                            
-                except Exception as e:
-                    logger.error(f"❌ Erreur recherche {collection_name}: {e}")
+            all_results = self._search_collections(query, top_k, mode, filters=filters)
             
             # Reranking avec cross-encoder si demandé
             if use_reranking and all_results:
@@ -149,31 +326,9 @@ class ChromaDBSearch:
             return []
         
         try:
-            results = self.collections['deontologie'].query(
-                query_texts=[query],
-                n_results=top_k,
-                include=['metadatas', 'documents', 'distances']
-            )
-            
-            deont_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, (doc, metadata, distance) in enumerate(zip(
-                    results['documents'][0],
-                    results['metadatas'][0],
-                    results['distances'][0]
-                )):
-                    relevance_score = max(0, 1 - distance)
-                    
-                    result = {
-                        'content': doc,
-                        'metadata': metadata,
-                        'collection': 'deontologie',
-                        'relevance_score': relevance_score,
-                        'source': metadata.get('source_file', 'codedeont.pdf'),
-                        'article': metadata.get('article', ''),
-                        'doc_type': 'deontologie'
-                    }
-                    deont_results.append(result)
+            deont_results = self._search_collections(query, top_k, filters={'collections': ['deontologie']})
+            for result in deont_results:
+                result['doc_type'] = 'deontologie'
             
             # Reranking avec cross-encoder si demandé
             if use_reranking and deont_results:
@@ -216,31 +371,9 @@ class ChromaDBSearch:
             return []
         
         try:
-            results = self.collections['csp'].query(
-                query_texts=[query],
-                n_results=top_k,
-                include=['metadatas', 'documents', 'distances']
-            )
-            
-            csp_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, (doc, metadata, distance) in enumerate(zip(
-                    results['documents'][0],
-                    results['metadatas'][0],
-                    results['distances'][0]
-                )):
-                    relevance_score = max(0, 1 - distance)
-                    
-                    result = {
-                        'content': doc,
-                        'metadata': metadata,
-                        'collection': 'csp',
-                        'relevance_score': relevance_score,
-                        'source': metadata.get('source_file', 'Code de la santé publique.pdf'),
-                        'article': metadata.get('article', ''),
-                        'doc_type': 'csp'
-                    }
-                    csp_results.append(result)
+            csp_results = self._search_collections(query, top_k, filters={'collections': ['csp']})
+            for result in csp_results:
+                result['doc_type'] = 'csp'
             
             logger.info(f"✅ Recherche CSP: {len(csp_results)} résultats")
             return csp_results
@@ -249,7 +382,8 @@ class ChromaDBSearch:
             logger.error(f"❌ Erreur recherche CSP: {e}")
             return []
     
-    def search_unified_legal_knowledge(self, query: str, top_k: int = 15, use_reranking: bool = True) -> List[Dict]:
+    def search_unified_legal_knowledge(self, query: str, top_k: int = 15, use_reranking: bool = True,
+                                       mode: Optional[str] = None, filters: Optional[Dict] = None) -> List[Dict]:
         """
         Recherche UNIFIÉE dans TOUTE la base de connaissances ChromaDB
         Retourne les MEILLEURS articles de TOUTES les sources (CSP, déontologie, CSS, civil, pénal)
@@ -258,6 +392,8 @@ class ChromaDBSearch:
             query: Requête de recherche
             top_k: Nombre maximum de résultats totaux
             use_reranking: Utiliser le cross-encoder pour reranker les résultats
+            mode: "dense" ou "hybrid" (défaut: RAG_CONFIG)
+            filters: Filtres appliqués avant la requête (voir _plan_filters)
             
         Returns:
             Liste des MEILLEURS chunks de TOUTES les sources juridiques
@@ -266,70 +402,1200 @@ class ChromaDBSearch:
             logger.warning("⚠️ ChromaDB non disponible")
             return []
         
+        # Résultats déjà calculés pour cette situation (toutes sessions confondues)
+        cache_key = self._unified_cache_key(query, top_k, mode, use_reranking, filters)
+        if cache_key:
+            cached_results = get_search_result_cache().get(cache_key)
+            if cached_results is not None:
+                logger.info(f"💾 Recherche unifiée servie depuis le cache: {len(cached_results)} résultats")
+                return cached_results
+        
         all_results = []
         
         try:
-            # Recherche dans TOUTES les collections en parallèle
-            for collection_name, collection in self.collections.items():
-                try:
-                    # Recherche plus large dans chaque collection
-                    results = collection.query(
-                        query_texts=[query],
-                        n_results=top_k,  # Plus de résultats par collection
-                        include=['metadatas', 'documents', 'distances']
-                    )
-                    
-                    if results['documents'] and results['documents'][0]:
-                        for i, (doc, metadata, distance) in enumerate(zip(
-                            results['documents'][0],
-                            results['metadatas'][0],
-                            results['distances'][0]
-                        )):
-                            # Calculer un score de pertinence (distance inverse)
-                            relevance_score = max(0, 1 - distance)
-                            
-                            result = {
-                                'content': doc,
-                                'metadata': metadata,
-                                'collection': collection_name,
-                                'relevance_score': relevance_score,
-                                'source': metadata.get('source_file', 'Inconnu'),
-                                'article': metadata.get('article', ''),
-                                'doc_type': metadata.get('doc_type', ''),
-                                'source_type': self._get_source_type(collection_name)
-                            }
-                            all_results.append(result)
-                            
-                except Exception as e:
-                    logger.error(f"❌ Erreur recherche {collection_name}: {e}")
+            # Recherche dans TOUTES les collections en parallèle, avec les sous-requêtes
+            # de la situation (plus de résultats par collection pour le reranking)
+            all_results = self._search_collections_expanded(query, top_k, mode, with_source_type=True, filters=filters)
             
             logger.info(f"🔍 Recherche unifiée: {len(all_results)} résultats trouvés dans toutes les sources")
             
             # Reranking UNIFIÉ avec cross-encoder pour TOUS les résultats
-            if use_reranking and all_results:
+            all_results = self._rerank_unified(all_results, query, use_reranking)
+            
+            all_results = all_results[:top_k]  # Garder les meilleurs de toutes les sources
+            if self.neighbour_expansion:
+                self.expand_with_neighbours(all_results)
+            
+            logger.info(f"✅ Recherche unifiée terminée: {len(all_results)} meilleurs résultats de toutes les sources")
+            if cache_key and all_results:
+                get_search_result_cache().put(cache_key, all_results)
+            return all_results
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur recherche unifiée ChromaDB: {e}")
+            return []
+    
+    def stream_unified_legal_knowledge(self, query: str, top_k: int = 15, use_reranking: bool = True,
+                                       mode: Optional[str] = None, filters: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Variante progressive de search_unified_legal_knowledge
+        
+        Chaque collection est interrogée dans son propre thread (expansion et segmentation
+        comprises) et ses candidats sont transmis dès leur arrivée; vient ensuite le
+        classement final, reranké sur l'ensemble des collections. Les scores de première
+        étape sont calculés par collection; le classement final ne dépend que du reranking.
+        
+        Args:
+            query: Requête de recherche
+            top_k: Nombre maximum de résultats totaux
+            use_reranking: Utiliser le cross-encoder pour reranker les résultats
+            mode: "dense" ou "hybrid" (défaut: RAG_CONFIG)
+            filters: Filtres appliqués avant la requête (voir _plan_filters)
+            
+        Yields:
+            Événements {'event': 'collection', 'collection', 'results', 'elapsed'} (un par collection
+            ayant répondu, par score décroissant), puis {'event': 'final', 'results', 'elapsed', 'cached'}
+        """
+        start = time.perf_counter()
+        if not self.is_available:
+            logger.warning("⚠️ ChromaDB non disponible")
+            yield {'event': 'final', 'results': [], 'elapsed': 0.0, 'cached': False}
+            return
+        
+        cache_key = self._unified_cache_key(query, top_k, mode, use_reranking, filters)
+        if cache_key:
+            cached_results = get_search_result_cache().get(cache_key)
+            if cached_results is not None:
+                logger.info(f"💾 Recherche unifiée servie depuis le cache: {len(cached_results)} résultats")
+                yield {'event': 'final', 'results': cached_results, 'elapsed': time.perf_counter() - start, 'cached': True}
+                return
+        
+        # Embeddings de la situation, de ses fenêtres et sous-requêtes calculés une seule fois,
+        # avant que les threads des collections ne les lisent dans le cache
+        windows = segment_situation(
+            query, self.segment_window_sentences, self.segment_max_windows, self.segmentation_min_words
+        )
+        self._embed_queries((windows or [query]) + get_query_expander().expand(query)[1:])
+        
+        plan = self._plan_filters(filters)
+        collection_names = list(plan) if plan is not None else list(self.collections)
+        base_filters = {key: value for key, value in (filters or {}).items() if key != 'collections'}
+        
+        def search_collection(collection_name):
+            return self._search_collections_expanded(
+                query, top_k, mode, with_source_type=True,
+                filters=dict(base_filters, collections=[collection_name])
+            )
+        
+        all_results = []
+        for collection_name, results in self._stream_fan_out(search_collection, collection_names):
+            results.sort(key=lambda x: x['relevance_score'], reverse=True)
+            all_results.extend(results)
+            yield {'event': 'collection', 'collection': collection_name, 'results': results,
+                   'elapsed': time.perf_counter() - start}
+        
+        try:
+            all_results = self._preselect(all_results, self.preselect_candidates)
+            all_results = self._rerank_unified(all_results, query, use_reranking)[:top_k]
+            if self.neighbour_expansion:
+                self.expand_with_neighbours(all_results)
+        except Exception as e:
+            logger.error(f"❌ Erreur recherche unifiée progressive: {e}")
+            all_results = []
+        
+        logger.info(f"✅ Recherche unifiée progressive terminée: {len(all_results)} résultats "
+                    f"en {time.perf_counter() - start:.2f}s")
+        if cache_key and all_results:
+            get_search_result_cache().put(cache_key, all_results)
+        yield {'event': 'final', 'results': all_results, 'elapsed': time.perf_counter() - start, 'cached': False}
+    
+    def search_unified_batch(self, queries: List[str], top_k: int = 15, use_reranking: bool = True,
+                             mode: Optional[str] = None) -> List[List[Dict]]:
+        """
+        Recherche UNIFIÉE pour plusieurs situations à la fois
+        
+        Une seule requête vectorisée par collection pour tout le batch, et un seul
+        batch de reranking cross-encoder pour toutes les requêtes.
+        
+        Args:
+            queries: Requêtes de recherche
+            top_k: Nombre maximum de résultats par requête
+            use_reranking: Utiliser le cross-encoder pour reranker les résultats
+            mode: "dense" ou "hybrid" (défaut: RAG_CONFIG)
+            
+        Returns:
+            Une liste de résultats par requête, dans l'ordre des requêtes
+        """
+        if not queries:
+            return []
+        
+        if not self.is_available:
+            logger.warning("⚠️ ChromaDB non disponible")
+            return [[] for _ in queries]
+        
+        try:
+            results_per_query = self._search_collections_batch(queries, top_k, mode, with_source_type=True)
+            logger.info(f"🔍 Recherche unifiée batch: {len(queries)} requêtes, {sum(len(r) for r in results_per_query)} candidats")
+            
+            reranked = False
+            if use_reranking and any(results_per_query):
                 try:
                     from chromadb_reranker import get_chromadb_reranker
                     reranker = get_chromadb_reranker()
                     if reranker.is_available:
-                        logger.info("🔍 Application du reranking cross-encoder UNIFIÉ...")
-                        all_results = reranker.rerank_unified_results(all_results, query)
-                    else:
-                        # Trier par score de pertinence si pas de reranking
-                        all_results.sort(key=lambda x: x['relevance_score'], reverse=True)
+                        results_per_query = reranker.rerank_unified_batch(results_per_query, queries)
+                        reranked = True
                 except Exception as e:
-                    logger.error(f"❌ Erreur reranking unifié: {e}")
-                    # Trier par score de pertinence en cas d'erreur
-                    all_results.sort(key=lambda x: x['relevance_score'], reverse=True)
-            else:
+                    logger.error(f"❌ Erreur reranking unifié batch: {e}")
+            
+            if not reranked:
                 # Trier par score de pertinence
-                all_results.sort(key=lambda x: x['relevance_score'], reverse=True)
+                for results in results_per_query:
+                    results.sort(key=lambda x: x['relevance_score'], reverse=True)
             
-            logger.info(f"✅ Recherche unifiée terminée: {len(all_results[:top_k])} meilleurs résultats de toutes les sources")
-            return all_results[:top_k]  # Retourner les meilleurs de toutes les sources
+            return [results[:top_k] for results in results_per_query]
             
         except Exception as e:
-            logger.error(f"❌ Erreur recherche unifiée ChromaDB: {e}")
-            return []
+            logger.error(f"❌ Erreur recherche unifiée batch ChromaDB: {e}")
+            return [[] for _ in queries]
+    
+    def expand_with_neighbours(self, results: List[Dict], top_n: Optional[int] = None,
+                               window: Optional[int] = None) -> List[Dict]:
+        """
+        Complète les meilleurs résultats avec le texte de leurs chunks voisins
+        
+        Les voisins viennent de l'index calculé à l'ingestion (chunk_neighbours.py) et
+        sont lus en un seul get par collection, sans requête vectorielle. Le texte recollé
+        (chevauchements supprimés) est ajouté dans 'context'; 'content' est inchangé.
+        
+        Args:
+            results: Résultats classés (modifiés en place)
+            top_n: Nombre de résultats complétés (défaut: RAG_CONFIG)
+            window: Nombre de voisins de chaque côté (défaut: RAG_CONFIG)
+            
+        Returns:
+            Les mêmes résultats
+        """
+        neighbour_index = self.get_neighbour_index()
+        if not neighbour_index or not results:
+            return results
+        top_n = self.neighbour_expand_top if top_n is None else top_n
+        window = self.neighbour_window if window is None else window
+        
+        # Ids à lire par collection (voisins communs à plusieurs résultats lus une fois)
+        plans = []
+        missing = {}
+        for result in results[:top_n]:
+            neighbours = neighbour_index.get(self.EXPECTED_COLLECTIONS.get(result['collection'], result['collection']), {})
+            chunk_ids = collect_neighbour_ids(neighbours, result['chunk_id'], window)
+            if len(chunk_ids) > 1:
+                plans.append((result, chunk_ids))
+                missing.setdefault(result['collection'], set()).update(
+                    chunk_id for chunk_id in chunk_ids if chunk_id != result['chunk_id']
+                )
+        if not plans:
+            return results
+        
+        def fetch(collection_name):
+            return self.collections[collection_name].get(ids=sorted(missing[collection_name]), include=['documents'])
+        
+        pages = self._fan_out(fetch, operation="lecture des voisins", collection_names=list(missing))
+        texts = {
+            (collection_name, chunk_id): doc
+            for collection_name, page in pages.items()
+            for chunk_id, doc in zip(page['ids'], page['documents'])
+        }
+        
+        for result, chunk_ids in plans:
+            parts = [
+                result['content'] if chunk_id == result['chunk_id'] else texts.get((result['collection'], chunk_id))
+                for chunk_id in chunk_ids
+            ]
+            found_ids = [chunk_id for chunk_id, part in zip(chunk_ids, parts) if part is not None]
+            result['context'] = merge_overlapping([part for part in parts if part is not None])
+            result['neighbour_ids'] = [chunk_id for chunk_id in found_ids if chunk_id != result['chunk_id']]
+        
+        logger.info(f"🔗 {len(plans)} résultats complétés par {sum(len(ids) for ids in missing.values())} chunks voisins")
+        return results
+    
+    def get_neighbour_index(self) -> Optional[Dict[str, Dict[str, List]]]:
+        """
+        Retourne l'index des chunks voisins écrit à l'ingestion, relu seulement s'il a changé
+        
+        Returns:
+            Index collection -> {chunk_id: [précédent, suivant]}, ou None s'il est absent
+        """
+        try:
+            mtime = get_neighbour_index_path().stat().st_mtime_ns
+        except OSError:
+            self._neighbour_index, self._neighbour_index_mtime = None, None
+            return None
+        
+        if mtime != self._neighbour_index_mtime:
+            self._neighbour_index = load_neighbour_index()
+            self._neighbour_index_mtime = mtime
+        return self._neighbour_index
+    
+    def get_article(self, ref: str, collection_name: Optional[str] = None) -> List[Dict]:
+        """
+        Récupère directement les chunks d'un article, sans requête vectorielle
+        
+        Args:
+            ref: Référence d'article ("L.1142-1", "R. 4127-35", "article 1240", ...)
+            collection_name: Restreindre à une collection
+            
+        Returns:
+            Chunks de l'article (liste vide si l'article n'est pas indexé)
+        """
+        return self.lookup_articles([ref], collection_name).get(ref, [])
+    
+    def lookup_articles(self, refs: List[str], collection_name: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """
+        Récupère les chunks de plusieurs articles, avec un seul get par collection
+        
+        Args:
+            refs: Références d'articles
+            collection_name: Restreindre à une collection
+            
+        Returns:
+            Dictionnaire référence -> chunks de l'article
+        """
+        if not self.is_available:
+            return {}
+        
+        try:
+            article_index = self.get_article_index()
+            chunks_by_ref = {ref: article_index.lookup(ref, collection_name) for ref in refs}
+            
+            # Regrouper les ids par collection pour un seul get chacune
+            ids_by_collection = {}
+            for chunks in chunks_by_ref.values():
+                for chunk_collection, chunk_id in chunks:
+                    ids_by_collection.setdefault(chunk_collection, []).append(chunk_id)
+            
+            records = {}
+            for chunk_collection, ids in ids_by_collection.items():
+                page = self.collections[chunk_collection].get(
+                    ids=list(dict.fromkeys(ids)),
+                    include=['documents', 'metadatas']
+                )
+                for chunk_id, doc, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                    records[chunk_id] = self._build_result(
+                        chunk_collection, chunk_id, doc, metadata, None,
+                        extra_fields={
+                            'relevance_score': 1.0,
+                            'exact_match': True,
+                            'source_type': self._get_source_type(chunk_collection)
+                        }
+                    )
+            
+            return {
+                ref: [dict(records[chunk_id]) for _, chunk_id in chunks if chunk_id in records]
+                for ref, chunks in chunks_by_ref.items()
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur recherche exacte d'articles: {e}")
+            return {}
+    
+    def lookup_cited_articles(self, text: str, collection_name: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """
+        Récupère les articles cités dans une situation ou une analyse
+        
+        Args:
+            text: Texte citant des articles
+            collection_name: Restreindre à une collection
+            
+        Returns:
+            Dictionnaire référence normalisée -> chunks de l'article
+        """
+        return self.lookup_articles(extract_article_refs(text), collection_name)
+    
+    def get_article_index(self) -> ArticleIndex:
+        """
+        Retourne l'index exact des articles, construit une fois depuis les métadonnées
+        
+        Returns:
+            Index article normalisé -> chunks
+        """
+        if self._article_index is None:
+            with self._index_lock:
+                if self._article_index is None:
+                    logger.info("🔧 Construction de l'index des articles...")
+                    article_index = ArticleIndex()
+                    for collection_name in self.collections:
+                        for chunk_id, metadata in self._iter_collection_records(collection_name, include=('metadatas',)):
+                            article_index.add(collection_name, chunk_id, metadata)
+                    self._article_index = article_index
+                    logger.info(f"✅ Index des articles construit: {len(article_index)} articles")
+        return self._article_index
+    
+    def _unified_cache_key(self, query: str, top_k: int, mode: Optional[str], use_reranking: bool,
+                           filters: Optional[Dict]) -> Optional[str]:
+        """Retourne la clé du cache de résultats d'une recherche unifiée (None si le cache est désactivé)"""
+        if not self.result_cache_enabled:
+            return None
+        return get_search_result_cache().make_key(
+            query, top_k, self._resolve_mode(mode), use_reranking,
+            variant=json.dumps({'pipeline': self._pipeline_settings(), 'filters': filters or {}}, sort_keys=True)
+        )
+    
+    def _pipeline_settings(self) -> Dict:
+        """
+        Réglages de recherche et de reranking qui changent les résultats d'une requête
+        
+        Ils font partie de la clé du cache de résultats : un changement de configuration
+        (backend vectoriel, organisation des collections, cascade, backend d'inférence...)
+        ne sert jamais les résultats de l'ancien pipeline.
+        
+        Returns:
+            Dictionnaire sérialisable des réglages
+        """
+        reranking_config = RAG_CONFIG["reranking"]
+        expander = get_query_expander()
+        return {
+            'query_expansion': [expander.strategy, expander.max_queries, expander.min_words],
+            'vector_backend': self.retrieval_config["vector_backend"],
+            'int8_rescore_factor': self.retrieval_config["int8_rescore_factor"],
+            'rrf_k': self.rrf_k,
+            'collection_layout': self.collection_layout,
+            'merged_oversample': self.merged_oversample,
+            'two_phase_fetch': self.two_phase_fetch,
+            'preselect_candidates': self.preselect_candidates,
+            'segmentation': [self.segmentation_min_words, self.segment_window_sentences,
+                             self.segment_max_windows, self.segment_pooling],
+            'neighbours': [self.neighbour_expansion, self.neighbour_window, self.neighbour_expand_top],
+            'cross_encoder_model': reranking_config["cross_encoder_model"],
+            'inference_backend': reranking_config["inference_backend"],
+            'onnx': [reranking_config["onnx"]["quantize_int8"], reranking_config["onnx"]["max_length"]],
+            'cascade': reranking_config["cascade"]
+        }
+    
+    def _rerank_unified(self, results: List[Dict], query: str, use_reranking: bool = True) -> List[Dict]:
+        """
+        Reranke les candidats de toutes les sources avec le cross-encoder
+        
+        Args:
+            results: Candidats de toutes les collections
+            query: Requête de recherche
+            use_reranking: Utiliser le cross-encoder (sinon tri par score de pertinence)
+            
+        Returns:
+            Candidats classés du plus au moins pertinent
+        """
+        if use_reranking and results:
+            try:
+                from chromadb_reranker import get_chromadb_reranker
+                reranker = get_chromadb_reranker()
+                if reranker.is_available:
+                    logger.info("🔍 Application du reranking cross-encoder UNIFIÉ...")
+                    return reranker.rerank_unified_results(results, query)
+            except Exception as e:
+                logger.error(f"❌ Erreur reranking unifié: {e}")
+        
+        # Trier par score de pertinence (pas de reranking, ou reranking en erreur)
+        results.sort(key=lambda x: x['relevance_score'], reverse=True)
+        return results
+    
+    def _search_collections(self, query: str, n_results: int, mode: Optional[str] = None,
+                            with_source_type: bool = False, filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Première étape de recherche sur toutes les collections (avant reranking)
+        
+        Args:
+            query: Requête de recherche
+            n_results: Nombre de candidats par collection
+            mode: "dense" ou "hybrid" (défaut: RAG_CONFIG)
+            with_source_type: Ajouter le type de source lisible à chaque résultat
+            filters: Filtres appliqués avant la requête (voir _plan_filters)
+            
+        Returns:
+            Candidats de toutes les collections
+        """
+        return self._search_collections_batch([query], n_results, mode, with_source_type, filters)[0]
+    
+    def _search_collections_batch(self, queries: List[str], n_results: int, mode: Optional[str] = None,
+                                  with_source_type: bool = False, filters: Optional[Dict] = None) -> List[List[Dict]]:
+        """
+        Première étape de recherche pour plusieurs requêtes, une requête vectorisée par collection
+        
+        En lecture en deux temps (two_phase_fetch), la requête vectorielle ne ramène que
+        les ids, distances et métadonnées; seuls les `preselect_candidates` meilleurs
+        candidats de chaque requête sont ensuite lus en bloc avec collection.get.
+        
+        Args:
+            queries: Requêtes de recherche
+            n_results: Nombre de candidats par requête et par collection
+            mode: "dense" ou "hybrid" (défaut: RAG_CONFIG)
+            with_source_type: Ajouter le type de source lisible à chaque résultat
+            filters: Filtres appliqués avant la requête (voir _plan_filters)
+            
+        Returns:
+            Candidats de toutes les collections, une liste par requête
+        """
+        return self._finalize_candidates(
+            self._gather_candidates_batch(queries, n_results, mode, with_source_type, self._plan_filters(filters))
+        )
+    
+    def _search_collections_expanded(self, query: str, n_results: int, mode: Optional[str] = None,
+                                     with_source_type: bool = False, filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Première étape de recherche avec expansion et segmentation de la requête
+        
+        Une situation longue est remplacée par ses fenêtres de phrases, dont les scores
+        sont agrégés par chunk (max ou somme). Fenêtres et sous-requêtes sont embeddées
+        en un seul appel et envoyées en une seule requête vectorisée par collection;
+        les classements sont fusionnés par RRF.
+        
+        Args:
+            query: Situation ou requête de recherche
+            n_results: Nombre de candidats par requête et par collection
+            mode: "dense" ou "hybrid" (défaut: RAG_CONFIG)
+            with_source_type: Ajouter le type de source lisible à chaque résultat
+            filters: Filtres appliqués avant la requête (voir _plan_filters)
+            
+        Returns:
+            Candidats fusionnés de toutes les collections
+        """
+        sub_queries = get_query_expander().expand(query)[1:]
+        windows = segment_situation(
+            query, self.segment_window_sentences, self.segment_max_windows, self.segmentation_min_words
+        )
+        search_queries = (windows or [query]) + sub_queries
+        if len(search_queries) <= 1:
+            return self._search_collections(query, n_results, mode, with_source_type, filters)
+        
+        logger.info(f"🔀 Expansion de requête: {len(windows)} fenêtres, {len(sub_queries)} sous-requêtes")
+        results_per_query = self._gather_candidates_batch(
+            search_queries, n_results, mode, with_source_type, self._plan_filters(filters)
+        )
+        max_results = max(len(results) for results in results_per_query)
+        
+        rankings = results_per_query
+        if windows:
+            window_count = len(windows)
+            rankings = [self._pool_window_results(results_per_query[:window_count], max_results)] + \
+                results_per_query[window_count:]
+        
+        fused_results = rankings[0] if len(rankings) == 1 else self._fuse_rankings(rankings, max_results)
+        return self._finalize_candidates([fused_results])[0]
+    
+    def _pool_window_results(self, results_per_window: List[List[Dict]], max_results: int) -> List[Dict]:
+        """
+        Agrège par chunk les candidats des fenêtres d'une situation longue
+        
+        En pooling "max", le relevance_score est le meilleur score sur les fenêtres;
+        en pooling "sum", la somme des scores divisée par le nombre de fenêtres
+        (un chunk trouvé par plusieurs fenêtres remonte).
+        
+        Args:
+            results_per_window: Candidats de chaque fenêtre
+            max_results: Nombre de candidats à conserver
+            
+        Returns:
+            Candidats agrégés par score décroissant
+        """
+        pooled = {}
+        for results in results_per_window:
+            for result in results:
+                key = (result['collection'], result['chunk_id'])
+                if key not in pooled:
+                    pooled[key] = result
+                    result['window_scores'] = [result['relevance_score']]
+                else:
+                    candidate = pooled[key]
+                    candidate['window_scores'].append(result['relevance_score'])
+                    if candidate['content'] is None and result['content'] is not None:
+                        candidate['content'] = result['content']
+        
+        for result in pooled.values():
+            window_scores = result.pop('window_scores')
+            if self.segment_pooling == 'sum':
+                result['relevance_score'] = sum(window_scores) / len(results_per_window)
+            else:
+                result['relevance_score'] = max(window_scores)
+            result['matched_windows'] = len(window_scores)
+        
+        return sorted(pooled.values(), key=lambda x: x['relevance_score'], reverse=True)[:max_results]
+    
+    def _fuse_rankings(self, results_per_query: List[List[Dict]], max_results: int) -> List[Dict]:
+        """
+        Fusionne par RRF les candidats de plusieurs requêtes (une même situation)
+        
+        L'ordre suit le score RRF (conservé dans rrf_score); le relevance_score reste le
+        meilleur score d'origine sur les requêtes, à la même échelle que sans expansion.
+        
+        Args:
+            results_per_query: Candidats de chaque requête, toutes collections confondues
+            max_results: Nombre de candidats à conserver
+            
+        Returns:
+            Candidats fusionnés par score RRF décroissant
+        """
+        candidates = {}
+        rankings = []
+        for results in results_per_query:
+            ranking = []
+            for result in sorted(results, key=lambda x: x['relevance_score'], reverse=True):
+                key = (result['collection'], result['chunk_id'])
+                ranking.append(key)
+                if key not in candidates:
+                    candidates[key] = result
+                    result['query_score'] = result['relevance_score']
+                else:
+                    candidate = candidates[key]
+                    candidate['query_score'] = max(candidate['query_score'], result['relevance_score'])
+                    if candidate['content'] is None and result['content'] is not None:
+                        candidate['content'] = result['content']
+            rankings.append(ranking)
+        
+        fused_scores = reciprocal_rank_fusion(rankings, k=self.rrf_k)
+        
+        fused_results = []
+        for key, rrf_score in sorted(fused_scores.items(), key=lambda item: item[1], reverse=True)[:max_results]:
+            result = candidates[key]
+            result['rrf_score'] = round(rrf_score, 5)
+            result['relevance_score'] = result.pop('query_score')
+            fused_results.append(result)
+        
+        return fused_results
+    
+    def _gather_candidates_batch(self, queries: List[str], n_results: int, mode: Optional[str] = None,
+                                 with_source_type: bool = False,
+                                 where_by_collection: Optional[Dict[str, Optional[Dict]]] = None) -> List[List[Dict]]:
+        """
+        Interroge toutes les collections pour plusieurs requêtes et formate les candidats
+        
+        En lecture en deux temps, le texte des candidats denses n'est pas encore lu
+        (voir _finalize_candidates).
+        
+        Args:
+            queries: Requêtes de recherche
+            n_results: Nombre de candidats par requête et par collection
+            mode: "dense" ou "hybrid" (défaut: RAG_CONFIG)
+            with_source_type: Ajouter le type de source lisible à chaque résultat
+            where_by_collection: Collections à interroger et leur filtre `where` (défaut: toutes, sans filtre)
+            
+        Returns:
+            Candidats de toutes les collections, une liste par requête
+        """
+        mode = self._resolve_mode(mode)
+        raw_results = self._query_collections_batch(
+            queries, n_results, include_documents=not self.two_phase_fetch, where_by_collection=where_by_collection
+        )
+        
+        results_per_query = [[] for _ in queries]
+        for collection_name, results in raw_results.items():
+            extra_fields = {'source_type': self._get_source_type(collection_name)} if with_source_type else None
+            for query_index, query in enumerate(queries):
+                collection_results = self._build_results(
+                    collection_name, self._select_query_results(results, query_index), extra_fields=extra_fields
+                )
+                if mode == 'hybrid':
+                    where = (where_by_collection or {}).get(collection_name)
+                    collection_results = self._fuse_with_sparse(
+                        collection_name, query, collection_results, n_results, extra_fields, where
+                    )
+                results_per_query[query_index].extend(collection_results)
+        
+        return results_per_query
+    
+    def _finalize_candidates(self, results_per_query: List[List[Dict]]) -> List[List[Dict]]:
+        """
+        Lecture en deux temps : présélection puis lecture en bloc des textes retenus
+        
+        Args:
+            results_per_query: Candidats de chaque requête
+            
+        Returns:
+            Candidats retenus, avec leur texte
+        """
+        if self.two_phase_fetch:
+            results_per_query = [self._preselect(results, self.preselect_candidates) for results in results_per_query]
+            self._fetch_documents([result for results in results_per_query for result in results])
+        return results_per_query
+    
+    @staticmethod
+    def _preselect(results: List[Dict], max_candidates: int) -> List[Dict]:
+        """
+        Garde les meilleurs candidats d'une requête selon le score de première étape
+        
+        Args:
+            results: Candidats de toutes les collections
+            max_candidates: Nombre maximum de candidats conservés
+            
+        Returns:
+            Candidats retenus, dans leur ordre d'origine
+        """
+        if len(results) <= max_candidates:
+            return results
+        kept = set(sorted(range(len(results)), key=lambda i: results[i]['relevance_score'], reverse=True)[:max_candidates])
+        return [result for i, result in enumerate(results) if i in kept]
+    
+    def _fetch_documents(self, results: List[Dict]):
+        """
+        Complète en place le texte des candidats lus sans document (un get par collection)
+        
+        Args:
+            results: Candidats retenus; ceux dont le contenu est None sont complétés
+        """
+        missing = {}
+        for result in results:
+            if result['content'] is None:
+                missing.setdefault(result['collection'], {}).setdefault(result['chunk_id'], []).append(result)
+        if not missing:
+            return
+        
+        def fetch(collection_name):
+            return self.collections[collection_name].get(ids=list(missing[collection_name]), include=['documents'])
+        
+        pages = self._fan_out(fetch, operation="lecture des textes", collection_names=list(missing))
+        for collection_name, page in pages.items():
+            for chunk_id, doc in zip(page['ids'], page['documents']):
+                for result in missing[collection_name].get(chunk_id, []):
+                    result['content'] = doc
+                    if not result['snippet']:
+                        result['snippet'] = (doc or '')[:self.snippet_length]
+        
+        # Chunks introuvables (collection en erreur ou trop lente) : contenu vide plutôt que None
+        for chunks in missing.values():
+            for chunk_results in chunks.values():
+                for result in chunk_results:
+                    if result['content'] is None:
+                        result['content'] = ''
+    
+    def _resolve_mode(self, mode: Optional[str]) -> str:
+        """Retourne le mode de recherche effectif ("dense" par défaut si inconnu)"""
+        mode = mode or self.retrieval_mode
+        if mode not in ('dense', 'hybrid'):
+            logger.warning(f"⚠️ Mode de recherche inconnu '{mode}', utilisation du mode dense")
+            return 'dense'
+        return mode
+    
+    def _plan_filters(self, filters: Optional[Dict]) -> Optional[Dict[str, Optional[Dict]]]:
+        """
+        Traduit des filtres de recherche en collections à interroger et clauses `where` ChromaDB
+        
+        Filtres reconnus (valeur unique ou liste) :
+            - collections : clés des collections ('deontologie', 'csp', 'css', 'penal', 'civil')
+            - doc_type : métadonnée doc_type
+            - source_file : métadonnée source_file
+            - article_prefix : préfixe de référence ("L.114*", "R.4127"), résolu via l'index
+              des articles en valeurs exactes ($in); une collection sans article correspondant
+              n'est pas interrogée
+        
+        Args:
+            filters: Filtres de recherche (None = toutes les collections, sans filtre)
+            
+        Returns:
+            Dictionnaire clé de collection -> clause where (ou None), ou None si pas de filtre
+        """
+        if not filters:
+            return None
+        
+        unknown = set(filters) - {'collections', 'doc_type', 'source_file', 'article_prefix'}
+        if unknown:
+            logger.warning(f"⚠️ Filtres de recherche ignorés: {sorted(unknown)}")
+        
+        def as_list(value):
+            return [value] if isinstance(value, str) else list(value)
+        
+        collection_names = [name for name in self.collections if name in as_list(filters.get('collections') or self.collections)]
+        
+        common_clauses = []
+        for field in ('doc_type', 'source_file'):
+            if filters.get(field):
+                values = as_list(filters[field])
+                common_clauses.append({field: values[0]} if len(values) == 1 else {field: {'$in': values}})
+        
+        plan = {}
+        for collection_name in collection_names:
+            clauses = list(common_clauses)
+            if filters.get('article_prefix'):
+                article_index = self.get_article_index()
+                articles = sorted({
+                    value
+                    for prefix in as_list(filters['article_prefix'])
+                    for value in article_index.match_prefix(prefix, collection_name)
+                })
+                if not articles:
+                    continue
+                clauses.append({'article': {'$in': articles}})
+            plan[collection_name] = clauses[0] if len(clauses) == 1 else ({'$and': clauses} if clauses else None)
+        
+        return plan
+    
+    def _fuse_with_sparse(self, collection_name: str, query: str, dense_results: List[Dict],
+                          n_results: int, extra_fields: Optional[Dict] = None,
+                          where: Optional[Dict] = None) -> List[Dict]:
+        """
+        Fusionne les candidats denses d'une collection avec les candidats BM25 (RRF)
+        
+        Le relevance_score devient le score RRF normalisé (1.0 = premier dans les
+        deux classements); les scores d'origine sont conservés dans dense_score
+        et sparse_score.
+        
+        Args:
+            collection_name: Clé de la collection
+            query: Requête de recherche
+            dense_results: Candidats denses déjà formatés
+            n_results: Nombre de candidats à conserver
+            extra_fields: Champs ajoutés aux candidats issus de BM25
+            where: Filtre `where` appliqué aux candidats BM25
+            
+        Returns:
+            Candidats fusionnés par score RRF décroissant
+        """
+        try:
+            sparse_index = self.get_sparse_index()
+            # Avec un filtre, plus de candidats BM25 avant filtrage sur les métadonnées
+            sparse_top_k = n_results * 4 if where else n_results
+            sparse_hits = sparse_index.search(query, top_k=sparse_top_k, collection_name=collection_name)
+            if where:
+                sparse_hits = [
+                    (position, score) for position, score in sparse_hits
+                    if matches_where(sparse_index.get_record(position)['metadata'], where)
+                ][:n_results]
+        except Exception as e:
+            logger.error(f"❌ Erreur recherche BM25 {collection_name}: {e}")
+            return dense_results
+        
+        candidates = {}
+        for result in dense_results:
+            result['dense_score'] = result['relevance_score']
+            candidates[result['chunk_id']] = result
+        
+        sparse_ranking = []
+        for position, bm25_score in sparse_hits:
+            record = sparse_index.get_record(position)
+            chunk_id = record['id']
+            sparse_ranking.append(chunk_id)
+            if chunk_id not in candidates:
+                candidates[chunk_id] = self._build_result(
+                    collection_name, chunk_id, record['document'], record['metadata'], None,
+                    extra_fields=extra_fields
+                )
+            candidates[chunk_id]['sparse_score'] = round(bm25_score, 3)
+        
+        fused_scores = reciprocal_rank_fusion(
+            [[result['chunk_id'] for result in dense_results], sparse_ranking],
+            k=self.rrf_k
+        )
+        best_possible = 2.0 / (self.rrf_k + 1)
+        
+        fused_results = []
+        for chunk_id, rrf_score in sorted(fused_scores.items(), key=lambda item: item[1], reverse=True)[:n_results]:
+            result = candidates[chunk_id]
+            result['rrf_score'] = round(rrf_score, 5)
+            result['relevance_score'] = rrf_score / best_possible
+            fused_results.append(result)
+        
+        return fused_results
+    
+    def get_sparse_index(self) -> SparseIndex:
+        """
+        Retourne l'index BM25 des collections, construit au premier appel
+        
+        Returns:
+            Index BM25 de tous les chunks des collections chargées
+        """
+        if self._sparse_index is None:
+            with self._index_lock:
+                if self._sparse_index is None:
+                    logger.info("🔧 Construction de l'index BM25...")
+                    sparse_index = SparseIndex()
+                    for collection_name in self.collections:
+                        sparse_index.add_records(collection_name, self._iter_collection_records(collection_name))
+                    sparse_index.build()
+                    self._sparse_index = sparse_index
+        return self._sparse_index
+    
+    def _iter_collection_records(self, collection_name: str, include: Tuple[str, ...] = ('documents', 'metadatas'),
+                                 page_size: int = 1000) -> Iterator[Tuple]:
+        """
+        Parcourt tous les chunks d'une collection par pages
+        
+        Args:
+            collection_name: Clé de la collection
+            include: Champs ChromaDB à récupérer
+            page_size: Nombre de chunks par page
+            
+        Yields:
+            Tuples (id, champ1, champ2, ...) dans l'ordre de include
+        """
+        collection = self.collections[collection_name]
+        offset = 0
+        while True:
+            page = collection.get(include=list(include), limit=page_size, offset=offset)
+            ids = page['ids']
+            if not ids:
+                break
+            columns = [page[field] if page.get(field) is not None else [None] * len(ids) for field in include]
+            for row in zip(ids, *columns):
+                yield row
+            offset += len(ids)
+            if len(ids) < page_size:
+                break
+    
+    def _query_collection(self, collection_name: str, query: str, n_results: int,
+                          query_embedding: Optional[List[float]] = None) -> Dict:
+        """
+        Interroge une seule collection ChromaDB
+        
+        Args:
+            collection_name: Clé de la collection (deontologie, csp, ...)
+            query: Requête de recherche
+            n_results: Nombre de résultats à récupérer
+            query_embedding: Embedding déjà calculé de la requête (sinon lu dans le cache)
+            
+        Returns:
+            Résultats bruts de collection.query
+        """
+        query_embeddings = [query_embedding] if query_embedding is not None else None
+        return self._query_collection_batch(collection_name, [query], n_results, query_embeddings)
+    
+    def _query_collection_batch(self, collection_name: str, queries: List[str], n_results: int,
+                                query_embeddings: Optional[List[List[float]]] = None,
+                                include_documents: bool = True, where: Optional[Dict] = None) -> Dict:
+        """
+        Interroge une collection pour plusieurs requêtes en un seul appel vectorisé
+        
+        Args:
+            collection_name: Clé de la collection
+            queries: Requêtes de recherche
+            n_results: Nombre de résultats par requête
+            query_embeddings: Embeddings déjà calculés (sinon lus dans le cache)
+            include_documents: Ramener aussi le texte des chunks (sinon ids, distances et métadonnées)
+            where: Filtre sur les métadonnées, appliqué par ChromaDB avant la recherche
+            
+        Returns:
+            Résultats bruts de collection.query (une liste par requête)
+        """
+        if query_embeddings is None:
+            query_embeddings = self._embed_queries(queries)
+        
+        query_args = {'query_embeddings': query_embeddings} if query_embeddings is not None else {'query_texts': queries}
+        if where:
+            query_args['where'] = where
+        include = ['metadatas', 'documents', 'distances'] if include_documents else ['metadatas', 'distances']
+        results = self.collections[collection_name].query(
+            n_results=n_results,
+            include=include,
+            **query_args
+        )
+        self._readiness['collections'][collection_name] = 'ready'
+        return results
+    
+    def _query_collections_batch(self, queries: List[str], n_results: int, include_documents: bool = True,
+                                 where_by_collection: Optional[Dict[str, Optional[Dict]]] = None) -> Dict[str, Dict]:
+        """
+        Interroge toutes les collections pour plusieurs requêtes (en parallèle si activé)
+        
+        Args:
+            queries: Requêtes de recherche
+            n_results: Nombre de résultats par requête et par collection
+            include_documents: Ramener aussi le texte des chunks
+            where_by_collection: Collections à interroger et leur filtre `where` (défaut: toutes, sans filtre)
+            
+        Returns:
+            Résultats bruts par collection; les collections en erreur ou trop lentes sont absentes
+        """
+        # Embeddings calculés une seule fois pour toutes les collections
+        query_embeddings = self._embed_queries(queries)
+        if self.merged_collection is not None:
+            return self._query_merged_batch(queries, n_results, query_embeddings, include_documents, where_by_collection)
+        return self._fan_out(
+            lambda collection_name: self._query_collection_batch(
+                collection_name, queries, n_results, query_embeddings, include_documents=include_documents,
+                where=(where_by_collection or {}).get(collection_name)
+            ),
+            operation="recherche",
+            collection_names=list(where_by_collection) if where_by_collection is not None else None
+        )
+    
+    def _query_merged_batch(self, queries: List[str], n_results: int,
+                            query_embeddings: Optional[List[List[float]]], include_documents: bool = True,
+                            where_by_collection: Optional[Dict[str, Optional[Dict]]] = None) -> Dict[str, Dict]:
+        """
+        Interroge la collection fusionnée en une seule requête, puis répartit par famille de codes
+        
+        Chaque famille garde au plus n_results candidats par requête (quota), comme
+        avec les collections séparées : une famille très proche de la requête ne
+        peut pas évincer les autres sources.
+        
+        Args:
+            queries: Requêtes de recherche
+            n_results: Quota de candidats par requête et par famille
+            query_embeddings: Embeddings des requêtes (sinon ChromaDB embedde les textes)
+            include_documents: Ramener aussi le texte des chunks
+            where_by_collection: Familles à interroger et leur filtre `where` (défaut: toutes, sans filtre)
+            
+        Returns:
+            Résultats bruts par famille, au format collection.query
+        """
+        if where_by_collection is None:
+            where_by_collection = {key: None for key in self.collections}
+        if not where_by_collection:
+            return {}
+        
+        clauses = [{'code': key} if not where else {'$and': [{'code': key}, where]} for key, where in where_by_collection.items()]
+        if all(where is None for where in where_by_collection.values()):
+            merged_where = {'code': {'$in': list(where_by_collection)}}
+        else:
+            merged_where = clauses[0] if len(clauses) == 1 else {'$or': clauses}
+        
+        query_args = {'query_embeddings': query_embeddings} if query_embeddings is not None else {'query_texts': queries}
+        include = ['metadatas', 'documents', 'distances'] if include_documents else ['metadatas', 'distances']
+        try:
+            results = self.merged_collection.query(
+                n_results=n_results * len(where_by_collection) * self.merged_oversample,
+                include=include,
+                where=merged_where,
+                **query_args
+            )
+        except Exception as e:
+            logger.error(f"❌ Erreur recherche {self.merged_collection_name}: {e}")
+            return {}
+        
+        fields = ['ids', 'metadatas', 'distances'] + (['documents'] if include_documents else [])
+        per_family = {key: {field: [[] for _ in queries] for field in fields} for key in where_by_collection}
+        for query_index in range(len(queries)):
+            for position, metadata in enumerate(results['metadatas'][query_index]):
+                family = per_family.get((metadata or {}).get('code'))
+                if family is None or len(family['ids'][query_index]) >= n_results:
+                    continue
+                for field in fields:
+                    family[field][query_index].append(results[field][query_index][position])
+        
+        for key, family in per_family.items():
+            family.setdefault('documents', None)
+            self._readiness['collections'][key] = 'ready'
+        return per_family
+    
+    @staticmethod
+    def _select_query_results(results: Dict, query_index: int) -> Dict:
+        """
+        Extrait d'un résultat brut multi-requêtes la part d'une seule requête
+        
+        Args:
+            results: Résultats bruts de collection.query
+            query_index: Position de la requête dans le batch
+            
+        Returns:
+            Résultats bruts au format d'une requête unique
+        """
+        return {
+            field: [results[field][query_index]] if results.get(field) is not None else None
+            for field in ('ids', 'documents', 'metadatas', 'distances')
+        }
+    
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        """
+        Retourne l'embedding de la requête via le cache partagé
+        
+        Args:
+            query: Requête de recherche
+            
+        Returns:
+            Vecteur d'embedding, ou None si l'embedding a échoué (ChromaDB embeddera alors le texte)
+        """
+        embeddings = self._embed_queries([query])
+        return embeddings[0] if embeddings is not None else None
+    
+    def _embed_queries(self, queries: List[str]) -> Optional[List[List[float]]]:
+        """
+        Retourne les embeddings de plusieurs requêtes (un seul appel au modèle pour les absentes du cache)
+        
+        Args:
+            queries: Requêtes de recherche
+            
+        Returns:
+            Vecteurs d'embedding, ou None si l'embedding a échoué (ChromaDB embeddera alors les textes)
+        """
+        try:
+            return self.embedding_cache.get_embeddings(queries)
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur embedding requête, repli sur query_texts: {e}")
+            return None
+    
+    def get_embedding_cache_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache d'embeddings de requêtes
+        
+        Returns:
+            Dictionnaire avec hits, misses, taille et taux de succès
+        """
+        return self.embedding_cache.get_stats()
+    
+    def _fan_out(self, task: Callable[[str], Any], operation: str = "recherche",
+                 collection_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Exécute une tâche sur chaque collection, en parallèle dans un pool borné
+        
+        Chaque collection dispose de `collection_timeout` secondes. Une collection
+        en erreur ou trop lente est journalisée et ignorée : les autres résultats
+        sont retournés (résultats partiels).
+        
+        Args:
+            task: Fonction appelée avec la clé de la collection
+            operation: Libellé de l'opération pour les logs
+            collection_names: Collections concernées (défaut: toutes les collections chargées)
+            
+        Returns:
+            Dictionnaire clé de collection -> résultat de la tâche, dans l'ordre des collections
+        """
+        if collection_names is None:
+            collection_names = list(self.collections.keys())
+        outputs = {}
+        
+        if not self.parallel_search or len(collection_names) <= 1:
+            for collection_name in collection_names:
+                try:
+                    outputs[collection_name] = task(collection_name)
+                except Exception as e:
+                    logger.error(f"❌ Erreur {operation} {collection_name}: {e}")
+            return outputs
+        
+        executor = self._get_executor()
+        futures = {collection_name: executor.submit(task, collection_name) for collection_name in collection_names}
+        wait(list(futures.values()), timeout=self.collection_timeout)
+        
+        for collection_name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                logger.warning(f"⏱️ {operation.capitalize()} {collection_name} abandonnée après {self.collection_timeout}s")
+                continue
+            try:
+                outputs[collection_name] = future.result()
+            except Exception as e:
+                logger.error(f"❌ Erreur {operation} {collection_name}: {e}")
+        
+        return outputs
+    
+    def _stream_fan_out(self, task: Callable[[str], Any], collection_names: List[str]) -> Iterator[Tuple[str, Any]]:
+        """
+        Comme _fan_out, mais transmet le résultat de chaque collection dès qu'il est prêt
+        
+        Args:
+            task: Fonction appelée avec la clé de la collection
+            collection_names: Collections concernées
+            
+        Yields:
+            Tuples (clé de collection, résultat), dans l'ordre d'arrivée
+        """
+        if not self.parallel_search or len(collection_names) <= 1:
+            for collection_name in collection_names:
+                try:
+                    yield collection_name, task(collection_name)
+                except Exception as e:
+                    logger.error(f"❌ Erreur recherche {collection_name}: {e}")
+            return
+        
+        executor = self._get_executor()
+        futures = {executor.submit(task, collection_name): collection_name for collection_name in collection_names}
+        # Échéance mesurée sur l'attente des collections uniquement : le temps passé par le
+        # consommateur entre deux résultats (affichage Streamlit) ne fait pas abandonner
+        # les collections terminées entre-temps
+        deadline = time.perf_counter() + self.collection_timeout
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in [future for future in futures if future in done]:
+                collection_name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Erreur recherche {collection_name}: {e}")
+                    continue
+                yield collection_name, result
+        
+        for future in pending:
+            future.cancel()
+            logger.warning(f"⏱️ Recherche {futures[future]} abandonnée après {self.collection_timeout}s")
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Retourne le pool de threads partagé (créé à la première recherche)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="chromadb-search"
+            )
+        return self._executor
+    
+    def _build_results(self, collection_name: str, results: Dict, default_source: str = 'Inconnu',
+                       extra_fields: Optional[Dict] = None) -> List[Dict]:
+        """
+        Convertit les résultats bruts d'une collection en liste de résultats
+        
+        Args:
+            collection_name: Clé de la collection
+            results: Résultats bruts de collection.query
+            default_source: Source affichée si la métadonnée source_file est absente
+            extra_fields: Champs ajoutés ou remplacés dans chaque résultat
+            
+        Returns:
+            Liste des résultats avec score de pertinence (distance inverse)
+        """
+        formatted_results = []
+        if not results['ids'] or not results['ids'][0]:
+            return formatted_results
+        
+        # Lecture en deux temps : textes absents, complétés plus tard par _fetch_documents
+        documents = results['documents'][0] if results.get('documents') is not None else [None] * len(results['ids'][0])
+        
+        for chunk_id, doc, metadata, distance in zip(
+            results['ids'][0],
+            documents,
+            results['metadatas'][0],
+            results['distances'][0]
+        ):
+            formatted_results.append(self._build_result(
+                collection_name, chunk_id, doc, metadata, distance,
+                default_source=default_source, extra_fields=extra_fields
+            ))
+        
+        return formatted_results
+    
+    def _build_result(self, collection_name: str, chunk_id: str, doc: str, metadata: Optional[Dict],
+                      distance: Optional[float], default_source: str = 'Inconnu',
+                      extra_fields: Optional[Dict] = None) -> Dict:
+        """
+        Construit le dictionnaire d'un résultat de recherche
+        
+        Args:
+            collection_name: Clé de la collection
+            chunk_id: Identifiant ChromaDB du chunk
+            doc: Texte du chunk (None s'il n'a pas encore été lu)
+            metadata: Métadonnées du chunk
+            distance: Distance ChromaDB (None si le chunk ne vient pas de la recherche vectorielle)
+            default_source: Source affichée si la métadonnée source_file est absente
+            extra_fields: Champs ajoutés ou remplacés
+            
+        Returns:
+            Résultat de recherche
+        """
+        metadata = metadata or {}
+        
+        # Calculer un score de pertinence (distance inverse)
+        relevance_score = max(0, 1 - distance) if distance is not None else 0.0
+        
+        result = {
+            'content': doc,
+            'snippet': metadata.get('snippet') or (doc or '')[:self.snippet_length],
+            'metadata': metadata,
+            'collection': collection_name,
+            'chunk_id': chunk_id,
+            'relevance_score': relevance_score,
+            'source': metadata.get('source_file', self.DEFAULT_SOURCES.get(collection_name, default_source)),
+            'article': metadata.get('article', ''),
+            'doc_type': metadata.get('doc_type', '')
+        }
+        if extra_fields:
+            result.update(extra_fields)
+        return result
     
     def _get_source_type(self, collection_name: str) -> str:
         """
@@ -350,26 +1616,70 @@ class ChromaDBSearch:
         }
         return source_types.get(collection_name, collection_name.upper())
     
+    def get_corpus_manifest(self) -> Optional[Dict]:
+        """
+        Retourne le manifeste du corpus écrit à l'ingestion, relu seulement s'il a changé
+        
+        Returns:
+            Manifeste (comptes, dimension, couverture des articles, empreinte), ou None s'il est absent
+        """
+        try:
+            mtime = get_manifest_path().stat().st_mtime_ns
+        except OSError:
+            self._manifest, self._manifest_mtime = None, None
+            return None
+        
+        if mtime != self._manifest_mtime:
+            self._manifest = load_corpus_manifest()
+            self._manifest_mtime = mtime
+            if self._manifest:
+                logger.info(f"📋 Manifeste du corpus chargé: {self._manifest.get('total_chunks', 0)} chunks")
+        return self._manifest
+    
     def get_collection_stats(self) -> Dict:
         """
         Retourne les statistiques des collections
         
+        Les comptes viennent du manifeste du corpus, sans interroger ChromaDB;
+        à défaut, ils sont comptés une fois puis gardés en mémoire.
+        
         Returns:
             Dictionnaire avec les statistiques
         """
+        manifest = self.get_corpus_manifest()
+        if manifest:
+            manifest_collections = manifest.get('collections', {})
+            return {
+                key: manifest_collections[name].get('count', 0)
+                for key, name in self.EXPECTED_COLLECTIONS.items()
+                if name in manifest_collections
+            }
+        
         if not self.is_available:
             return {}
         
-        stats = {}
-        for collection_name, collection in self.collections.items():
-            try:
-                count = collection.count()
-                stats[collection_name] = count
-            except Exception as e:
-                logger.error(f"❌ Erreur stats {collection_name}: {e}")
-                stats[collection_name] = 0
+        if self._live_stats is None:
+            counts = self._fan_out(
+                lambda collection_name: self.collections[collection_name].count(),
+                operation="stats"
+            )
+            # Une collection en erreur est comptée à 0
+            self._live_stats = {collection_name: counts.get(collection_name, 0) for collection_name in self.collections}
+        return dict(self._live_stats)
+    
+    def get_total_chunks(self) -> Optional[int]:
+        """
+        Retourne le nombre total de chunks des collections (pour l'affichage)
+        
+        Appelée au rendu de l'interface : sans manifeste, ChromaDB n'est jamais ouvert
+        ici, le compte n'est donné qu'une fois les collections chargées.
         
-        return stats
+        Returns:
+            Nombre de chunks, ou None s'il n'est pas encore connu
+        """
+        if self.get_corpus_manifest() is None and self._collections is None:
+            return None
+        return sum(self.get_collection_stats().values())
 
 # Instance globale
 chromadb_search = None
@@ -450,6 +1760,10 @@ def test_chromadb_search():
             for i, result in enumerate(deont_results[:2]):
                 print(f"    {i+1}. {result['article']} (score: {result['relevance_score']:.2f})")
                 print(f"       {result['content'][:80]}...")
+    
+    # Cache des embeddings de requêtes
+    cache_stats = search.get_embedding_cache_stats()
+    print(f"\n🧠 Cache embeddings: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
 
 if __name__ == "__main__":
     test_chromadb_search() 
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+Index des chunks voisins pour LegalDocBot
+Chunk précédent et suivant de chaque chunk (même source, chunk_index consécutifs), calculé à l'ingestion,
+pour recoller le texte complet d'un article découpé sur plusieurs chunks
+"""
+
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NEIGHBOUR_INDEX_FILENAME = "neighbour_index.json"
+
+
+def get_neighbour_index_path(chroma_path: str = "chroma_db") -> Path:
+    """Retourne le chemin de l'index des voisins d'une base ChromaDB"""
+    return Path(chroma_path) / NEIGHBOUR_INDEX_FILENAME
+
+
+def build_neighbour_index(chroma_path: str = "chroma_db", page_size: int = 1000) -> Dict[str, Dict[str, List]]:
+    """
+    Calcule le chunk précédent et suivant de chaque chunk de toutes les collections
+
+    Les chunks sont regroupés par source (métadonnée source, ou source_file)
+    et ordonnés par chunk_index; les chunks sans chunk_index sont ignorés.
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+        page_size: Nombre de chunks lus par page
+
+    Returns:
+        Dictionnaire collection -> {chunk_id: [id précédent ou None, id suivant ou None]}
+    """
+    import chromadb
+
+    client = chromadb.PersistentClient(path=chroma_path)
+    index = {}
+
+    for collection in sorted(client.list_collections(), key=lambda c: c.name):
+        collection = client.get_collection(collection.name)
+        chunks_by_source = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+                metadata = metadata or {}
+                source = metadata.get("source") or metadata.get("source_file")
+                try:
+                    chunk_index = int(metadata["chunk_index"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if source:
+                    chunks_by_source.setdefault(source, []).append((chunk_index, chunk_id))
+            offset += len(page["ids"])
+            if len(page["ids"]) < page_size:
+                break
+
+        neighbours = {}
+        for chunks in chunks_by_source.values():
+            chunks.sort()
+            for position, (chunk_index, chunk_id) in enumerate(chunks):
+                previous_id = chunks[position - 1][1] if position > 0 and chunks[position - 1][0] == chunk_index - 1 else None
+                next_id = chunks[position + 1][1] if position + 1 < len(chunks) and chunks[position + 1][0] == chunk_index + 1 else None
+                neighbours[chunk_id] = [previous_id, next_id]
+        index[collection.name] = neighbours
+        logger.info(f"✅ {collection.name}: voisins de {len(neighbours)} chunks ({len(chunks_by_source)} sources)")
+
+    return index
+
+
+def write_neighbour_index(chroma_path: str = "chroma_db") -> Dict[str, Dict[str, List]]:
+    """
+    Calcule et enregistre l'index des voisins d'une base ChromaDB (écriture atomique)
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+
+    Returns:
+        Index enregistré
+    """
+    index = build_neighbour_index(chroma_path)
+    index_path = get_neighbour_index_path(chroma_path)
+    temporary_path = index_path.with_suffix(".json.tmp")
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(temporary_path, index_path)
+    logger.info(f"🔗 Index des voisins écrit: {sum(len(n) for n in index.values())} chunks ({index_path})")
+    return index
+
+
+def load_neighbour_index(chroma_path: str = "chroma_db") -> Optional[Dict[str, Dict[str, List]]]:
+    """
+    Lit l'index des voisins d'une base ChromaDB
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+
+    Returns:
+        Index des voisins, ou None s'il est absent ou illisible
+    """
+    index_path = get_neighbour_index_path(chroma_path)
+    if not index_path.exists():
+        return None
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ Index des voisins illisible ({index_path}): {e}")
+        return None
+
+
+def collect_neighbour_ids(neighbours: Dict[str, List], chunk_id: str, window: int = 1) -> List[str]:
+    """
+    Retourne les ids des chunks entourant un chunk, dans l'ordre du texte
+
+    Args:
+        neighbours: Voisins d'une collection (chunk_id -> [précédent, suivant])
+        chunk_id: Chunk central
+        window: Nombre de voisins de chaque côté
+
+    Returns:
+        Ids dans l'ordre du document, chunk central compris
+    """
+    before, after = [], []
+    current = chunk_id
+    for _ in range(window):
+        current = (neighbours.get(current) or [None, None])[0]
+        if current is None:
+            break
+        before.append(current)
+    current = chunk_id
+    for _ in range(window):
+        current = (neighbours.get(current) or [None, None])[1]
+        if current is None:
+            break
+        after.append(current)
+    return before[::-1] + [chunk_id] + after
+
+
+def merge_overlapping(texts: List[str], min_overlap: int = 20, max_overlap: int = 400) -> str:
+    """
+    Recolle des chunks consécutifs en supprimant le texte répété par le chevauchement
+
+    Le découpage à l'ingestion répète environ 200 caractères d'un chunk à l'autre;
+    le début de chaque chunk est recherché dans la fin du texte déjà recollé.
+
+    Args:
+        texts: Textes des chunks, dans l'ordre du document
+        min_overlap: Longueur minimale d'un chevauchement reconnu
+        max_overlap: Longueur maximale du chevauchement recherché
+
+    Returns:
+        Texte continu
+    """
+    merged = ""
+    for text in texts:
+        text = (text or "").strip()
+        if not text:
+            continue
+        if not merged:
+            merged = text
+            continue
+        tail_start = max(0, len(merged) - max_overlap)
+        position = merged.find(text[:min_overlap], tail_start)
+        while position != -1 and not text.startswith(merged[position:]):
+            position = merged.find(text[:min_overlap], position + 1)
+        if position != -1 and len(merged) - position >= min_overlap:
+            merged += text[len(merged) - position:]
+        else:
+            merged += " " + text
+    return merged
+
+
+if __name__ == "__main__":
+    print("🔗 INDEX DES CHUNKS VOISINS")
+    print("=" * 40)
+    result = write_neighbour_index(sys.argv[1] if len(sys.argv) > 1 else "chroma_db")
+    for name, neighbours in result.items():
+        linked = sum(1 for previous_id, next_id in neighbours.values() if previous_id or next_id)
+        print(f"  - {name}: {len(neighbours)} chunks, {linked} avec au moins un voisin")
@@ -981,6 +981,15 @@ API_CONFIG = {
 }
 
 # --- CONFIGURATION RAG ---
+# Clé interne -> nom de la collection ChromaDB
+CHROMADB_COLLECTIONS = {
+    'deontologie': 'deontologie',
+    'csp': 'csp_legislation',
+    'css': 'css_legislation',
+    'penal': 'penal_legislation',
+    'civil': 'civil_legislation'
+}
+
 RAG_CONFIG = {
     "embedding_model": "all-MiniLM-L6-v2",
     "chunk_size": 512,
@@ -996,9 +1005,92 @@ RAG_CONFIG = {
         "penal_legislation": "Code Pénal",
         "civil_legislation": "Code Civil",
         "deontologie": "Déontologie Médicale"
+    },
+    "retrieval": {
+        "mode": "dense",  # "dense" (ANN ChromaDB) ou "hybrid" (BM25 + dense, fusion RRF)
+        "rrf_k": 60,  # Constante de la Reciprocal Rank Fusion
+        "vector_backend": "chroma",  # "chroma" (HNSW), "numpy_flat" (exact, export .npy) ou "numpy_int8" (basse mémoire)
+        "flat_index_path": "chroma_db/flat_index",  # Export produit par: python vector_backends.py export
+        "int8_rescore_factor": 4,  # numpy_int8 : candidats re-scorés en float32 = top_k x facteur
+        "parallel_search": True,  # Interroger les collections en parallèle
+        "max_workers": 5,  # Une collection par thread
+        "collection_timeout": 10.0,  # Secondes avant d'abandonner une collection lente
+        "embedding_cache_size": 256,  # Requêtes dont l'embedding est gardé en mémoire
+        "two_phase_fetch": True,  # Ids/distances/métadonnées d'abord, textes seulement pour les candidats retenus
+        "preselect_candidates": 40,  # Candidats retenus par requête avant lecture des textes et reranking
+        "snippet_length": 300,  # Longueur de l'extrait stocké dans les métadonnées à l'ingestion
+        "query_expansion": "off",  # "off", "heuristic" (local) ou "llm" (Grok-4, QUERY_GENERATION_PROMPT_TEMPLATE)
+        "expansion_max_queries": 4,  # Sous-requêtes ajoutées à la situation (fusion RRF)
+        "expansion_min_words": 25,  # Les situations plus courtes ne sont pas étendues
+        "segmentation_min_words": 120,  # Au-delà, la situation est découpée en fenêtres de phrases
+        "segment_window_sentences": 3,  # Phrases par fenêtre (chevauchement d'une phrase)
+        "segment_max_windows": 6,  # Plafond de fenêtres par requête (borne la latence)
+        "segment_pooling": "max",  # Agrégation des scores par chunk : "max" ou "sum" (moyenne sur les fenêtres)
+        "collection_layout": "split",  # "split" (5 collections) ou "merged" (legal_corpus, migration: python legal_corpus.py migrate)
+        "merged_collection": "legal_corpus",  # Collection fusionnée, métadonnée "code" = clé de la famille
+        "merged_oversample": 2,  # Mode merged : candidats demandés = quota par famille x familles x facteur
+        "neighbour_expansion": False,  # Recoller les chunks voisins des meilleurs résultats (index: python chunk_neighbours.py)
+        "neighbour_window": 1,  # Chunks voisins ajoutés de chaque côté
+        "neighbour_expand_top": 5  # Résultats finaux complétés par leurs voisins
+    },
+    "reranking": {
+        "cross_encoder_model": "cross-encoder/ms-marco-MiniLM-L-6-v2",  # Chargé une fois par processus (model_registry)
+        "batch_size": 32,  # Paires (requête, chunk) par mini-batch cross-encoder
+        "inference_backend": "torch",  # "torch" (sentence_transformers) ou "onnx" (onnxruntime CPU, repli sur torch)
+        "onnx": {
+            "quantize_int8": True,  # Quantification dynamique int8 des poids (benchmark: python onnx_reranker.py benchmark)
+            "intra_op_threads": 4,  # Threads onnxruntime par opérateur
+            "max_length": 512,  # Tokens maximum par paire (requête, chunk)
+            "cache_dir": ".cache/onnx"  # Exports ONNX, un sous-dossier par modèle
+        },
+        "cascade": {
+            "enabled": True,  # Seuls les meilleurs candidats (ChromaDB + bonus de source) passent par le cross-encoder
+            "keep": 10,  # Résultats gardés après reranking unifié
+            "min_candidates": 20,  # Budget minimum de candidats cross-encodés par requête
+            "max_candidates": 40,  # Budget maximum (au lieu de tous les candidats, jusqu'à 75)
+            "latency_budget_ms": 250,  # Budget de scoring par requête : N = budget / latence mesurée par paire
+            "step": 8  # Candidats scorés par paquet entre deux tests de coupure anticipée
+        },
+        "score_cache": {
+            "enabled": True,  # Ne pas rescorer une paire (requête, contenu du chunk) déjà vue
+            "max_entries": 20000,  # Scores gardés en mémoire (éviction LRU)
+            "persist": False,  # Conserver les scores entre les sessions (SQLite)
+            "path": ".cache/rerank_scores.sqlite"
+        }
+    },
+    "result_cache": {
+        "enabled": True,  # Cache disque des résultats de search_unified_legal_knowledge
+        "path": ".cache/search_results.sqlite",
+        "chroma_path": "chroma_db",  # Base dont la version invalide les entrées
+        "ttl_seconds": 86400,  # Durée de validité d'une entrée (24h)
+        "max_entries": 2000  # Au-delà, éviction des entrées les moins récemment utilisées
+    },
+    "semantic_cache": {
+        "enabled": True,  # Réutiliser les résultats d'une situation quasi identique déjà analysée
+        "similarity_threshold": 0.92,  # Cosinus minimal pour réutiliser les résultats de recherche
+        "analysis_similarity_threshold": 0.97,  # Cosinus minimal (plus strict) pour réutiliser l'analyse Grok-4
+        "max_length_ratio": 1.25,  # Écart de longueur maximal (en mots) entre deux situations rapprochées
+        "cache_analysis": True,  # Réutiliser l'analyse Grok-4 d'une reformulation très proche (voir seuil ci-dessus)
+        "max_entries": 500  # Situations gardées en mémoire (éviction LRU)
     }
 }
 
+# Requêtes fixes pour comparer les réglages de recherche (rappel, latence)
+RETRIEVAL_BENCHMARK_QUERIES = [
+    "secret médical et responsabilité médicale",
+    "consentement éclairé du patient avant une intervention chirurgicale",
+    "obligation d'information sur les risques d'un traitement",
+    "infection nosocomiale contractée dans un établissement de santé",
+    "erreur de diagnostic et perte de chance",
+    "indemnisation par l'ONIAM d'un accident médical non fautif",
+    "article L.1142-1 du Code de la santé publique",
+    "article R.4127-35 du code de déontologie médicale",
+    "homicide involontaire par un médecin",
+    "responsabilité civile et réparation du dommage corporel",
+    "remboursement des soins par la sécurité sociale",
+    "accès au dossier médical par le patient ou ses ayants droit"
+]
+
 # --- CONFIGURATION UI ---
 UI_CONFIG = {
     "title": "⚖️ LegalDocBot - Expert Médico-Légal",
@@ -0,0 +1,145 @@
+"""
+Manifeste du corpus ChromaDB pour LegalDocBot
+Statistiques calculées à l'ingestion (chunks, dimension, couverture des articles, empreinte)
+pour que l'application n'interroge pas ChromaDB à chaque affichage
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from article_index import normalize_article_ref
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "corpus_manifest.json"
+
+
+def get_manifest_path(chroma_path: str = "chroma_db") -> Path:
+    """Retourne le chemin du manifeste d'une base ChromaDB"""
+    return Path(chroma_path) / MANIFEST_FILENAME
+
+
+def update_content_digest(digest, chunk_id: str, document: Optional[str]):
+    """Ajoute un chunk à l'empreinte de contenu d'une collection (identifiant + texte)"""
+    digest.update(chunk_id.encode("utf-8"))
+    digest.update(hashlib.sha1((document or "").encode("utf-8")).digest())
+
+
+def build_corpus_manifest(chroma_path: str = "chroma_db", page_size: int = 1000) -> Dict:
+    """
+    Parcourt toutes les collections ChromaDB et calcule leurs statistiques
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+        page_size: Nombre de chunks lus par page
+
+    Returns:
+        Manifeste : statistiques par collection, total de chunks et empreinte du contenu
+    """
+    import chromadb
+
+    client = chromadb.PersistentClient(path=chroma_path)
+    manifest = {"created_at": datetime.now().isoformat(timespec="seconds"), "collections": {}}
+    corpus_digest = hashlib.sha1()
+
+    for collection in sorted(client.list_collections(), key=lambda c: c.name):
+        collection = client.get_collection(collection.name)
+        digest = hashlib.sha1()
+        articles = set()
+        count = 0
+        chunks_with_article = 0
+        dimension = None
+
+        offset = 0
+        while True:
+            include = ["documents", "metadatas"] if dimension is not None else ["documents", "metadatas", "embeddings"]
+            page = collection.get(include=include, limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            if dimension is None and page.get("embeddings") is not None and len(page["embeddings"]):
+                dimension = len(page["embeddings"][0])
+            for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                update_content_digest(digest, chunk_id, document)
+                article_id = normalize_article_ref((metadata or {}).get("article", ""))
+                if article_id:
+                    articles.add(article_id)
+                    chunks_with_article += 1
+            count += len(page["ids"])
+            offset += len(page["ids"])
+            if len(page["ids"]) < page_size:
+                break
+
+        content_hash = digest.hexdigest()
+        corpus_digest.update(f"{collection.name}:{content_hash}\n".encode("utf-8"))
+        manifest["collections"][collection.name] = {
+            "count": count,
+            "embedding_dimension": dimension,
+            "distinct_articles": len(articles),
+            "chunks_with_article": chunks_with_article,
+            "article_coverage": round(chunks_with_article / count, 3) if count else 0.0,
+            "content_hash": content_hash[:16]
+        }
+        logger.info(f"✅ {collection.name}: {count} chunks, {len(articles)} articles distincts")
+
+    manifest["total_chunks"] = sum(info["count"] for info in manifest["collections"].values())
+    manifest["content_hash"] = corpus_digest.hexdigest()[:16]
+    return manifest
+
+
+def write_corpus_manifest(chroma_path: str = "chroma_db") -> Dict:
+    """
+    Calcule et enregistre le manifeste d'une base ChromaDB (écriture atomique)
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+
+    Returns:
+        Manifeste enregistré
+    """
+    manifest = build_corpus_manifest(chroma_path)
+    manifest_path = get_manifest_path(chroma_path)
+    temporary_path = manifest_path.with_suffix(".json.tmp")
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temporary_path, manifest_path)
+    logger.info(f"📋 Manifeste du corpus écrit: {manifest['total_chunks']} chunks ({manifest_path})")
+    return manifest
+
+
+def load_corpus_manifest(chroma_path: str = "chroma_db") -> Optional[Dict]:
+    """
+    Lit le manifeste d'une base ChromaDB
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+
+    Returns:
+        Manifeste, ou None s'il est absent ou illisible
+    """
+    manifest_path = get_manifest_path(chroma_path)
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ Manifeste du corpus illisible ({manifest_path}): {e}")
+        return None
+
+
+if __name__ == "__main__":
+    print("📋 MANIFESTE DU CORPUS CHROMADB")
+    print("=" * 40)
+    result = write_corpus_manifest(sys.argv[1] if len(sys.argv) > 1 else "chroma_db")
+    for name, info in result["collections"].items():
+        print(f"  - {name}: {info['count']} chunks, {info['embedding_dimension']} dimensions, "
+              f"{info['distinct_articles']} articles ({info['article_coverage']:.0%} des chunks)")
+    print(f"  Total: {result['total_chunks']} chunks - empreinte {result['content_hash']}")
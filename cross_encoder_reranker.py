@@ -7,8 +7,9 @@ import json
 import re
 from typing import List, Dict, Optional, Tuple
 import logging
-from sentence_transformers import CrossEncoder
 import numpy as np
+from config import RAG_CONFIG
+from model_registry import get_model_registry
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -19,21 +20,28 @@ class CrossEncoderReranker:
     Système de reranking avec cross-encoder spécialisé pour le droit médical français
     """
     
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None):
         """
-        Initialise le cross-encoder
+        Initialise le reranker sur le cross-encoder partagé du registre des modèles
         
         Args:
-            model_name: Nom du modèle cross-encoder à utiliser
+            model_name: Nom du modèle cross-encoder à utiliser (défaut: RAG_CONFIG)
+            batch_size: Taille des mini-batches de scoring (défaut: RAG_CONFIG)
         """
-        try:
-            self.model = CrossEncoder(model_name)
-            logger.info(f"✅ Cross-encoder chargé: {model_name}")
-            self.is_available = True
-        except Exception as e:
-            logger.error(f"❌ Erreur chargement cross-encoder: {e}")
-            self.is_available = False
-            self.model = None
+        self.batch_size = batch_size or RAG_CONFIG["reranking"]["batch_size"]
+        self.scorer = get_model_registry().get_cross_encoder(model_name)
+        if self.scorer.is_available:
+            logger.info(f"✅ Cross-encoder prêt: {self.scorer.model_name}")
+    
+    @property
+    def is_available(self) -> bool:
+        """Le cross-encoder partagé est chargé"""
+        return self.scorer.is_available
+    
+    @property
+    def model(self):
+        """Modèle CrossEncoder partagé (None s'il n'a pas pu être chargé)"""
+        return self.scorer.model
     
     def calculate_relevance_score(self, query: str, document: str) -> float:
         """
@@ -46,25 +54,32 @@ class CrossEncoderReranker:
         Returns:
             Score de pertinence (0-1)
         """
-        if not self.is_available or not self.model:
-            return 0.5  # Score par défaut
+        return self.score_pairs([(query, document)])[0]
+    
+    def calculate_relevance_scores(self, query: str, documents: List[str]) -> List[float]:
+        """
+        Calcule les scores de pertinence d'une requête contre plusieurs documents
         
-        try:
-            # Préparation des paires query-document
-            pairs = [[query, document]]
-            
-            # Calcul des scores
-            scores = self.model.predict(pairs)
-            
-            # Normalisation (les scores peuvent être négatifs)
-            score = float(scores[0])
-            normalized_score = max(0.0, min(1.0, (score + 1) / 2))  # Normalisation 0-1
+        Args:
+            query: Requête utilisateur
+            documents: Documents à évaluer
             
-            return normalized_score
+        Returns:
+            Scores de pertinence (0-1), dans l'ordre des documents
+        """
+        return self.score_pairs([(query, document) for document in documents])
+    
+    def score_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """
+        Score un lot de paires (requête, document) avec le cross-encoder partagé
+        
+        Args:
+            pairs: Liste de paires (requête, document)
             
-        except Exception as e:
-            logger.error(f"❌ Erreur calcul score: {e}")
-            return 0.5
+        Returns:
+            Scores de pertinence (0-1), dans l'ordre des paires
+        """
+        return self.scorer.score_pairs(pairs, batch_size=self.batch_size)
     
     def rerank_jurisprudence_results(self, results: List[Dict], query: str) -> List[Dict]:
         """
@@ -82,15 +97,12 @@ class CrossEncoderReranker:
         
         logger.info(f"🔍 Reranking {len(results)} résultats jurisprudence avec cross-encoder...")
         
-        # Calcul des scores pour chaque résultat
+        # Calcul des scores de pertinence en un seul batch
+        document_texts = [f"{result.get('title', '')} {result.get('snippet', '')}" for result in results]
+        relevance_scores = self.calculate_relevance_scores(query, document_texts)
+        
         scored_results = []
-        for result in results:
-            # Création du texte du document
-            document_text = f"{result.get('title', '')} {result.get('snippet', '')}"
-            
-            # Calcul du score de pertinence
-            relevance_score = self.calculate_relevance_score(query, document_text)
-            
+        for result, relevance_score in zip(results, relevance_scores):
             # Score bonus pour les sources importantes
             source_bonus = self._calculate_source_bonus(result.get('source', ''), 'jurisprudence')
             
@@ -125,15 +137,12 @@ class CrossEncoderReranker:
         
         logger.info(f"🔍 Reranking {len(results)} résultats ONIAM avec cross-encoder...")
         
-        # Calcul des scores pour chaque résultat
+        # Calcul des scores de pertinence en un seul batch
+        document_texts = [f"{result.get('title', '')} {result.get('snippet', '')}" for result in results]
+        relevance_scores = self.calculate_relevance_scores(query, document_texts)
+        
         scored_results = []
-        for result in results:
-            # Création du texte du document
-            document_text = f"{result.get('title', '')} {result.get('snippet', '')}"
-            
-            # Calcul du score de pertinence
-            relevance_score = self.calculate_relevance_score(query, document_text)
-            
+        for result, relevance_score in zip(results, relevance_scores):
             # Score bonus pour les sources importantes
             source_bonus = self._calculate_source_bonus(result.get('source', ''), 'oniam')
             
@@ -240,11 +249,11 @@ class CrossEncoderReranker:
             
             logger.info(f"🔍 Reranking {len(results)} résultats généraux avec cross-encoder...")
             
+            document_texts = [f"{result.get('title', '')} {result.get('snippet', '')}" for result in results]
+            relevance_scores = self.calculate_relevance_scores(query, document_texts)
+            
             scored_results = []
-            for result in results:
-                document_text = f"{result.get('title', '')} {result.get('snippet', '')}"
-                relevance_score = self.calculate_relevance_score(query, document_text)
-                
+            for result, relevance_score in zip(results, relevance_scores):
                 scored_results.append({
                     **result,
                     'llm_score': round(relevance_score * 10, 1),
@@ -13,6 +13,12 @@ import chromadb
 from chromadb.config import Settings
 import PyPDF2
 import fitz  # PyMuPDF
+from config import RAG_CONFIG
+from result_cache import get_search_result_cache
+from chunk_neighbours import write_neighbour_index
+from corpus_manifest import load_corpus_manifest, write_corpus_manifest
+from ranking_features import chunk_feature_metadata, write_chunk_features
+from tune_hnsw import hnsw_collection_metadata, load_hnsw_params
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -34,10 +40,13 @@ class DocumentProcessor:
             settings=Settings(anonymized_telemetry=False)
         )
         
-        # Collection pour les documents
+        # Collection pour les documents (paramètres HNSW retenus par tune_hnsw.py, à la création)
         self.collection = self.client.get_or_create_collection(
             name="legal_documents",
-            metadata={"description": "Base de connaissances juridique"}
+            metadata=hnsw_collection_metadata(
+                load_hnsw_params(str(self.chroma_db_path)),
+                {"description": "Base de connaissances juridique"}
+            )
         )
     
     def extract_text_from_pdf(self, pdf_path: Path) -> str:
@@ -86,12 +95,17 @@ class DocumentProcessor:
             for i, chunk in enumerate(chunks):
                 doc_id = f"{pdf_path.stem}_{i}"
                 documents.append(chunk)
-                metadatas.append({
+                metadata = {
                     "source": pdf_path.name,
                     "chunk_index": i,
                     "total_chunks": len(chunks),
-                    "file_path": str(pdf_path)
-                })
+                    "file_path": str(pdf_path),
+                    # Extrait court : affichage sans relire le texte complet du chunk
+                    "snippet": chunk[:RAG_CONFIG["retrieval"]["snippet_length"]]
+                }
+                # Caractéristiques de classement calculées une fois (bonus du reranker)
+                metadata.update(chunk_feature_metadata(self.collection.name, metadata))
+                metadatas.append(metadata)
                 ids.append(doc_id)
             
             # Insérer dans ChromaDB
@@ -101,6 +115,9 @@ class DocumentProcessor:
                 ids=ids
             )
             
+            # Les résultats de recherche en cache ne reflètent plus le corpus
+            get_search_result_cache().invalidate()
+            
             logger.info(f"✅ {pdf_path.name} traité: {len(chunks)} chunks ajoutés")
             return True
             
@@ -108,6 +125,21 @@ class DocumentProcessor:
             logger.error(f"❌ Erreur traitement {pdf_path.name}: {e}")
             return False
     
+    def _refresh_corpus_manifest(self):
+        """Réécrit le manifeste du corpus, l'index des chunks voisins et les caractéristiques de classement"""
+        try:
+            write_corpus_manifest(str(self.chroma_db_path))
+        except Exception as e:
+            logger.warning(f"⚠️ Manifeste du corpus non mis à jour: {e}")
+        try:
+            write_neighbour_index(str(self.chroma_db_path))
+        except Exception as e:
+            logger.warning(f"⚠️ Index des chunks voisins non mis à jour: {e}")
+        try:
+            write_chunk_features(str(self.chroma_db_path))
+        except Exception as e:
+            logger.warning(f"⚠️ Caractéristiques de classement non mises à jour: {e}")
+    
     def _split_text_into_chunks(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """Découpe le texte en chunks avec overlap"""
         chunks = []
@@ -160,6 +192,9 @@ class DocumentProcessor:
             else:
                 failed_count += 1
         
+        if success_count:
+            self._refresh_corpus_manifest()
+        
         # Statistiques
         stats = {
             "success": success_count,
@@ -194,12 +229,17 @@ class DocumentProcessor:
             return False
         
         # Traiter le document
-        return self.process_single_document(dest_path)
+        success = self.process_single_document(dest_path)
+        if success:
+            self._refresh_corpus_manifest()
+        return success
     
     def get_collection_stats(self) -> dict:
-        """Retourne les statistiques de la collection ChromaDB"""
+        """Retourne les statistiques de la collection ChromaDB (manifeste du corpus si disponible)"""
         try:
-            count = self.collection.count()
+            manifest = load_corpus_manifest(str(self.chroma_db_path))
+            collection_info = (manifest or {}).get("collections", {}).get(self.collection.name)
+            count = collection_info["count"] if collection_info else self.collection.count()
             return {
                 "total_documents": count,
                 "collection_name": self.collection.name,
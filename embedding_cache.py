@@ -0,0 +1,130 @@
+"""
+Cache des embeddings de requêtes pour LegalDocBot
+Évite de recalculer l'embedding d'une même requête pour chaque collection ChromaDB
+"""
+
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class QueryEmbeddingCache:
+    """
+    Cache LRU des embeddings de requêtes, indexé par le texte normalisé
+    """
+
+    def __init__(self, embedding_function: Optional[Callable] = None, max_size: int = 256):
+        """
+        Initialise le cache
+
+        Args:
+            embedding_function: Fonction d'embedding ChromaDB (défaut: celle des collections ChromaDB)
+            max_size: Nombre maximum de requêtes conservées
+        """
+        self._embedding_function = embedding_function
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        Normalise une requête pour la clé de cache (Unicode NFC, espaces compactés)
+
+        Args:
+            query: Requête brute
+
+        Returns:
+            Requête normalisée
+        """
+        return " ".join(unicodedata.normalize("NFC", query).split())
+
+    def get_embedding(self, query: str) -> List[float]:
+        """
+        Retourne l'embedding d'une requête, calculé au plus une fois
+
+        Args:
+            query: Requête de recherche
+
+        Returns:
+            Vecteur d'embedding
+        """
+        return self.get_embeddings([query])[0]
+
+    def get_embeddings(self, queries: List[str]) -> List[List[float]]:
+        """
+        Retourne les embeddings de plusieurs requêtes; les requêtes absentes
+        du cache sont embeddées en un seul appel
+
+        Args:
+            queries: Requêtes de recherche
+
+        Returns:
+            Vecteurs d'embedding, dans l'ordre des requêtes
+        """
+        keys = [self.normalize_query(query) for query in queries]
+        embeddings = {}
+
+        with self._lock:
+            for key in keys:
+                if key in embeddings:
+                    continue
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    embeddings[key] = self._entries[key]
+                    self.hits += 1
+
+        missing = [key for key in dict.fromkeys(keys) if key not in embeddings]
+        if missing:
+            computed = self._get_embedding_function()(missing)
+            with self._lock:
+                for key, embedding in zip(missing, computed):
+                    embedding = [float(value) for value in embedding]
+                    embeddings[key] = embedding
+                    self._entries[key] = embedding
+                    self._entries.move_to_end(key)
+                    self.misses += 1
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return [embeddings[key] for key in keys]
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache
+
+        Returns:
+            Dictionnaire avec hits, misses, taille et taux de succès
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0
+            }
+
+    def clear(self):
+        """Vide le cache et remet les compteurs à zéro"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _get_embedding_function(self) -> Callable:
+        """Retourne la fonction d'embedding (chargée au premier besoin)"""
+        if self._embedding_function is None:
+            from chromadb.utils import embedding_functions
+            # Même fonction que celle utilisée par les collections pour query_texts
+            self._embedding_function = embedding_functions.DefaultEmbeddingFunction()
+            logger.info("✅ Fonction d'embedding des requêtes chargée")
+        return self._embedding_function
@@ -7,6 +7,7 @@ Vérifie le contenu et l'état de la base de données
 import chromadb
 from pathlib import Path
 import os
+from corpus_manifest import load_corpus_manifest
 
 def inspect_chromadb():
     """Inspecte le contenu de la base ChromaDB"""
@@ -34,6 +35,15 @@ def inspect_chromadb():
         client = chromadb.PersistentClient(path='chroma_db')
         print("✅ Connexion ChromaDB réussie")
         
+        # Statistiques du manifeste (écrit à l'ingestion) plutôt que des comptages en direct
+        manifest = load_corpus_manifest(str(chroma_path))
+        manifest_collections = (manifest or {}).get("collections", {})
+        if manifest:
+            print(f"\n📋 Manifeste du corpus ({manifest.get('created_at', '?')}): "
+                  f"{manifest.get('total_chunks', 0)} chunks, empreinte {manifest.get('content_hash', '?')}")
+        else:
+            print("\n⚠️ Pas de manifeste du corpus (générer avec: python corpus_manifest.py)")
+        
         # Lister les collections
         print("\n📚 Collections disponibles:")
         collections = client.list_collections()
@@ -43,7 +53,14 @@ def inspect_chromadb():
         else:
             for collection in collections:
                 print(f"  📖 {collection.name}")
-                print(f"    - Nombre de documents: {collection.count()}")
+                info = manifest_collections.get(collection.name)
+                if info:
+                    print(f"    - Nombre de documents: {info['count']}")
+                    print(f"    - Dimension des embeddings: {info['embedding_dimension']}")
+                    print(f"    - Articles distincts: {info['distinct_articles']} "
+                          f"({info['article_coverage']:.0%} des chunks rattachés à un article)")
+                else:
+                    print(f"    - Nombre de documents: {collection.count()}")
                 
                 # Afficher quelques métadonnées si disponibles
                 try:
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Collection fusionnée legal_corpus pour LegalDocBot
+Migration des cinq collections ChromaDB vers une seule collection (métadonnée "code")
+et comparaison de latence entre les deux organisations
+"""
+
+import logging
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+from config import CHROMADB_COLLECTIONS, RAG_CONFIG, RETRIEVAL_BENCHMARK_QUERIES
+from ranking_features import chunk_feature_metadata
+from tune_hnsw import hnsw_collection_metadata, load_hnsw_params
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate_to_legal_corpus(chroma_path: str = "chroma_db", target_name: Optional[str] = None,
+                            page_size: int = 1000) -> Dict:
+    """
+    Copie les chunks des cinq collections (embeddings compris) dans une collection fusionnée
+
+    Chaque chunk reçoit la métadonnée "code" (clé de sa famille : deontologie, csp, ...)
+    et ses caractéristiques de classement (ranking_features).
+    Les identifiants sont conservés, sauf collision entre collections (préfixés par la famille).
+    Les collections d'origine ne sont pas modifiées.
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+        target_name: Nom de la collection fusionnée (défaut: RAG_CONFIG)
+        page_size: Nombre de chunks copiés par page
+
+    Returns:
+        Nombre de chunks copiés par famille
+    """
+    import chromadb
+
+    target_name = target_name or RAG_CONFIG["retrieval"]["merged_collection"]
+    client = chromadb.PersistentClient(path=chroma_path)
+    available = [c.name for c in client.list_collections()]
+
+    if target_name in available:
+        logger.info(f"🗑️ Suppression de l'ancienne collection {target_name}")
+        client.delete_collection(target_name)
+
+    sources = [(key, name) for key, name in CHROMADB_COLLECTIONS.items() if name in available]
+    if not sources:
+        raise ValueError(f"Aucune collection à fusionner dans {chroma_path}")
+
+    # Même espace de distance que les collections d'origine, paramètres HNSW retenus par tune_hnsw.py
+    space = (client.get_collection(sources[0][1]).metadata or {}).get("hnsw:space", "l2")
+    target = client.create_collection(
+        target_name,
+        metadata=hnsw_collection_metadata(
+            dict({"space": space}, **load_hnsw_params(chroma_path)),
+            {"description": "Base juridique fusionnée (métadonnée code)"}
+        )
+    )
+
+    copied = {}
+    seen_ids = set()
+    for key, collection_name in sources:
+        collection = client.get_collection(collection_name)
+        copied[key] = 0
+        offset = 0
+        while True:
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            ids = [chunk_id if chunk_id not in seen_ids else f"{key}:{chunk_id}" for chunk_id in page["ids"]]
+            seen_ids.update(ids)
+            metadatas = [
+                dict(metadata or {}, code=key, **chunk_feature_metadata(key, metadata or {}))
+                for metadata in page["metadatas"]
+            ]
+            target.add(ids=ids, embeddings=page["embeddings"], documents=page["documents"], metadatas=metadatas)
+            copied[key] += len(ids)
+            offset += len(page["ids"])
+            if len(page["ids"]) < page_size:
+                break
+        logger.info(f"✅ {collection_name} -> {target_name}: {copied[key]} chunks")
+
+    return copied
+
+
+def benchmark_layouts(queries: Optional[List[str]] = None, n_results: int = 15, repeats: int = 3) -> Dict:
+    """
+    Compare la latence de la première étape de recherche (sans reranking)
+    entre les cinq collections séparées et la collection fusionnée
+
+    Args:
+        queries: Requêtes de test (défaut: RETRIEVAL_BENCHMARK_QUERIES)
+        n_results: Candidats par famille
+        repeats: Passages par requête (le premier préchauffe les caches)
+
+    Returns:
+        Latences p50/p95 (ms) et nombre moyen de candidats par organisation
+    """
+    from chromadb_search import ChromaDBSearch
+
+    queries = queries or RETRIEVAL_BENCHMARK_QUERIES
+    report = {}
+    original_layout = RAG_CONFIG["retrieval"]["collection_layout"]
+    try:
+        for layout in ("split", "merged"):
+            RAG_CONFIG["retrieval"]["collection_layout"] = layout
+            search = ChromaDBSearch()
+            if not search.is_available:
+                continue
+            if layout == "merged" and search.merged_collection is None:
+                logger.warning("⚠️ Collection fusionnée absente (lancer: python legal_corpus.py migrate)")
+                continue
+
+            # Embeddings en cache : seule la recherche est mesurée
+            search.embedding_cache.get_embeddings(queries)
+            timings = []
+            candidates = []
+            for query in queries:
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    results = search._search_collections(query, n_results)
+                    timings.append((time.perf_counter() - start) * 1000)
+                candidates.append(len(results))
+
+            timings.sort()
+            report[layout] = {
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 2),
+                "candidates": round(statistics.mean(candidates), 1)
+            }
+    finally:
+        RAG_CONFIG["retrieval"]["collection_layout"] = original_layout
+
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        print("🔀 MIGRATION VERS LA COLLECTION FUSIONNÉE")
+        print("=" * 40)
+        result = migrate_to_legal_corpus(sys.argv[2] if len(sys.argv) > 2 else "chroma_db")
+        for key, count in result.items():
+            print(f"  - {key}: {count} chunks")
+        print(f"  Total: {sum(result.values())} chunks")
+        print("💡 Activer avec RAG_CONFIG['retrieval']['collection_layout'] = 'merged'")
+    elif len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        print("⏱️ LATENCE : 5 COLLECTIONS VS COLLECTION FUSIONNÉE")
+        print("=" * 40)
+        for layout, stats in benchmark_layouts().items():
+            print(f"  - {layout}: p50 {stats['p50_ms']} ms | p95 {stats['p95_ms']} ms | "
+                  f"{stats['candidates']} candidats")
+    else:
+        print("Usage: python legal_corpus.py migrate|benchmark [dossier]")
@@ -11,7 +11,7 @@ import logging
 from datetime import datetime
 
 # Import des modules externalisés
-from ui_utils import cached_analysis, create_performance_chart, create_mode_usage_chart, stream_analysis_result
+from ui_utils import cached_analysis, create_performance_chart, create_mode_usage_chart, display_cache_stats, display_rerank_cascade_stats, stream_analysis_result
 from ui_utils import display_analysis_10
 from letter_generator_module import display_letter_generator
 from compensation_calculator import display_compensation_calculator
@@ -103,7 +103,7 @@ except Exception as e:
 def enrich_analysis_with_chromadb(query: str, analysis_type: str = "medical_legal") -> str:
     """
     Enrichit l'analyse avec la base de connaissances ChromaDB
-    Utilise les 12,024 chunks de la base juridique
+    Utilise les chunks de la base juridique (comptés dans le manifeste du corpus)
     """
     if not CHROMADB_AVAILABLE:
         return ""
@@ -121,8 +121,10 @@ def enrich_analysis_with_chromadb(query: str, analysis_type: str = "medical_lega
         # Recherche dans la base de connaissances
         print(f"🔍 Recherche ChromaDB: {query[:50]}...")
         
-        # Recherche générale
-        legal_results = chromadb_search.search_legal_knowledge(query, top_k=8)
+        # Recherche générale (codes non couverts par les recherches spécifiques ci-dessous)
+        legal_results = chromadb_search.search_legal_knowledge(
+            query, top_k=8, filters={'collections': ['css', 'penal', 'civil']}
+        )
         
         # Recherche spécifique déontologie
         deont_results = chromadb_search.search_deontologie(query, top_k=5)
@@ -151,10 +153,7 @@ def enrich_analysis_with_chromadb(query: str, analysis_type: str = "medical_lega
         
         if legal_results:
             enriched_content += "### 📖 Autres Sources Juridiques\n\n"
-            # Filtrer les résultats déjà affichés
-            other_results = [r for r in legal_results if r['collection'] not in ['deontologie', 'csp']]
-            
-            for i, result in enumerate(other_results[:3], 1):
+            for i, result in enumerate(legal_results[:3], 1):
                 score_emoji = "🟢" if result['relevance_score'] >= 0.8 else "🟡" if result['relevance_score'] >= 0.6 else "🔴"
                 enriched_content += f"**{i}. {result['collection'].upper()} - Article {result['article']}** {score_emoji} (Score: {result['relevance_score']:.2f})\n"
                 enriched_content += f"*Source: {result['source']}*\n"
@@ -164,7 +163,9 @@ def enrich_analysis_with_chromadb(query: str, analysis_type: str = "medical_lega
         total_results = len(legal_results) + len(deont_results) + len(csp_results)
         if total_results > 0:
             enriched_content += f"✅ **{total_results} extraits juridiques trouvés dans la base de connaissances**\n\n"
-            enriched_content += "*Base ChromaDB avec 12,024 chunks de textes juridiques*\n\n"
+            total_chunks = chromadb_search.get_total_chunks()
+            total_label = f"{total_chunks:,}" if total_chunks is not None else "n/a"
+            enriched_content += f"*Base ChromaDB avec {total_label} chunks de textes juridiques*\n\n"
         else:
             enriched_content += "ℹ️ *Aucun extrait juridique pertinent trouvé dans la base de connaissances*\n\n"
         
@@ -647,7 +648,9 @@ def render_interface():
         if mode == "grok":
             st.info("🧠 **Mode Grok-4 Expert** : Utilise directement Grok-4 pour une analyse juridique de haute qualité. Analyse détaillée et approfondie.")
         elif mode == "chromadb_rag":
-            st.info("⚖️ **Mode ChromaDB RAG** : Utilise directement la base ChromaDB avec 11,998 chunks de codes légaux français (CSP, CSS, Code Pénal, Code Civil, Déontologie). Analyse avec Grok-4 pour une précision maximale.")
+            total_chunks = get_chromadb_search().get_total_chunks() if CHROMADB_AVAILABLE else 0
+            total_label = f"{total_chunks:,}" if total_chunks is not None else "n/a"
+            st.info(f"⚖️ **Mode ChromaDB RAG** : Utilise directement la base ChromaDB avec {total_label} chunks de codes légaux français (CSP, CSS, Code Pénal, Code Civil, Déontologie). Analyse avec Grok-4 pour une précision maximale.")
         
         # Information sur la recherche Google
         if GOOGLE_SEARCH_AVAILABLE and google_search:
@@ -774,6 +777,14 @@ def render_interface():
         else:
             st.info("📊 Aucune donnée d'analyse disponible pour le moment.")
         
+        # Efficacité des caches (reranking, situations similaires, résultats de recherche)
+        st.markdown("**💾 Taux de succès des caches**")
+        display_cache_stats()
+        
+        # Reranking en cascade : candidats envoyés au cross-encoder
+        st.markdown("**✂️ Reranking en cascade**")
+        display_rerank_cascade_stats()
+        
         st.markdown("</div>", unsafe_allow_html=True)
     
     with tab6:
@@ -785,6 +796,10 @@ def render_interface():
         display_compensation_calculator()
         
         st.markdown("</div>", unsafe_allow_html=True)
+    
+    # Préchauffage ChromaDB en arrière-plan, une fois l'interface affichée
+    if CHROMADB_AVAILABLE:
+        get_chromadb_search().start_warm_up()
 
 if __name__ == "__main__":
     render_interface()
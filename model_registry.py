@@ -0,0 +1,304 @@
+"""
+Registre des modèles pour LegalDocBot
+Charge chaque cross-encoder une seule fois par processus et le partage entre les rerankers
+(ChromaDB, jurisprudence, ONIAM), avec mesure du temps de chargement et de la mémoire
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import RAG_CONFIG
+from score_cache import get_score_cache
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _resident_memory_bytes() -> Optional[int]:
+    """Retourne la mémoire résidente du processus (Linux), ou None si indisponible"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class CrossEncoderScorer:
+    """
+    Cross-encoder partagé : scoring de paires (requête, document) en mini-batches
+    """
+
+    def __init__(self, model_name: str, model=None, batch_size: int = 32, load_error: Optional[str] = None,
+                 backend: Optional[str] = None):
+        """
+        Enveloppe un modèle déjà chargé (ou l'échec de son chargement)
+
+        Args:
+            model_name: Nom du modèle
+            model: Instance CrossEncoder (None si le chargement a échoué)
+            batch_size: Taille par défaut des mini-batches
+            load_error: Message d'erreur du chargement
+            backend: Backend d'inférence du modèle ('torch', 'onnx', 'onnx-int8')
+        """
+        self.model_name = model_name
+        self.model = model
+        self.batch_size = batch_size
+        self.load_error = load_error
+        self.backend = backend
+        self._predict_lock = threading.Lock()
+        self.calls = 0
+        self.pairs_scored = 0
+
+    @property
+    def is_available(self) -> bool:
+        """Le modèle est chargé et utilisable"""
+        return self.model is not None
+
+    def score_pairs(self, pairs: List[Tuple[str, str]], batch_size: Optional[int] = None) -> List[float]:
+        """
+        Score un lot de paires (requête, document), les paires déjà scorées étant lues dans le cache
+
+        Args:
+            pairs: Liste de paires (requête, document)
+            batch_size: Taille des mini-batches (défaut: celle du registre)
+
+        Returns:
+            Scores de pertinence (0-1), dans l'ordre des paires; 0.5 si le modèle est indisponible
+        """
+        return self.score_pairs_with_stats(pairs, batch_size)[0]
+
+    def score_pairs_with_stats(self, pairs: List[Tuple[str, str]],
+                               batch_size: Optional[int] = None) -> Tuple[List[float], int, float]:
+        """
+        Score un lot de paires et indique ce qui est réellement passé par le transformer
+
+        Args:
+            pairs: Liste de paires (requête, document)
+            batch_size: Taille des mini-batches (défaut: celle du registre)
+
+        Returns:
+            (scores dans l'ordre des paires, nombre de paires prédites hors cache, durée de la prédiction en secondes)
+        """
+        if not pairs:
+            return [], 0, 0.0
+
+        if not self.is_available:
+            return [0.5] * len(pairs), 0, 0.0  # Score par défaut
+
+        score_cache = get_score_cache()
+        if score_cache is None:
+            start = time.perf_counter()
+            scores = self._predict_pairs(pairs, batch_size)
+            elapsed = time.perf_counter() - start
+            if scores is None:
+                return [0.5] * len(pairs), 0, 0.0
+            return scores, len(pairs), elapsed
+
+        keys = [score_cache.make_key(self.model_name, self.backend, query, document) for query, document in pairs]
+        scores = score_cache.get_many(keys)
+        missing = [index for index, score in enumerate(scores) if score is None]
+        predicted, elapsed = 0, 0.0
+        if missing:
+            # Seules les paires absentes du cache passent par le transformer
+            start = time.perf_counter()
+            computed = self._predict_pairs([pairs[index] for index in missing], batch_size)
+            elapsed = time.perf_counter() - start
+            if computed is None:
+                computed = [0.5] * len(missing)
+                elapsed = 0.0
+            else:
+                predicted = len(missing)
+                score_cache.put_many([(keys[index], score) for index, score in zip(missing, computed)])
+            for index, score in zip(missing, computed):
+                scores[index] = score
+        return scores, predicted, elapsed
+
+    def _predict_pairs(self, pairs: List[Tuple[str, str]], batch_size: Optional[int] = None) -> Optional[List[float]]:
+        """
+        Score des paires avec un seul appel predict
+
+        Les paires sont triées par longueur avant le découpage en mini-batches
+        pour limiter le padding, puis les scores sont remis dans l'ordre d'origine.
+        Les appels concurrents sont sérialisés (tokenizer et modèle partagés).
+
+        Args:
+            pairs: Liste de paires (requête, document)
+            batch_size: Taille des mini-batches (défaut: celle du registre)
+
+        Returns:
+            Scores normalisés (0-1) dans l'ordre des paires, ou None en cas d'erreur
+        """
+        try:
+            # Bucketing par longueur : des paires de taille proche dans chaque mini-batch
+            order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+            sorted_pairs = [[pairs[i][0], pairs[i][1]] for i in order]
+
+            with self._predict_lock:
+                raw_scores = self.model.predict(
+                    sorted_pairs, batch_size=batch_size or self.batch_size, show_progress_bar=False
+                )
+                self.calls += 1
+                self.pairs_scored += len(pairs)
+
+            # Normalisation (les scores peuvent être négatifs) et remise dans l'ordre
+            scores = [0.5] * len(pairs)
+            for position, index in enumerate(order):
+                scores[index] = self.normalize_score(float(raw_scores[position]))
+            return scores
+
+        except Exception as e:
+            logger.error(f"❌ Erreur calcul scores {self.model_name}: {e}")
+            return None
+
+    @staticmethod
+    def normalize_score(score: float) -> float:
+        """Normalise un score brut du cross-encoder (peut être négatif) entre 0 et 1"""
+        return max(0.0, min(1.0, (score + 1) / 2))
+
+
+class ModelRegistry:
+    """
+    Registre thread-safe des modèles chargés dans le processus
+    """
+
+    def __init__(self, batch_size: Optional[int] = None):
+        """
+        Initialise un registre vide
+
+        Args:
+            batch_size: Taille par défaut des mini-batches de scoring (défaut: RAG_CONFIG)
+        """
+        self.batch_size = batch_size or RAG_CONFIG["reranking"]["batch_size"]
+        self._scorers = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get_cross_encoder(self, model_name: Optional[str] = None) -> CrossEncoderScorer:
+        """
+        Retourne le cross-encoder partagé, chargé au premier appel
+
+        Un échec de chargement est lui aussi mémorisé : le modèle n'est pas
+        rechargé à chaque instanciation d'un reranker.
+
+        Args:
+            model_name: Nom du modèle (défaut: RAG_CONFIG)
+
+        Returns:
+            Scorer partagé
+        """
+        model_name = model_name or RAG_CONFIG["reranking"]["cross_encoder_model"]
+        scorer = self._scorers.get(model_name)
+        if scorer is not None:
+            return scorer
+
+        with self._lock:
+            if model_name not in self._scorers:
+                self._scorers[model_name] = self._load_cross_encoder(model_name)
+            return self._scorers[model_name]
+
+    def _load_cross_encoder(self, model_name: str) -> CrossEncoderScorer:
+        """Charge un cross-encoder et enregistre son backend, son temps de chargement et sa mémoire"""
+        rss_before = _resident_memory_bytes()
+        start = time.perf_counter()
+        model = None
+        if RAG_CONFIG["reranking"]["inference_backend"] == "onnx":
+            try:
+                model, backend, device, parameter_bytes = self._load_onnx_model(model_name)
+            except Exception as e:
+                logger.warning(f"⚠️ Backend ONNX indisponible pour {model_name}, repli sur PyTorch: {e}")
+
+        if model is None:
+            try:
+                model, backend, device, parameter_bytes = self._load_torch_model(model_name)
+            except Exception as e:
+                logger.error(f"❌ Erreur chargement cross-encoder {model_name}: {e}")
+                self._stats[model_name] = {'loaded': False, 'error': str(e)}
+                return CrossEncoderScorer(model_name, batch_size=self.batch_size, load_error=str(e))
+
+        load_seconds = time.perf_counter() - start
+        rss_after = _resident_memory_bytes()
+        self._stats[model_name] = {
+            'loaded': True,
+            'backend': backend,
+            'device': device,
+            'load_seconds': round(load_seconds, 2),
+            'parameter_bytes': int(parameter_bytes),
+            'rss_delta_bytes': rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        }
+        logger.info(f"✅ Cross-encoder chargé: {model_name} ({backend}, {device}, {load_seconds:.1f}s, "
+                    f"{parameter_bytes / 1e6:.0f} MB de poids)")
+        return CrossEncoderScorer(model_name, model=model, batch_size=self.batch_size, backend=backend)
+
+    @staticmethod
+    def _load_torch_model(model_name: str) -> Tuple[object, str, str, int]:
+        """Charge le cross-encoder sentence_transformers (GPU si disponible)"""
+        # Import différé : sentence_transformers (et torch) seulement si un reranker est utilisé
+        from sentence_transformers import CrossEncoder
+        import torch
+
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        model = CrossEncoder(model_name, device=device)
+        parameter_bytes = sum(
+            parameter.numel() * parameter.element_size() for parameter in model.model.parameters()
+        )
+        return model, 'torch', device, parameter_bytes
+
+    @staticmethod
+    def _load_onnx_model(model_name: str) -> Tuple[object, str, str, int]:
+        """Charge le cross-encoder ONNX Runtime (exporté et quantifié au premier appel)"""
+        from onnx_reranker import load_onnx_cross_encoder
+
+        model = load_onnx_cross_encoder(model_name)
+        backend = 'onnx-int8' if RAG_CONFIG["reranking"]["onnx"]["quantize_int8"] else 'onnx'
+        return model, backend, 'cpu', model.size_bytes
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        Retourne les statistiques des modèles du registre
+
+        Returns:
+            Dictionnaire modèle -> chargement (durée, mémoire, device) et utilisation (appels, paires)
+        """
+        with self._lock:
+            stats = {}
+            for model_name, model_stats in self._stats.items():
+                scorer = self._scorers.get(model_name)
+                stats[model_name] = dict(model_stats)
+                if scorer is not None:
+                    stats[model_name]['calls'] = scorer.calls
+                    stats[model_name]['pairs_scored'] = scorer.pairs_scored
+            return stats
+
+
+# Instance globale
+_model_registry = None
+_model_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Retourne le registre des modèles du processus (singleton)"""
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+    return _model_registry
+
+
+if __name__ == "__main__":
+    print("🧠 REGISTRE DES MODÈLES")
+    print("=" * 40)
+    registry = get_model_registry()
+    scorer = registry.get_cross_encoder()
+    print(f"  Cross-encoder disponible: {scorer.is_available}")
+    print(f"  Score test: {scorer.score_pairs([('secret médical', 'Le médecin est tenu au secret professionnel.')])[0]:.3f}")
+    for name, info in registry.get_stats().items():
+        if not info['loaded']:
+            print(f"  - {name}: échec ({info['error']})")
+            continue
+        rss = f"{info['rss_delta_bytes'] / 1e6:.0f} MB" if info['rss_delta_bytes'] is not None else "?"
+        print(f"  - {name}: {info['load_seconds']}s, {info['parameter_bytes'] / 1e6:.0f} MB de poids, "
+              f"+{rss} de mémoire résidente ({info['backend']}, {info['device']})")
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Backend ONNX Runtime du cross-encoder pour LegalDocBot
+Exporte le cross-encoder en ONNX (une fois, dans un dossier cache), le quantifie en int8
+(quantification dynamique) et score les paires avec onnxruntime sur CPU ;
+le benchmark compare débit et accord des scores avec le backend PyTorch
+"""
+
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import RAG_CONFIG, RETRIEVAL_BENCHMARK_QUERIES
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_FILENAME = "model.onnx"
+ONNX_INT8_MODEL_FILENAME = "model-int8.onnx"
+
+
+def get_onnx_model_dir(model_name: str, cache_dir: Optional[str] = None) -> Path:
+    """Retourne le dossier de l'export ONNX d'un modèle"""
+    cache_dir = cache_dir or RAG_CONFIG["reranking"]["onnx"]["cache_dir"]
+    return Path(cache_dir) / re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+def export_cross_encoder_onnx(model_name: str, cache_dir: Optional[str] = None, quantize_int8: bool = True,
+                              opset: int = 14) -> Path:
+    """
+    Exporte un cross-encoder Hugging Face en ONNX, puis le quantifie en int8
+
+    L'export est fait une seule fois : les fichiers déjà présents sont réutilisés.
+
+    Args:
+        model_name: Nom du modèle (Hugging Face)
+        cache_dir: Dossier des exports (défaut: RAG_CONFIG)
+        quantize_int8: Produire aussi la version int8 (poids quantifiés, activations dynamiques)
+        opset: Version de l'opset ONNX
+
+    Returns:
+        Chemin du modèle ONNX à charger (int8 si demandé)
+    """
+    model_dir = get_onnx_model_dir(model_name, cache_dir)
+    fp32_path = model_dir / ONNX_MODEL_FILENAME
+    int8_path = model_dir / ONNX_INT8_MODEL_FILENAME
+
+    if not fp32_path.exists():
+        # Import différé : torch et transformers ne servent qu'à l'export
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        logger.info(f"📦 Export ONNX de {model_name}...")
+        model_dir.mkdir(parents=True, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+
+        sample = tokenizer(["requête"], ["document"], padding=True, truncation=True, return_tensors="pt")
+        input_names = list(sample.keys())
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                str(fp32_path),
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=opset
+            )
+        tokenizer.save_pretrained(str(model_dir))
+        logger.info(f"✅ Modèle ONNX écrit: {fp32_path} ({fp32_path.stat().st_size / 1e6:.0f} MB)")
+
+    if not quantize_int8:
+        return fp32_path
+
+    if not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"🗜️ Quantification int8 de {fp32_path.name}...")
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+        logger.info(f"✅ Modèle int8 écrit: {int8_path} ({int8_path.stat().st_size / 1e6:.0f} MB)")
+
+    return int8_path
+
+
+class OnnxCrossEncoder:
+    """
+    Cross-encoder exécuté par onnxruntime, avec la même interface predict que sentence_transformers.CrossEncoder
+    """
+
+    def __init__(self, model_path: str, intra_op_threads: int = 4, max_length: int = 512):
+        """
+        Charge le modèle ONNX et le tokenizer exporté à côté
+
+        Args:
+            model_path: Fichier .onnx (fp32 ou int8)
+            intra_op_threads: Threads onnxruntime par opérateur
+            max_length: Longueur maximale (tokens) d'une paire
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.model_path = Path(model_path)
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_path.parent))
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            str(self.model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    @property
+    def size_bytes(self) -> int:
+        """Taille du fichier modèle"""
+        return self.model_path.stat().st_size
+
+    def predict(self, sentences: List[List[str]], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Score des paires (requête, document)
+
+        Args:
+            sentences: Paires [requête, document]
+            batch_size: Taille des mini-batches
+            show_progress_bar: Ignoré (compatibilité CrossEncoder)
+
+        Returns:
+            Logits bruts, un par paire (comme CrossEncoder sans activation)
+        """
+        scores = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            encoded = self.tokenizer(
+                [pair[0] for pair in batch], [pair[1] for pair in batch],
+                padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+            logits = self.session.run(None, feed)[0]
+            scores.append(logits[:, 0] if logits.ndim == 2 else logits)
+        return np.concatenate(scores) if scores else np.array([], dtype=np.float32)
+
+
+def load_onnx_cross_encoder(model_name: str, onnx_config: Optional[Dict] = None) -> OnnxCrossEncoder:
+    """
+    Charge un cross-encoder ONNX, en l'exportant au premier appel
+
+    Args:
+        model_name: Nom du modèle (Hugging Face)
+        onnx_config: Paramètres ONNX (défaut: RAG_CONFIG["reranking"]["onnx"])
+
+    Returns:
+        Cross-encoder ONNX prêt à scorer
+    """
+    onnx_config = onnx_config or RAG_CONFIG["reranking"]["onnx"]
+    model_path = export_cross_encoder_onnx(
+        model_name, cache_dir=onnx_config["cache_dir"], quantize_int8=onnx_config["quantize_int8"]
+    )
+    return OnnxCrossEncoder(
+        str(model_path), intra_op_threads=onnx_config["intra_op_threads"], max_length=onnx_config["max_length"]
+    )
+
+
+def _benchmark_documents(chroma_path: str = "chroma_db", per_collection: int = 20) -> List[str]:
+    """Échantillon de chunks du corpus ChromaDB pour le benchmark"""
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=chroma_path, settings=Settings(anonymized_telemetry=False))
+    documents = []
+    for collection in client.list_collections():
+        collection = client.get_collection(collection if isinstance(collection, str) else collection.name)
+        sample = collection.get(limit=per_collection, include=["documents"])
+        documents.extend(document for document in sample["documents"] if document)
+    return documents
+
+
+def benchmark_backends(model_name: Optional[str] = None, documents: Optional[List[str]] = None,
+                       queries: Optional[List[str]] = None, repeats: int = 3, top_k: int = 3) -> Dict:
+    """
+    Compare le débit et l'accord des scores des backends PyTorch, ONNX fp32 et ONNX int8
+
+    Args:
+        model_name: Nom du modèle (défaut: RAG_CONFIG)
+        documents: Documents scorés contre chaque requête (défaut: échantillon du corpus ChromaDB)
+        queries: Requêtes de test (défaut: RETRIEVAL_BENCHMARK_QUERIES)
+        repeats: Nombre de passes mesurées par backend
+        top_k: Taille du top comparé par requête
+
+    Returns:
+        Dictionnaire backend -> débit (paires/s), taille du modèle et accord avec PyTorch
+    """
+    from model_registry import CrossEncoderScorer
+
+    model_name = model_name or RAG_CONFIG["reranking"]["cross_encoder_model"]
+    onnx_config = RAG_CONFIG["reranking"]["onnx"]
+    queries = queries or RETRIEVAL_BENCHMARK_QUERIES
+    documents = documents or _benchmark_documents()
+    pairs = [[query, document] for query in queries for document in documents]
+    batch_size = RAG_CONFIG["reranking"]["batch_size"]
+
+    from sentence_transformers import CrossEncoder
+    backends = {"torch": CrossEncoder(model_name, device="cpu")}
+    fp32_path = export_cross_encoder_onnx(model_name, cache_dir=onnx_config["cache_dir"], quantize_int8=False)
+    int8_path = export_cross_encoder_onnx(model_name, cache_dir=onnx_config["cache_dir"], quantize_int8=True)
+    for name, path in (("onnx", fp32_path), ("onnx-int8", int8_path)):
+        backends[name] = OnnxCrossEncoder(
+            str(path), intra_op_threads=onnx_config["intra_op_threads"], max_length=onnx_config["max_length"]
+        )
+
+    report = {"pairs": len(pairs), "queries": len(queries), "backends": {}}
+    reference = None
+    for name, model in backends.items():
+        model.predict(pairs[:batch_size], batch_size=batch_size, show_progress_bar=False)  # Préchauffage
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            raw_scores = model.predict(pairs, batch_size=batch_size, show_progress_bar=False)
+            durations.append(time.perf_counter() - start)
+        scores = np.array([CrossEncoderScorer.normalize_score(float(score)) for score in raw_scores])
+        if reference is None:
+            reference = scores
+
+        per_query = scores.reshape(len(queries), len(documents))
+        reference_per_query = reference.reshape(len(queries), len(documents))
+        top_overlap = [
+            len(set(np.argsort(-row)[:top_k]) & set(np.argsort(-reference_row)[:top_k])) / min(top_k, len(documents))
+            for row, reference_row in zip(per_query, reference_per_query)
+        ]
+        report["backends"][name] = {
+            "pairs_per_second": round(len(pairs) / min(durations), 1),
+            "size_bytes": model.size_bytes if isinstance(model, OnnxCrossEncoder) else int(sum(
+                parameter.numel() * parameter.element_size() for parameter in model.model.parameters()
+            )),
+            "max_abs_diff": round(float(np.max(np.abs(scores - reference))), 4),
+            "correlation": round(float(np.corrcoef(scores, reference)[0, 1]), 4) if len(scores) > 1 else 1.0,
+            f"top{top_k}_agreement": round(float(np.mean(top_overlap)), 3)
+        }
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        print("📦 EXPORT ONNX DU CROSS-ENCODER")
+        print("=" * 40)
+        model_name = sys.argv[2] if len(sys.argv) > 2 else RAG_CONFIG["reranking"]["cross_encoder_model"]
+        path = export_cross_encoder_onnx(model_name, quantize_int8=RAG_CONFIG["reranking"]["onnx"]["quantize_int8"])
+        print(f"  Modèle: {path} ({path.stat().st_size / 1e6:.0f} MB)")
+    elif len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        print("⏱️ BENCHMARK CROSS-ENCODER : PYTORCH VS ONNX RUNTIME")
+        print("=" * 40)
+        result = benchmark_backends(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"  {result['pairs']} paires ({result['queries']} requêtes)")
+        for name, info in result["backends"].items():
+            agreement = next(value for key, value in info.items() if key.endswith("_agreement"))
+            print(f"  - {name}: {info['pairs_per_second']} paires/s, {info['size_bytes'] / 1e6:.0f} MB, "
+                  f"écart max {info['max_abs_diff']}, corrélation {info['correlation']}, accord top {agreement}")
+        print("  (accord mesuré par rapport aux scores PyTorch)")
+    else:
+        print("Usage: python onnx_reranker.py export [modèle]")
+        print("       python onnx_reranker.py benchmark [modèle]")
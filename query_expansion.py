@@ -0,0 +1,219 @@
+"""
+Expansion de requêtes pour LegalDocBot
+Découpe une situation longue en sous-requêtes courtes (heuristiques locales ou Grok-4)
+et en fenêtres de phrases, pour améliorer le rappel de la recherche ChromaDB
+"""
+
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import List
+
+from config import QUERY_GENERATION_PROMPT_TEMPLATE, RAG_CONFIG
+from article_index import extract_article_refs
+from sparse_index import fold_accents
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Déclencheur (sans accents) -> sous-requête juridique ciblée
+LEGAL_THEME_QUERIES = {
+    "nosocomial": "infection nosocomiale responsabilité établissement de santé",
+    "consentement": "consentement éclairé information du patient",
+    "information": "obligation d'information du médecin",
+    "diagnostic": "erreur de diagnostic faute médicale",
+    "retard": "retard de prise en charge perte de chance",
+    "alea": "aléa thérapeutique indemnisation solidarité nationale",
+    "oniam": "indemnisation ONIAM accident médical",
+    "secret": "secret médical violation",
+    "deces": "décès du patient responsabilité médicale",
+    "chirurg": "faute chirurgicale responsabilité du chirurgien",
+    "medicament": "erreur de prescription médicament",
+    "urgence": "prise en charge aux urgences obligation de moyens",
+    "dossier medical": "accès au dossier médical",
+    "handicap": "préjudice corporel déficit fonctionnel",
+}
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?;])\s+")
+
+
+def expand_query_heuristic(situation: str, max_queries: int = 4) -> List[str]:
+    """
+    Construit des sous-requêtes à partir de la situation, sans appel au modèle
+
+    Args:
+        situation: Situation décrite par l'utilisateur
+        max_queries: Nombre maximum de sous-requêtes (hors situation complète)
+
+    Returns:
+        Sous-requêtes, sans doublon
+    """
+    folded = fold_accents(situation)
+    queries = []
+
+    # Articles cités explicitement
+    refs = extract_article_refs(situation)
+    if refs:
+        queries.append("article " + " ".join(refs[:3]))
+
+    # Thèmes juridiques reconnus
+    for trigger, theme_query in LEGAL_THEME_QUERIES.items():
+        if trigger in folded:
+            queries.append(theme_query)
+
+    # Phrases de la situation, les plus longues d'abord
+    sentences = [sentence.strip() for sentence in SENTENCE_PATTERN.split(situation) if len(sentence.split()) >= 4]
+    if len(sentences) > 1:
+        queries.extend(sorted(sentences, key=len, reverse=True))
+
+    return list(dict.fromkeys(queries))[:max_queries]
+
+
+def segment_situation(situation: str, window_sentences: int = 3, max_windows: int = 6,
+                      min_words: int = 120) -> List[str]:
+    """
+    Découpe une situation longue en fenêtres de phrases qui se chevauchent
+
+    Le modèle d'embedding tronque les textes longs : chaque fenêtre reste sous
+    sa longueur maximale. Au-delà de max_windows, des fenêtres réparties sur
+    tout le texte sont conservées.
+
+    Args:
+        situation: Situation décrite par l'utilisateur
+        window_sentences: Nombre de phrases par fenêtre (chevauchement d'une phrase)
+        max_windows: Nombre maximum de fenêtres par requête
+        min_words: Longueur (en mots) à partir de laquelle la situation est découpée
+
+    Returns:
+        Fenêtres de texte; liste vide si la situation est assez courte
+    """
+    if len(situation.split()) < min_words:
+        return []
+
+    sentences = [sentence.strip() for sentence in SENTENCE_PATTERN.split(situation) if sentence.strip()]
+    if len(sentences) <= window_sentences:
+        return []
+
+    stride = max(1, window_sentences - 1)
+    windows = []
+    for start in range(0, len(sentences), stride):
+        windows.append(" ".join(sentences[start:start + window_sentences]))
+        if start + window_sentences >= len(sentences):
+            break
+
+    if len(windows) > max_windows:
+        # Fenêtres réparties régulièrement, première et dernière comprises
+        step = (len(windows) - 1) / (max_windows - 1) if max_windows > 1 else 0
+        windows = [windows[round(i * step)] for i in range(max_windows)]
+    return windows
+
+
+def expand_query_llm(situation: str, max_queries: int = 4) -> List[str]:
+    """
+    Demande à Grok-4 des sous-requêtes courtes (QUERY_GENERATION_PROMPT_TEMPLATE)
+
+    Args:
+        situation: Situation décrite par l'utilisateur
+        max_queries: Nombre maximum de sous-requêtes
+
+    Returns:
+        Sous-requêtes générées
+
+    Raises:
+        ValueError: Si Grok-4 n'est pas configuré ou si la réponse n'est pas un JSON valide
+    """
+    from grok_client import get_grok_client
+    client = get_grok_client()
+    if not client.is_configured():
+        raise ValueError("Client Grok-4 non configuré")
+
+    response = client.generate_completion(
+        QUERY_GENERATION_PROMPT_TEMPLATE.format(situation=situation),
+        temperature=0.1, max_tokens=300
+    )
+    match = re.search(r"\{.*\}", response, re.DOTALL)
+    if not match:
+        raise ValueError(f"Réponse sans JSON: {response[:100]}")
+    queries = [str(query).strip() for query in json.loads(match.group(0)).get("queries", []) if str(query).strip()]
+    if not queries:
+        raise ValueError("Aucune requête générée")
+    return queries[:max_queries]
+
+
+class QueryExpander:
+    """
+    Expansion de requêtes avec cache des sous-requêtes par situation
+    """
+
+    def __init__(self, strategy: str = "heuristic", max_queries: int = 4, min_words: int = 25,
+                 cache_size: int = 256):
+        """
+        Initialise l'expanseur
+
+        Args:
+            strategy: "off", "heuristic" ou "llm" (repli sur les heuristiques en cas d'échec)
+            max_queries: Nombre maximum de sous-requêtes ajoutées à la situation
+            min_words: Longueur minimale (en mots) d'une situation pour l'étendre
+            cache_size: Nombre de situations dont les sous-requêtes sont gardées en mémoire
+        """
+        self.strategy = strategy
+        self.max_queries = max_queries
+        self.min_words = min_words
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def expand(self, situation: str) -> List[str]:
+        """
+        Retourne la situation suivie de ses sous-requêtes
+
+        Args:
+            situation: Situation décrite par l'utilisateur
+
+        Returns:
+            Requêtes à interroger; la situation seule si l'expansion est désactivée ou inutile
+        """
+        if self.strategy == "off" or len(situation.split()) < self.min_words:
+            return [situation]
+
+        key = " ".join(situation.split())
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return list(self._cache[key])
+
+        sub_queries = None
+        if self.strategy == "llm":
+            try:
+                sub_queries = expand_query_llm(situation, self.max_queries)
+                logger.info(f"🧠 {len(sub_queries)} sous-requêtes générées par Grok-4")
+            except Exception as e:
+                logger.warning(f"⚠️ Expansion Grok-4 indisponible, repli sur les heuristiques: {e}")
+        if sub_queries is None:
+            sub_queries = expand_query_heuristic(situation, self.max_queries)
+
+        queries = list(dict.fromkeys([situation] + sub_queries))
+        with self._lock:
+            self._cache[key] = queries
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(queries)
+
+
+# Instance globale
+_query_expander = None
+
+def get_query_expander() -> QueryExpander:
+    """Retourne l'instance globale de l'expanseur de requêtes"""
+    global _query_expander
+    if _query_expander is None:
+        retrieval_config = RAG_CONFIG["retrieval"]
+        _query_expander = QueryExpander(
+            strategy=retrieval_config["query_expansion"],
+            max_queries=retrieval_config["expansion_max_queries"],
+            min_words=retrieval_config["expansion_min_words"]
+        )
+    return _query_expander
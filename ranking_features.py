@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Caractéristiques de classement des chunks pour LegalDocBot
+Famille de code, type de document et motifs d'article de chaque chunk calculés une fois à l'ingestion
+(métadonnées + table annexe), combinés aux mots-clés de la requête par calcul vectoriel NumPy
+pour les bonus du reranker
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from article_index import normalize_article_ref
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHUNK_FEATURES_FILENAME = "chunk_features.json"
+
+# Familles de code, dans l'ordre de détection sur le nom de collection (0 = aucune)
+FAMILY_NONE, FAMILY_DEONTOLOGIE, FAMILY_CSP, FAMILY_CIVIL, FAMILY_PENAL, FAMILY_CSS = range(6)
+FAMILY_MARKERS = (("deontologie", FAMILY_DEONTOLOGIE), ("csp", FAMILY_CSP), ("civil", FAMILY_CIVIL),
+                  ("penal", FAMILY_PENAL), ("css", FAMILY_CSS))
+
+# Articles de déontologie par thème de la requête
+DEONTOLOGIE_THEMES = {
+    'secret': ['r.4127-4', 'r.4127-72', 'r.4127-104'],
+    'consentement': ['r.4127-36', 'r.4127-37', 'r.4127-38'],
+    'information': ['r.4127-35', 'r.4127-47', 'r.4127-48'],
+    'responsabilité': ['r.4127-95', 'r.4127-96', 'r.4127-97'],
+    'confidentialité': ['r.4127-4', 'r.4127-72', 'r.4127-104'],
+    'éthique': ['r.4127-1', 'r.4127-2', 'r.4127-3']
+}
+
+# Motifs recherchés dans l'identifiant d'article (un bit par motif)
+ARTICLE_PATTERNS = ['r.4127', 'l.1142', 'l.1143', '1382', '1383', '121-1', '121-2'] + sorted(
+    {article for articles in DEONTOLOGIE_THEMES.values() for article in articles}
+)
+ARTICLE_BITS = {pattern: 1 << position for position, pattern in enumerate(ARTICLE_PATTERNS)}
+BITS_R4127 = ARTICLE_BITS['r.4127']
+BITS_CSP_RESPONSABILITE = ARTICLE_BITS['l.1142'] | ARTICLE_BITS['l.1143']
+BITS_CIVIL_RESPONSABILITE = ARTICLE_BITS['1382'] | ARTICLE_BITS['1383']
+BITS_PENAL_RESPONSABILITE = ARTICLE_BITS['121-1'] | ARTICLE_BITS['121-2']
+
+# Bonus unifié par famille (aucune, déontologie, CSP, civil, pénal, CSS) et motifs d'article qui le renforcent
+UNIFIED_BASE_BONUS = np.array([0.0, 0.4, 0.3, 0.25, 0.25, 0.2])
+UNIFIED_BOOSTED_BONUS = np.array([0.0, 0.4, 0.4, 0.3, 0.3, 0.25])
+UNIFIED_REQUIRED_BITS = np.array([0, 0, BITS_CSP_RESPONSABILITE, BITS_CIVIL_RESPONSABILITE, BITS_PENAL_RESPONSABILITE, 0])
+TYPE_BONUS = np.array([0.0, 0.3, 0.2, 0.15, 0.15, 0.1])
+
+# Mots-clés de la requête par groupe
+QUERY_KEYWORDS = {
+    'deontologie': ['secret', 'consentement', 'information', 'responsabilité', 'confidentialité', 'éthique'],
+    'csp': ['responsabilité', 'faute', 'accident', 'erreur', 'maladie', 'santé'],
+    'civil': ['responsabilité', 'dommage', 'faute', 'réparation'],
+    'penal': ['faute', 'délit', 'infraction', 'sanction'],
+    'css': ['sécurité sociale', 'assurance', 'remboursement'],
+    # Bonus d'article du reranking ChromaDB (listes plus courtes)
+    'article_deontologie': ['secret', 'consentement', 'information', 'responsabilité', 'confidentialité'],
+    'article_csp': ['responsabilité', 'faute', 'accident', 'erreur', 'maladie']
+}
+
+# Colonnes de la table annexe : [famille, famille de type, bits d'article, article présent]
+FEATURE_KEYS = ("rank_family", "rank_type_family", "rank_article_bits", "rank_has_article")
+
+
+def normalize_article_id(article: str) -> str:
+    """Identifiant d'article normalisé en minuscules ("Article L. 1142-1" -> "l.1142-1"), brut si non reconnu"""
+    if not article:
+        return ""
+    return (normalize_article_ref(article) or article).lower()
+
+
+def _family(text: str) -> int:
+    """Famille de code détectée dans un nom de collection"""
+    for marker, family in FAMILY_MARKERS:
+        if marker in text:
+            return family
+    return FAMILY_NONE
+
+
+@lru_cache(maxsize=65536)
+def compute_chunk_features(collection: str, article: str, doc_type: str) -> Tuple[int, int, int, bool]:
+    """
+    Calcule les caractéristiques de classement d'un chunk
+
+    Args:
+        collection: Nom de la collection
+        article: Numéro d'article (métadonnée)
+        doc_type: Type de document (métadonnée)
+
+    Returns:
+        (famille, famille de type, bits des motifs d'article, article présent)
+    """
+    collection_lower = (collection or "").lower()
+    doc_type_lower = (doc_type or "").lower()
+
+    # Famille « de type » : le type de document peut désigner la déontologie ou le CSP
+    if 'deontologie' in collection_lower or 'deontologie' in doc_type_lower:
+        type_family = FAMILY_DEONTOLOGIE
+    elif 'csp' in collection_lower or 'santé' in doc_type_lower:
+        type_family = FAMILY_CSP
+    else:
+        type_family = _family(collection_lower)
+
+    article_id = normalize_article_id(article)
+    article_bits = 0
+    for pattern, bit in ARTICLE_BITS.items():
+        if pattern in article_id:
+            article_bits |= bit
+
+    return _family(collection_lower), type_family, article_bits, bool(article)
+
+
+def chunk_feature_metadata(collection: str, metadata: Dict) -> Dict:
+    """
+    Métadonnées de classement à stocker avec un chunk à l'ingestion
+
+    Args:
+        collection: Nom de la collection
+        metadata: Métadonnées du chunk (article, doc_type)
+
+    Returns:
+        Dictionnaire rank_family, rank_type_family, rank_article_bits, rank_has_article et rank_article_id
+    """
+    features = compute_chunk_features(collection, metadata.get("article", ""), metadata.get("doc_type", ""))
+    return {**dict(zip(FEATURE_KEYS, features)), "rank_article_id": normalize_article_id(metadata.get("article", ""))}
+
+
+def get_chunk_features_path(chroma_path: str = "chroma_db") -> Path:
+    """Retourne le chemin de la table des caractéristiques d'une base ChromaDB"""
+    return Path(chroma_path) / CHUNK_FEATURES_FILENAME
+
+
+def build_chunk_features(chroma_path: str = "chroma_db", page_size: int = 1000) -> Dict[str, Dict[str, List]]:
+    """
+    Calcule les caractéristiques de classement de tous les chunks de toutes les collections
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+        page_size: Nombre de chunks lus par page
+
+    Returns:
+        Dictionnaire collection -> {chunk_id: [famille, famille de type, bits d'article, article présent]}
+    """
+    import chromadb
+
+    client = chromadb.PersistentClient(path=chroma_path)
+    table = {}
+
+    for collection in sorted(client.list_collections(), key=lambda c: c.name):
+        collection = client.get_collection(collection.name)
+        features = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+                metadata = metadata or {}
+                # Le code d'une collection fusionnée (legal_corpus) désigne la famille
+                features[chunk_id] = list(compute_chunk_features(
+                    metadata.get("code") or collection.name, metadata.get("article", ""), metadata.get("doc_type", "")
+                ))
+            offset += len(page["ids"])
+            if len(page["ids"]) < page_size:
+                break
+        table[collection.name] = features
+        logger.info(f"✅ {collection.name}: caractéristiques de {len(features)} chunks")
+
+    return table
+
+
+def write_chunk_features(chroma_path: str = "chroma_db") -> Dict[str, Dict[str, List]]:
+    """
+    Calcule et enregistre la table des caractéristiques d'une base ChromaDB (écriture atomique)
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+
+    Returns:
+        Table enregistrée
+    """
+    table = build_chunk_features(chroma_path)
+    table_path = get_chunk_features_path(chroma_path)
+    temporary_path = table_path.with_suffix(".json.tmp")
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False)
+    os.replace(temporary_path, table_path)
+    logger.info(f"🏷️ Caractéristiques de classement écrites: {sum(len(t) for t in table.values())} chunks ({table_path})")
+    return table
+
+
+def load_chunk_features(chroma_path: str = "chroma_db") -> Optional[Dict[str, Dict[str, List]]]:
+    """
+    Lit la table des caractéristiques d'une base ChromaDB
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+
+    Returns:
+        Table des caractéristiques, ou None si elle est absente ou illisible
+    """
+    table_path = get_chunk_features_path(chroma_path)
+    if not table_path.exists():
+        return None
+    try:
+        with open(table_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ Table des caractéristiques illisible ({table_path}): {e}")
+        return None
+
+
+class ChunkFeatureStore:
+    """
+    Caractéristiques de classement des résultats : métadonnées, puis table annexe, puis calcul à la volée
+    """
+
+    def __init__(self, chroma_path: str = "chroma_db", collection_names: Optional[Dict[str, str]] = None):
+        """
+        Initialise le magasin (la table annexe est relue quand elle change)
+
+        Args:
+            chroma_path: Dossier de la base ChromaDB
+            collection_names: Clé de collection des résultats -> nom de collection ChromaDB
+        """
+        self.chroma_path = chroma_path
+        self.collection_names = collection_names or {}
+        self._table = None
+        self._table_mtime = None
+        self._lock = threading.Lock()
+
+    def get_table(self) -> Optional[Dict[str, Dict[str, List]]]:
+        """Retourne la table annexe, relue seulement si elle a changé"""
+        try:
+            mtime = get_chunk_features_path(self.chroma_path).stat().st_mtime_ns
+        except OSError:
+            self._table, self._table_mtime = None, None
+            return None
+
+        if mtime != self._table_mtime:
+            with self._lock:
+                if mtime != self._table_mtime:
+                    self._table = load_chunk_features(self.chroma_path)
+                    self._table_mtime = mtime
+        return self._table
+
+    def features_for(self, results: List[Dict]) -> Dict[str, np.ndarray]:
+        """
+        Assemble les caractéristiques d'une liste de résultats en colonnes NumPy
+
+        Args:
+            results: Résultats de recherche (collection, chunk_id, metadata, article, doc_type)
+
+        Returns:
+            Dictionnaire family, type_family, article_bits, has_article (une valeur par résultat)
+        """
+        table = self.get_table() or {}
+        rows = []
+        for result in results:
+            metadata = result.get('metadata') or {}
+            collection = result.get('collection', '')
+            doc_type = result.get('doc_type', '')
+            # Le type de document peut être réécrit après la recherche (ex. recherche déontologie) :
+            # les valeurs précalculées ne valent que pour le type d'origine
+            if doc_type == metadata.get('doc_type', ''):
+                if 'rank_family' in metadata:
+                    rows.append((metadata['rank_family'], metadata['rank_type_family'],
+                                 metadata['rank_article_bits'], metadata['rank_has_article']))
+                    continue
+                stored = table.get(self.collection_names.get(collection, collection), {}).get(result.get('chunk_id'))
+                if stored is not None:
+                    rows.append(stored)
+                    continue
+            rows.append(compute_chunk_features(collection, result.get('article', ''), doc_type))
+
+        columns = np.array(rows, dtype=np.int64).reshape(len(rows), len(FEATURE_KEYS))
+        return {
+            'family': columns[:, 0],
+            'type_family': columns[:, 1],
+            'article_bits': columns[:, 2],
+            'has_article': columns[:, 3].astype(bool)
+        }
+
+
+@lru_cache(maxsize=1024)
+def compute_query_features(query: str) -> Dict:
+    """
+    Calcule les caractéristiques d'une requête (une fois par requête)
+
+    Args:
+        query: Requête utilisateur
+
+    Returns:
+        Groupes de mots-clés présents et bits des articles de déontologie des thèmes de la requête
+    """
+    query_lower = query.lower()
+    features = {group: any(keyword in query_lower for keyword in keywords) for group, keywords in QUERY_KEYWORDS.items()}
+    features['theme_bits'] = 0
+    for theme, articles in DEONTOLOGIE_THEMES.items():
+        if theme in query_lower:
+            for article in articles:
+                features['theme_bits'] |= ARTICLE_BITS[article]
+    return features
+
+
+def unified_source_bonuses(features: Dict[str, np.ndarray], query: str) -> np.ndarray:
+    """
+    Bonus unifié de source (0-0.4) : famille de code, renforcé si l'article correspond aux mots-clés de la requête
+
+    Args:
+        features: Colonnes construites par ChunkFeatureStore.features_for
+        query: Requête utilisateur
+
+    Returns:
+        Bonus par résultat
+    """
+    query_features = compute_query_features(query)
+    family = features['family']
+    bits = features['article_bits']
+
+    # Par famille : bonus de base, bonus renforcé, mots-clés requis et motifs d'article requis (0 = aucun)
+    base = UNIFIED_BASE_BONUS[family]
+    boosted = UNIFIED_BOOSTED_BONUS[family]
+    query_match = np.array([False, False, query_features['csp'], query_features['civil'],
+                            query_features['penal'], query_features['css']])[family]
+    required_bits = UNIFIED_REQUIRED_BITS[family]
+    article_match = (required_bits == 0) | ((bits & required_bits) != 0)
+    bonuses = np.where(query_match & article_match, boosted, base)
+    return np.where(features['has_article'], bonuses, 0.0)
+
+
+def type_bonuses(features: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Bonus selon le type de document (0-0.3)
+
+    Args:
+        features: Colonnes construites par ChunkFeatureStore.features_for
+
+    Returns:
+        Bonus par résultat
+    """
+    return TYPE_BONUS[features['type_family']]
+
+
+def article_bonuses(features: Dict[str, np.ndarray], query: str) -> np.ndarray:
+    """
+    Bonus selon la pertinence de l'article pour la requête (0-0.2)
+
+    Args:
+        features: Colonnes construites par ChunkFeatureStore.features_for
+        query: Requête utilisateur
+
+    Returns:
+        Bonus par résultat
+    """
+    query_features = compute_query_features(query)
+    bits = features['article_bits']
+    matches = (query_features['article_deontologie'] & ((bits & BITS_R4127) != 0)) \
+        | (query_features['article_csp'] & ((bits & BITS_CSP_RESPONSABILITE) != 0))
+    return np.where(features['has_article'] & matches, 0.2, 0.0)
+
+
+def deontologie_bonuses(features: Dict[str, np.ndarray], query: str) -> np.ndarray:
+    """
+    Bonus des articles de déontologie (0-0.4) : article du thème de la requête, sinon tout article R.4127
+
+    Args:
+        features: Colonnes construites par ChunkFeatureStore.features_for
+        query: Requête utilisateur
+
+    Returns:
+        Bonus par résultat
+    """
+    theme_bits = compute_query_features(query)['theme_bits']
+    bits = features['article_bits']
+    bonuses = np.where((bits & theme_bits) != 0, 0.4, np.where((bits & BITS_R4127) != 0, 0.2, 0.0))
+    return np.where(features['has_article'], bonuses, 0.0)
+
+
+if __name__ == "__main__":
+    print("🏷️ CARACTÉRISTIQUES DE CLASSEMENT DES CHUNKS")
+    print("=" * 40)
+    result = write_chunk_features(sys.argv[1] if len(sys.argv) > 1 else "chroma_db")
+    for name, features in result.items():
+        with_article = sum(1 for row in features.values() if row[3])
+        print(f"  - {name}: {len(features)} chunks ({with_article} avec article)")
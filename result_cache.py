@@ -0,0 +1,305 @@
+"""
+Cache persistant des résultats de recherche pour LegalDocBot
+Évite de relancer recherche et reranking pour une situation déjà analysée, y compris entre sessions
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from config import RAG_CONFIG
+from corpus_manifest import get_manifest_path, load_corpus_manifest
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fichiers ignorés pour la version du corpus : exports dérivés et journaux SQLite
+VERSION_EXCLUDED_DIRS = {"flat_index"}
+VERSION_EXCLUDED_FILES = {"corpus_manifest.json", "hnsw_params.json", "neighbour_index.json", "chunk_features.json"}
+VERSION_EXCLUDED_SUFFIXES = ("-wal", "-shm", "-journal")
+CHROMA_SQLITE_FILENAME = "chroma.sqlite3"
+
+
+def compute_corpus_version(chroma_path: str = "chroma_db") -> str:
+    """
+    Calcule une empreinte du contenu de la base ChromaDB
+
+    L'empreinte combine l'empreinte du manifeste (corpus_manifest, réécrit à chaque
+    ingestion) et l'état d'écriture de ChromaDB lu dans chroma.sqlite3 : numéros de
+    séquence appliqués par segment, nombre d'embeddings et collections. Toute écriture
+    (ajout, mise à jour, suppression) les fait évoluer, même à taille de fichiers
+    constante. Les dates des fichiers ne sont pas utilisées : ChromaDB les modifie à la
+    simple lecture. Sans chroma.sqlite3 lisible, le chemin et la taille des fichiers
+    servent de repli.
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+
+    Returns:
+        Empreinte hexadécimale ("absent" si le dossier n'existe pas)
+    """
+    root = Path(chroma_path)
+    if not root.exists():
+        return "absent"
+
+    manifest = load_corpus_manifest(chroma_path) or {}
+    write_state = _chroma_write_state(root / CHROMA_SQLITE_FILENAME)
+    if write_state is None:
+        write_state = _file_size_fingerprint(root)
+
+    digest = hashlib.sha1()
+    digest.update(f"manifest:{manifest.get('content_hash', '')}\n".encode("utf-8"))
+    digest.update(write_state.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _chroma_write_state(sqlite_path: Path) -> Optional[str]:
+    """État d'écriture de ChromaDB (lecture seule de chroma.sqlite3), None s'il est illisible"""
+    if not sqlite_path.exists():
+        return None
+    try:
+        connection = sqlite3.connect(f"file:{sqlite_path}?mode=ro", uri=True, timeout=5.0)
+        try:
+            collections = connection.execute("SELECT id, name FROM collections ORDER BY id").fetchall()
+            sequences = connection.execute("SELECT segment_id, seq_id FROM max_seq_id ORDER BY segment_id").fetchall()
+            embeddings = connection.execute("SELECT COUNT(*), MAX(seq_id) FROM embeddings").fetchone()
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ État d'écriture ChromaDB illisible ({sqlite_path}): {e}")
+        return None
+    return json.dumps([collections, sequences, list(embeddings)], default=str)
+
+
+def _file_size_fingerprint(root: Path) -> str:
+    """Chemin et taille des fichiers de la base (repli sans chroma.sqlite3 lisible)"""
+    lines = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if name not in VERSION_EXCLUDED_DIRS)
+        for filename in sorted(filenames):
+            if filename in VERSION_EXCLUDED_FILES or filename.endswith(VERSION_EXCLUDED_SUFFIXES):
+                continue
+            path = Path(directory) / filename
+            try:
+                size = path.stat().st_size
+            except OSError:
+                continue
+            lines.append(f"{path.relative_to(root).as_posix()}:{size}")
+    return "\n".join(lines)
+
+
+def _version_signature(chroma_path: str) -> tuple:
+    """Dates et tailles du manifeste et de chroma.sqlite3 (et de son journal WAL) : test de changement à coût quasi nul"""
+    signature = []
+    for path in (get_manifest_path(chroma_path), Path(chroma_path) / CHROMA_SQLITE_FILENAME,
+                 Path(chroma_path) / f"{CHROMA_SQLITE_FILENAME}-wal"):
+        try:
+            stat = path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class SearchResultCache:
+    """
+    Cache SQLite des résultats de recherche, avec TTL et éviction LRU
+    """
+
+    def __init__(self, db_path: str, chroma_path: str = "chroma_db", ttl_seconds: float = 86400,
+                 max_entries: int = 2000):
+        """
+        Initialise le cache (le fichier SQLite est créé au besoin)
+
+        Args:
+            db_path: Fichier SQLite du cache
+            chroma_path: Dossier de la base ChromaDB (pour la version du corpus)
+            ttl_seconds: Durée de validité d'une entrée
+            max_entries: Nombre maximum d'entrées avant éviction des moins récemment utilisées
+        """
+        self.db_path = Path(db_path)
+        self.chroma_path = chroma_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._corpus_version = None
+        self._version_signature = None
+        self.hits = 0
+        self.misses = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS search_results ("
+                " key TEXT PRIMARY KEY,"
+                " corpus_version TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " payload TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_search_results_access ON search_results (last_access)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connexion SQLite d'une opération (utilisable depuis tout thread) : transaction validée puis connexion fermée"""
+        connection = sqlite3.connect(str(self.db_path), timeout=5.0)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @property
+    def corpus_version(self) -> str:
+        """
+        Version du corpus, recalculée dès que le manifeste ou chroma.sqlite3 change
+
+        Une ingestion faite par un autre processus (python document_processor.py)
+        est ainsi prise en compte sans appel à invalidate.
+        """
+        signature = _version_signature(self.chroma_path)
+        if self._corpus_version is None or signature != self._version_signature:
+            self._corpus_version = compute_corpus_version(self.chroma_path)
+            self._version_signature = signature
+        return self._corpus_version
+
+    @staticmethod
+    def make_key(query: str, top_k: int, mode: str, use_reranking: bool = True, variant: str = "") -> str:
+        """
+        Construit la clé de cache d'une recherche
+
+        Args:
+            query: Requête de recherche
+            top_k: Nombre de résultats demandés
+            mode: Mode de recherche ("dense" ou "hybrid")
+            use_reranking: Reranking cross-encoder appliqué
+            variant: Autre paramètre influant sur les résultats (stratégie d'expansion, ...)
+
+        Returns:
+            Clé hexadécimale
+        """
+        normalized = " ".join(unicodedata.normalize("NFC", query).lower().split())
+        raw_key = json.dumps([normalized, int(top_k), mode, bool(use_reranking), variant], ensure_ascii=False)
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """
+        Retourne les résultats en cache pour une clé
+
+        Args:
+            key: Clé construite par make_key
+
+        Returns:
+            Résultats de recherche, ou None si absents, expirés ou d'une autre version du corpus
+        """
+        now = time.time()
+        try:
+            with self._lock, self._connect() as connection:
+                row = connection.execute(
+                    "SELECT corpus_version, created_at, payload FROM search_results WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is None or row[0] != self.corpus_version or now - row[1] > self.ttl_seconds:
+                    if row is not None:
+                        connection.execute("DELETE FROM search_results WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                connection.execute("UPDATE search_results SET last_access = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return json.loads(row[2])
+        except Exception as e:
+            logger.warning(f"⚠️ Lecture du cache de résultats impossible: {e}")
+            return None
+
+    def put(self, key: str, results: List[Dict]):
+        """
+        Enregistre des résultats de recherche, puis évince les entrées en excès
+
+        Args:
+            key: Clé construite par make_key
+            results: Résultats de recherche (sérialisables en JSON)
+        """
+        now = time.time()
+        try:
+            payload = json.dumps(results, ensure_ascii=False, default=_to_json)
+            with self._lock, self._connect() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO search_results (key, corpus_version, created_at, last_access, payload)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, self.corpus_version, now, now, payload)
+                )
+                connection.execute("DELETE FROM search_results WHERE created_at < ?", (now - self.ttl_seconds,))
+                connection.execute(
+                    "DELETE FROM search_results WHERE key IN ("
+                    " SELECT key FROM search_results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Écriture du cache de résultats impossible: {e}")
+
+    def invalidate(self):
+        """Vide le cache et recalcule la version du corpus (après ajout de documents)"""
+        try:
+            with self._lock, self._connect() as connection:
+                connection.execute("DELETE FROM search_results")
+        except Exception as e:
+            logger.warning(f"⚠️ Invalidation du cache de résultats impossible: {e}")
+        self._corpus_version = None
+        logger.info("🗑️ Cache des résultats de recherche invalidé")
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache
+
+        Returns:
+            Dictionnaire avec hits, misses, nombre d'entrées, version du corpus et taux de succès
+        """
+        try:
+            with self._connect() as connection:
+                entries = connection.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+        except Exception:
+            entries = 0
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "corpus_version": self.corpus_version,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+def _to_json(value):
+    """Convertit les scalaires NumPy (scores du cross-encoder) pour json.dumps"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+# Instance globale
+_search_result_cache = None
+
+def get_search_result_cache() -> SearchResultCache:
+    """Retourne l'instance globale du cache de résultats"""
+    global _search_result_cache
+    if _search_result_cache is None:
+        cache_config = RAG_CONFIG["result_cache"]
+        _search_result_cache = SearchResultCache(
+            db_path=cache_config["path"],
+            chroma_path=cache_config["chroma_path"],
+            ttl_seconds=cache_config["ttl_seconds"],
+            max_entries=cache_config["max_entries"]
+        )
+    return _search_result_cache
@@ -0,0 +1,214 @@
+"""
+Cache des scores cross-encoder pour LegalDocBot
+Une même situation est rerankée plusieurs fois par analyse (recherches ChromaDB, lettres, plaidoiries) :
+les paires (requête, document) déjà scorées ne repassent pas par le transformer
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import RAG_CONFIG
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_query(query: str) -> str:
+    """Empreinte d'une requête normalisée (NFC, minuscules, espaces réduits)"""
+    normalized = " ".join(unicodedata.normalize("NFC", query).lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:20]
+
+
+def fingerprint_document(document: str) -> str:
+    """Empreinte du contenu d'un document : stable quel que soit l'id du chunk ou la collection"""
+    return hashlib.sha1((document or "").encode("utf-8")).hexdigest()[:20]
+
+
+class ScoreCache:
+    """
+    Cache LRU borné des scores (requête, document), avec persistance SQLite optionnelle
+    """
+
+    def __init__(self, max_entries: int = 20000, persist_path: Optional[str] = None):
+        """
+        Initialise le cache (et relit les scores persistés les plus récents)
+
+        Args:
+            max_entries: Nombre maximum de scores gardés (éviction LRU)
+            persist_path: Fichier SQLite de persistance (None = mémoire seulement)
+        """
+        self.max_entries = max_entries
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.persist_path is not None:
+            try:
+                self._load()
+            except Exception as e:
+                logger.warning(f"⚠️ Cache des scores persistant indisponible: {e}")
+                self.persist_path = None
+
+    @staticmethod
+    def make_key(model_name: str, backend: str, query: str, document: str) -> str:
+        """
+        Construit la clé d'une paire (requête, document) pour un modèle et son backend d'inférence
+
+        Les scores PyTorch, ONNX et ONNX int8 d'un même modèle diffèrent légèrement :
+        le backend fait partie de la clé pour ne jamais servir le score d'un autre backend.
+
+        Args:
+            model_name: Nom du cross-encoder
+            backend: Backend d'inférence ('torch', 'onnx', 'onnx-int8')
+            query: Requête
+            document: Texte du document
+
+        Returns:
+            Clé du cache
+        """
+        return f"{model_name}@{backend}|{fingerprint_query(query)}|{fingerprint_document(document)}"
+
+    def get_many(self, keys: List[str]) -> List[Optional[float]]:
+        """
+        Retourne les scores en cache
+
+        Args:
+            keys: Clés construites par make_key
+
+        Returns:
+            Score de chaque clé, None si absent
+        """
+        scores = []
+        with self._lock:
+            for key in keys:
+                score = self._scores.get(key)
+                if score is None:
+                    self.misses += 1
+                else:
+                    self._scores.move_to_end(key)
+                    self.hits += 1
+                scores.append(score)
+        return scores
+
+    def put_many(self, items: List[Tuple[str, float]]):
+        """
+        Enregistre des scores, puis évince les moins récemment utilisés
+
+        Args:
+            items: Paires (clé, score)
+        """
+        if not items:
+            return
+        with self._lock:
+            for key, score in items:
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+        if self.persist_path is not None:
+            self._persist(items)
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache
+
+        Returns:
+            Dictionnaire avec hits, misses, nombre de scores, persistance et taux de succès
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._scores),
+                "max_entries": self.max_entries,
+                "persistent": self.persist_path is not None,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0
+            }
+
+    def clear(self):
+        """Vide le cache (et sa copie persistée) et remet les compteurs à zéro"""
+        with self._lock:
+            self._scores.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.persist_path is not None:
+            try:
+                with self._connect() as connection:
+                    connection.execute("DELETE FROM scores")
+            except Exception as e:
+                logger.warning(f"⚠️ Vidage du cache des scores persistant impossible: {e}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connexion SQLite d'une opération (utilisable depuis tout thread) : transaction validée puis connexion fermée"""
+        connection = sqlite3.connect(str(self.persist_path), timeout=5.0)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _load(self):
+        """Crée la table au besoin et relit les scores les plus récents"""
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            rows = connection.execute(
+                "SELECT key, score FROM scores ORDER BY updated_at DESC LIMIT ?", (self.max_entries,)
+            ).fetchall()
+        for key, score in reversed(rows):
+            self._scores[key] = score
+        if rows:
+            logger.info(f"💾 {len(rows)} scores cross-encoder relus depuis {self.persist_path}")
+
+    def _persist(self, items: List[Tuple[str, float]]):
+        """Écrit des scores sur disque et borne la table à max_entries"""
+        now = time.time()
+        try:
+            with self._connect() as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO scores (key, score, updated_at) VALUES (?, ?, ?)",
+                    [(key, float(score), now) for key, score in items]
+                )
+                connection.execute(
+                    "DELETE FROM scores WHERE key IN ("
+                    " SELECT key FROM scores ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Écriture du cache des scores impossible: {e}")
+
+
+# Instance globale
+_score_cache = None
+_score_cache_lock = threading.Lock()
+
+def get_score_cache() -> Optional[ScoreCache]:
+    """Retourne l'instance globale du cache des scores (None si désactivé)"""
+    global _score_cache
+    cache_config = RAG_CONFIG["reranking"]["score_cache"]
+    if not cache_config["enabled"]:
+        return None
+    if _score_cache is None:
+        with _score_cache_lock:
+            if _score_cache is None:
+                _score_cache = ScoreCache(
+                    max_entries=cache_config["max_entries"],
+                    persist_path=cache_config["path"] if cache_config["persist"] else None
+                )
+    return _score_cache
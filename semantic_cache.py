@@ -0,0 +1,258 @@
+"""
+Cache sémantique des analyses pour LegalDocBot
+Retrouve une situation quasi identique déjà traitée (similarité cosinus des embeddings)
+pour réutiliser ses résultats de recherche, et son analyse Grok-4 si la reformulation
+est assez proche (seuil plus strict)
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import RAG_CONFIG
+from query_expansion import segment_situation
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_situation(situation: str) -> str:
+    """Empreinte d'une situation normalisée (NFC, minuscules, espaces réduits)"""
+    normalized = " ".join(unicodedata.normalize("NFC", situation).lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class SemanticQueryCache:
+    """
+    Index plat en mémoire des situations déjà analysées (embeddings normalisés)
+    """
+
+    def __init__(self, embedding_function: Optional[Callable[[str], List[float]]] = None,
+                 similarity_threshold: float = 0.92, analysis_similarity_threshold: float = 0.97,
+                 max_length_ratio: float = 1.25, max_entries: int = 500, cache_analysis: bool = True):
+        """
+        Initialise un cache vide
+
+        Args:
+            embedding_function: Fonction texte -> embedding (défaut: cache d'embeddings de ChromaDBSearch)
+            similarity_threshold: Similarité minimale pour réutiliser les résultats de recherche
+            analysis_similarity_threshold: Similarité minimale (plus stricte) pour réutiliser l'analyse Grok-4
+            max_length_ratio: Écart de longueur (en mots) maximal entre deux situations rapprochées
+            max_entries: Nombre maximum de situations conservées (éviction LRU)
+            cache_analysis: Conserver et réutiliser les analyses Grok-4
+        """
+        self._embedding_function = embedding_function
+        self.similarity_threshold = similarity_threshold
+        self.analysis_similarity_threshold = max(analysis_similarity_threshold, similarity_threshold)
+        self.max_length_ratio = max_length_ratio
+        self.max_entries = max_entries
+        self.cache_analysis = cache_analysis
+        self._lock = threading.Lock()
+        self._entries = []
+        self._matrix = None
+        self.lookups = 0
+        self.bundle_hits = 0
+        self.analysis_hits = 0
+
+    def lookup(self, situation: str, mode: str, fast: bool) -> Optional[Dict]:
+        """
+        Cherche la situation déjà analysée la plus proche
+
+        Une situation proche (similarité et longueur) donne ses résultats de recherche;
+        son analyse Grok-4 n'est rendue qu'au-delà du seuil plus strict des analyses
+        (ou pour la même situation) : une simple reformulation évite un nouvel appel
+        Grok-4, deux récits qui diffèrent sur un fait ne partagent pas leur analyse.
+
+        Args:
+            situation: Situation soumise
+            mode: Mode d'analyse
+            fast: Analyse rapide
+
+        Returns:
+            Dictionnaire situation, similarity, bundle et analysis (None si l'analyse n'est pas réutilisable),
+            ou None si aucune situation n'est assez proche
+        """
+        fingerprint = fingerprint_situation(situation)
+        with self._lock:
+            entry = self._find_exact(fingerprint)
+        if entry is not None:
+            similarity = 1.0
+        else:
+            vector = self._embed(situation)
+            words = len(situation.split())
+
+        with self._lock:
+            self.lookups += 1
+            if entry is None:
+                if self._matrix is None or not self._entries:
+                    return None
+
+                similarities = self._matrix @ vector
+                # Garde de longueur : pas de rapprochement entre récits de tailles très différentes
+                lengths = np.array([max(1, candidate['words']) for candidate in self._entries], dtype=np.float32)
+                ratios = np.maximum(lengths, max(1, words)) / np.minimum(lengths, max(1, words))
+                similarities = np.where(ratios <= self.max_length_ratio, similarities, -1.0)
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+                if similarity < self.similarity_threshold:
+                    return None
+                entry = self._entries[best]
+
+            entry['last_access'] = time.time()
+            self.bundle_hits += 1
+
+            analysis = None
+            if self.cache_analysis and (entry['fingerprint'] == fingerprint
+                                        or similarity >= self.analysis_similarity_threshold):
+                analysis = entry['analyses'].get((mode, bool(fast)))
+                if analysis is not None:
+                    self.analysis_hits += 1
+
+            return {
+                'situation': entry['situation'],
+                'similarity': round(similarity, 4),
+                'bundle': entry['bundle'],
+                'analysis': analysis
+            }
+
+    def store_bundle(self, situation: str, bundle: Dict):
+        """
+        Enregistre les résultats de recherche d'une situation
+
+        Args:
+            situation: Situation analysée
+            bundle: Résultats de recherche (ChromaDB, jurisprudence, ONIAM)
+        """
+        fingerprint = fingerprint_situation(situation)
+        with self._lock:
+            entry = self._find_exact(fingerprint)
+            if entry is not None:
+                entry['bundle'] = bundle
+                entry['last_access'] = time.time()
+                return
+
+        vector = self._embed(situation)
+        with self._lock:
+            if self._find_exact(fingerprint) is not None:
+                return
+
+            if len(self._entries) >= self.max_entries:
+                self._evict_least_recent()
+
+            self._entries.append({
+                'situation': situation,
+                'fingerprint': fingerprint,
+                'words': len(situation.split()),
+                'bundle': bundle,
+                'analyses': {},
+                'last_access': time.time()
+            })
+            row = vector[np.newaxis, :]
+            self._matrix = row if self._matrix is None else np.vstack([self._matrix, row])
+
+    def store_analysis(self, situation: str, mode: str, fast: bool, analysis: str):
+        """
+        Enregistre l'analyse Grok-4 d'une situation dont les résultats de recherche sont en cache
+
+        Args:
+            situation: Situation analysée
+            mode: Mode d'analyse
+            fast: Analyse rapide
+            analysis: Analyse finale
+        """
+        if not self.cache_analysis:
+            return
+        with self._lock:
+            entry = self._find_exact(fingerprint_situation(situation))
+            if entry is not None:
+                entry['analyses'][(mode, bool(fast))] = analysis
+
+    def get_stats(self) -> Dict:
+        """
+        Retourne les statistiques du cache
+
+        Returns:
+            Dictionnaire avec recherches, succès (hits = résultats réutilisés, dont analyses), échecs et taux de succès
+        """
+        with self._lock:
+            misses = self.lookups - self.bundle_hits
+            return {
+                'lookups': self.lookups,
+                'hits': self.bundle_hits,
+                'bundle_hits': self.bundle_hits,
+                'analysis_hits': self.analysis_hits,
+                'misses': misses,
+                'entries': len(self._entries),
+                'hit_ratio': round(self.bundle_hits / self.lookups, 3) if self.lookups else 0.0
+            }
+
+    def clear(self):
+        """Vide le cache et remet les compteurs à zéro"""
+        with self._lock:
+            self._entries = []
+            self._matrix = None
+            self.lookups = 0
+            self.bundle_hits = 0
+            self.analysis_hits = 0
+
+    def _find_exact(self, fingerprint: str) -> Optional[Dict]:
+        """Retourne l'entrée de la même situation (empreinte du texte normalisé), s'il y en a une"""
+        for entry in self._entries:
+            if entry['fingerprint'] == fingerprint:
+                return entry
+        return None
+
+    def _evict_least_recent(self):
+        """Supprime la situation la moins récemment utilisée"""
+        oldest = min(range(len(self._entries)), key=lambda i: self._entries[i]['last_access'])
+        del self._entries[oldest]
+        self._matrix = np.delete(self._matrix, oldest, axis=0)
+
+    def _embed(self, text: str) -> np.ndarray:
+        """
+        Retourne l'embedding normalisé (norme 1) d'un texte
+
+        Une situation longue est découpée en fenêtres de phrases (segment_situation) dont les
+        embeddings sont moyennés : la fin du texte compte malgré la troncature du modèle.
+        """
+        if self._embedding_function is None:
+            from chromadb_search import get_chromadb_search
+            # Même modèle et même cache que les requêtes ChromaDB
+            self._embedding_function = get_chromadb_search().embedding_cache.get_embedding
+        retrieval_config = RAG_CONFIG["retrieval"]
+        windows = segment_situation(
+            text, retrieval_config["segment_window_sentences"], retrieval_config["segment_max_windows"],
+            retrieval_config["segmentation_min_words"]
+        )
+        if windows:
+            vector = np.mean([np.asarray(self._embedding_function(window), dtype=np.float32) for window in windows], axis=0)
+        else:
+            vector = np.asarray(self._embedding_function(text), dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+
+# Instance globale
+_semantic_cache = None
+
+def get_semantic_cache() -> Optional[SemanticQueryCache]:
+    """Retourne l'instance globale du cache sémantique (None si désactivé)"""
+    global _semantic_cache
+    cache_config = RAG_CONFIG["semantic_cache"]
+    if not cache_config["enabled"]:
+        return None
+    if _semantic_cache is None:
+        _semantic_cache = SemanticQueryCache(
+            similarity_threshold=cache_config["similarity_threshold"],
+            analysis_similarity_threshold=cache_config["analysis_similarity_threshold"],
+            max_length_ratio=cache_config["max_length_ratio"],
+            max_entries=cache_config["max_entries"],
+            cache_analysis=cache_config["cache_analysis"]
+        )
+    return _semantic_cache
@@ -0,0 +1,234 @@
+"""
+Index lexical BM25 pour LegalDocBot
+Complète la recherche vectorielle ChromaDB sur les références exactes (L.1142-1, R.4127-35, ...)
+"""
+
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Mots vides français (sans accents, après pliage)
+FRENCH_STOPWORDS = {
+    "a", "au", "aux", "avec", "ce", "ces", "cette", "dans", "de", "des", "du", "elle", "en", "et",
+    "eux", "il", "ils", "je", "la", "le", "les", "leur", "leurs", "lui", "ma", "mais", "me", "meme",
+    "mes", "moi", "mon", "ne", "nos", "notre", "nous", "on", "ou", "par", "pas", "pour", "qu", "que",
+    "qui", "sa", "se", "ses", "son", "sur", "ta", "te", "tes", "toi", "ton", "tu", "un", "une", "vos",
+    "votre", "vous", "est", "sont", "ete", "etre", "avoir", "fait", "ont", "y", "d", "l", "n", "s",
+    "c", "j", "m", "t", "article", "articles", "alinea"
+}
+
+# Références d'articles : L.1142-1, R. 4127-35, D1142-3, ...
+ARTICLE_REF_PATTERN = re.compile(r"\b([lrd])\s*\.?\s*(\d+(?:-\d+)*)\b")
+WORD_PATTERN = re.compile(r"\d+(?:-\d+)+|\w+")
+
+
+def fold_accents(text: str) -> str:
+    """
+    Supprime les accents et met en minuscules
+
+    Args:
+        text: Texte brut
+
+    Returns:
+        Texte sans accents, en minuscules
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize_french(text: str) -> List[str]:
+    """
+    Tokenise un texte juridique français pour l'index BM25
+
+    Les références d'articles sont conservées comme un seul token (l1142-1),
+    accompagné de leur préfixe sans alinéa (l1142) pour les recherches partielles.
+
+    Args:
+        text: Texte à tokeniser
+
+    Returns:
+        Liste de tokens
+    """
+    folded = fold_accents(text)
+    tokens = []
+
+    for letter, number in ARTICLE_REF_PATTERN.findall(folded):
+        tokens.append(f"{letter}{number}")
+        if "-" in number:
+            tokens.append(f"{letter}{number.split('-')[0]}")
+
+    for word in WORD_PATTERN.findall(ARTICLE_REF_PATTERN.sub(" ", folded)):
+        if word in FRENCH_STOPWORDS or (len(word) < 2 and not word.isdigit()):
+            continue
+        # Pliage minimal du pluriel
+        if len(word) > 4 and word.endswith(("s", "x")) and not word[-2].isdigit():
+            word = word[:-1]
+        tokens.append(word)
+
+    return tokens
+
+
+class SparseIndex:
+    """
+    Index inversé BM25 en mémoire sur les chunks ChromaDB
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialise un index vide
+
+        Args:
+            k1: Saturation de la fréquence des termes
+            b: Normalisation par la longueur du document
+        """
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.collections = []
+        self._term_frequencies = []
+        self._postings = {}
+        self._collection_codes = None
+        self._collection_names = []
+        self.is_built = False
+
+    def add(self, collection_name: str, chunk_id: str, document: str, metadata: Optional[Dict]):
+        """
+        Ajoute un chunk à l'index (avant build)
+
+        Args:
+            collection_name: Clé de la collection
+            chunk_id: Identifiant ChromaDB du chunk
+            document: Texte du chunk
+            metadata: Métadonnées du chunk
+        """
+        self.ids.append(chunk_id)
+        self.documents.append(document or "")
+        self.metadatas.append(metadata or {})
+        self.collections.append(collection_name)
+        self._term_frequencies.append(Counter(tokenize_french(document or "")))
+
+    def add_records(self, collection_name: str, records: Iterable[Tuple[str, str, Dict]]):
+        """
+        Ajoute une série de chunks (id, document, métadonnées)
+
+        Args:
+            collection_name: Clé de la collection
+            records: Itérable de tuples (id, document, métadonnées)
+        """
+        for chunk_id, document, metadata in records:
+            self.add(collection_name, chunk_id, document, metadata)
+
+    def build(self):
+        """
+        Calcule les poids BM25 de chaque posting
+
+        Les fréquences brutes sont libérées ensuite : pour intégrer de nouveaux
+        chunks, reconstruire un nouvel index.
+        """
+        total_docs = len(self.ids)
+        doc_lengths = np.array([sum(tf.values()) for tf in self._term_frequencies], dtype=np.float32)
+        average_length = float(doc_lengths.mean()) if total_docs else 0.0
+
+        raw_postings = {}
+        for position, term_frequencies in enumerate(self._term_frequencies):
+            for term, frequency in term_frequencies.items():
+                raw_postings.setdefault(term, []).append((position, frequency))
+
+        self._postings = {}
+        for term, postings in raw_postings.items():
+            positions = np.array([p for p, _ in postings], dtype=np.int32)
+            frequencies = np.array([f for _, f in postings], dtype=np.float32)
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[positions] / (average_length or 1.0))
+            weights = idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+            self._postings[term] = (positions, weights.astype(np.float32))
+
+        self._collection_names = sorted(set(self.collections))
+        codes = {name: code for code, name in enumerate(self._collection_names)}
+        self._collection_codes = np.array([codes[name] for name in self.collections], dtype=np.int16)
+        self._term_frequencies = []
+        self.is_built = True
+        logger.info(f"✅ Index BM25 construit: {total_docs} chunks, {len(self._postings)} termes")
+
+    def search(self, query: str, top_k: int = 10, collection_name: Optional[str] = None) -> List[Tuple[int, float]]:
+        """
+        Recherche BM25
+
+        Args:
+            query: Requête de recherche
+            top_k: Nombre maximum de résultats
+            collection_name: Restreindre à une collection
+
+        Returns:
+            Liste de tuples (position dans l'index, score BM25) par score décroissant
+        """
+        if not self.is_built or not self.ids:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize_french(query)):
+            if term in self._postings:
+                positions, weights = self._postings[term]
+                scores[positions] += weights
+
+        if collection_name is not None:
+            if collection_name not in self._collection_names:
+                return []
+            scores[self._collection_codes != self._collection_names.index(collection_name)] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return []
+        if candidates.size > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(position), float(scores[position])) for position in candidates]
+
+    def get_record(self, position: int) -> Dict:
+        """
+        Retourne le chunk stocké à une position de l'index
+
+        Args:
+            position: Position retournée par search
+
+        Returns:
+            Dictionnaire id, document, metadata, collection
+        """
+        return {
+            "id": self.ids[position],
+            "document": self.documents[position],
+            "metadata": self.metadatas[position],
+            "collection": self.collections[position]
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> Dict[str, float]:
+    """
+    Fusionne plusieurs classements par Reciprocal Rank Fusion
+
+    Args:
+        rankings: Listes d'identifiants, chacune triée par pertinence décroissante
+        k: Constante d'amortissement RRF
+
+    Returns:
+        Dictionnaire identifiant -> score RRF
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, 1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    return fused
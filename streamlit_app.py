@@ -444,6 +444,11 @@ def main():
         st.subheader("💰 Calculateur d'Indemnisation")
         st.info("Fonctionnalité en cours de développement...")
         st.markdown("</div>", unsafe_allow_html=True)
+    
+    # Préchauffage ChromaDB en arrière-plan, une fois l'interface affichée
+    chromadb_search = get_chromadb_search()
+    if chromadb_search:
+        chromadb_search.start_warm_up()
 
 if __name__ == "__main__":
     main() 
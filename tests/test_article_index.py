@@ -0,0 +1,71 @@
+"""
+Tests de la normalisation des références d'articles et du filtre par préfixe
+"""
+
+import pytest
+
+from article_index import ArticleIndex, extract_article_refs, normalize_article_ref
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("Article L. 1142-1 du CSP", "L.1142-1"),
+    ("L.1142-1", "L.1142-1"),
+    ("l1142-1", "L.1142-1"),
+    ("r4127-35", "R.4127-35"),
+    ("Art. R. 4127-4", "R.4127-4"),
+    ("D.6124-1", "D.6124-1"),
+    ("art. 1240 du Code civil", "1240"),
+    ("121-3", "121-3"),
+    ("Article 1240", "1240"),
+])
+def test_normalize_article_ref(raw, expected):
+    assert normalize_article_ref(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["", None, "secret médical", "voir annexe"])
+def test_normalize_article_ref_unrecognized(raw):
+    assert normalize_article_ref(raw) is None
+
+
+def test_extract_article_refs_ignores_bare_numbers():
+    text = "Selon l'article L. 1142-1 et l'art. 1240, le patient (45 ans) invoque R4127-35."
+    assert extract_article_refs(text) == ["L.1142-1", "R.4127-35", "1240"]
+
+
+@pytest.fixture
+def index():
+    article_index = ArticleIndex()
+    for chunk_id, article in [
+        ("c1", "Article L. 1142-1"),
+        ("c2", "L.1142-2"),
+        ("c3", "L.1143-1"),
+        ("c4", "L.1110-4"),
+        ("c5", "R.4127-4"),
+    ]:
+        article_index.add("csp", chunk_id, {"article": article})
+    article_index.add("deontologie", "d1", {"article": "R.4127-4"})
+    return article_index
+
+
+def test_match_prefix_returns_raw_metadata_values(index):
+    assert index.match_prefix("L.1142*", "csp") == ["Article L. 1142-1", "L.1142-2"]
+
+
+def test_match_prefix_normalizes_the_prefix(index):
+    assert index.match_prefix("l114*", "csp") == ["Article L. 1142-1", "L.1142-2", "L.1143-1"]
+
+
+def test_match_prefix_is_scoped_to_the_collection(index):
+    assert index.match_prefix("R.4127*", "csp") == ["R.4127-4"]
+    assert index.match_prefix("R.4127*", "civil") == []
+
+
+def test_match_prefix_unrecognized_prefix(index):
+    assert index.match_prefix("*", "csp") == []
+    assert index.match_prefix("secret", "csp") == []
+
+
+def test_lookup_accepts_raw_references(index):
+    assert index.lookup("article L1142-1") == [("csp", "c1")]
+    assert index.lookup("R.4127-4", collection_name="deontologie") == [("deontologie", "d1")]
+    assert "l. 1143-1" in index
@@ -0,0 +1,75 @@
+"""
+Tests des statistiques communes aux caches affichées dans l'onglet Analytics
+"""
+
+import sys
+from unittest import mock
+
+import pytest
+
+import result_cache
+import score_cache
+from config import RAG_CONFIG
+from result_cache import SearchResultCache
+from score_cache import ScoreCache
+from semantic_cache import SemanticQueryCache
+
+COMMON_KEYS = {"hits", "misses", "hit_ratio"}
+
+
+def fake_embedding(text):
+    return [1.0, 0.0] if "compresse" in text else [0.0, 1.0]
+
+
+@pytest.fixture
+def caches(tmp_path):
+    semantic = SemanticQueryCache(embedding_function=fake_embedding)
+    semantic.store_bundle("Oubli d'une compresse lors d'une opération", {"chromadb": []})
+    semantic.lookup("Oubli d'une compresse lors d'une opération", "chromadb_rag", False)
+    semantic.lookup("Refus de soins aux urgences pédiatriques de nuit", "chromadb_rag", False)
+    return {
+        "score": ScoreCache(max_entries=10),
+        "semantic": semantic,
+        "results": SearchResultCache(str(tmp_path / "results.sqlite3"), chroma_path=str(tmp_path / "chroma_db"))
+    }
+
+
+def test_all_caches_expose_the_common_stats_keys(caches):
+    for cache in caches.values():
+        assert COMMON_KEYS <= set(cache.get_stats())
+
+
+def test_semantic_cache_hits_count_reused_bundles(caches):
+    stats = caches["semantic"].get_stats()
+    assert stats["hits"] == stats["bundle_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+@pytest.fixture
+def ui_utils(monkeypatch):
+    streamlit = mock.MagicMock()
+    streamlit.columns.side_effect = lambda count: [mock.MagicMock() for _ in range(count)]
+    monkeypatch.setitem(sys.modules, "streamlit", streamlit)
+    monkeypatch.delitem(sys.modules, "ui_utils", raising=False)
+    try:
+        import ui_utils
+    except (ImportError, SyntaxError) as e:
+        pytest.skip(f"ui_utils non importable dans cet environnement: {e}")
+    return ui_utils
+
+
+def test_display_cache_stats_renders_all_three_caches(ui_utils, caches, monkeypatch):
+    monkeypatch.setitem(RAG_CONFIG["result_cache"], "enabled", True)
+    monkeypatch.setattr(score_cache, "get_score_cache", lambda: caches["score"])
+    monkeypatch.setattr(result_cache, "get_search_result_cache", lambda: caches["results"])
+    monkeypatch.setattr(ui_utils, "get_semantic_cache", lambda: caches["semantic"])
+
+    ui_utils.display_cache_stats()
+
+    metrics = ui_utils.st.metric.call_args_list
+    assert [call.args[0] for call in metrics] == [
+        "Scores cross-encoder", "Situations similaires", "Résultats de recherche"
+    ]
+    assert metrics[1].args[1] == "50%"
+    assert metrics[1].kwargs["help"] == "1 succès, 1 échecs"
@@ -0,0 +1,146 @@
+"""
+Tests du reranking unifié en cascade : budget de candidats et coupure anticipée
+"""
+
+import random
+
+import pytest
+
+import chromadb_reranker
+from chromadb_reranker import CascadePolicy, ChromaDBReranker, UNIFIED_CROSS_ENCODER_WEIGHT
+from ranking_features import ChunkFeatureStore
+
+CASCADE_CONFIG = {
+    "enabled": True,
+    "keep": 10,
+    "min_candidates": 20,
+    "max_candidates": 40,
+    "latency_budget_ms": 250,
+    "step": 8
+}
+
+
+class FakeScorer:
+    """Cross-encoder déterministe : score fixé par document"""
+
+    model_name = "fake-cross-encoder"
+    backend = "fake"
+    is_available = True
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.pairs_scored = 0
+
+    def score_pairs_with_stats(self, pairs, batch_size=None):
+        self.pairs_scored += len(pairs)
+        return [self.scores[document] for _, document in pairs], len(pairs), 0.001 * len(pairs)
+
+    def score_pairs(self, pairs, batch_size=None):
+        return self.score_pairs_with_stats(pairs, batch_size)[0]
+
+
+class FakeRegistry:
+    def __init__(self, scorer):
+        self.scorer = scorer
+
+    def get_cross_encoder(self, model_name=None):
+        return self.scorer
+
+
+def make_results(n_results, seed):
+    generator = random.Random(seed)
+    collections = ["deontologie", "csp", "civil", "penal", "css"]
+    articles = ["R.4127-4", "L.1142-1", "1382", "121-1", "L.161-1", ""]
+    return [
+        {
+            'content': f"document {index}",
+            'collection': collections[index % len(collections)],
+            'article': articles[index % len(articles)],
+            'doc_type': '',
+            'chunk_id': f"chunk-{index}",
+            'relevance_score': generator.random()
+        }
+        for index in range(n_results)
+    ]
+
+
+def make_reranker(monkeypatch, tmp_path, scores, cascade_config):
+    scorer = FakeScorer(scores)
+    monkeypatch.setattr(chromadb_reranker, "get_model_registry", lambda: FakeRegistry(scorer))
+    reranker = ChromaDBReranker()
+    reranker.cascade = CascadePolicy(cascade_config)
+    reranker.features = ChunkFeatureStore(chroma_path=str(tmp_path))
+    return reranker, scorer
+
+
+def test_budget_is_bounded_by_min_and_max_candidates():
+    policy = CascadePolicy(CASCADE_CONFIG)
+    assert policy.candidate_budget(75) == 40  # Pas encore de mesure : budget maximum
+    assert policy.candidate_budget(15) == 15
+
+    policy.record_latency(10, 0.5)  # 50 ms par paire -> 5 candidats, relevé au minimum
+    assert policy.candidate_budget(75) == 20
+
+    slow = CascadePolicy(CASCADE_CONFIG)
+    slow.record_latency(100, 0.01)  # 0.1 ms par paire -> 2500 candidats, plafonné au maximum
+    assert slow.candidate_budget(75) == 40
+
+
+def test_fully_cached_batches_do_not_update_latency():
+    policy = CascadePolicy(CASCADE_CONFIG)
+    policy.record_latency(0, 0.2)
+    assert policy.ms_per_pair is None
+
+
+def test_disabled_cascade_scores_every_candidate():
+    policy = CascadePolicy({**CASCADE_CONFIG, "enabled": False})
+    policy.record_latency(10, 0.5)
+    assert policy.candidate_budget(75) == 75
+
+
+@pytest.mark.parametrize("seed, correlated", [(0, True), (1, True), (2, False), (3, False)])
+def test_early_cutoff_keeps_the_exhaustive_top_k(monkeypatch, tmp_path, seed, correlated):
+    """La coupure ne s'applique que si le score cross-encoder maximal (1.0) ne peut plus entrer dans le top-k"""
+    results = make_results(120, seed)
+    generator = random.Random(seed + 100)
+    scores = {
+        result['content']: result['relevance_score'] if correlated else generator.random()
+        for result in results
+    }
+    unbounded = {**CASCADE_CONFIG, "min_candidates": len(results), "max_candidates": len(results)}
+
+    cascade, cascade_scorer = make_reranker(monkeypatch, tmp_path, scores, unbounded)
+    exhaustive, exhaustive_scorer = make_reranker(monkeypatch, tmp_path, scores, {**unbounded, "enabled": False})
+
+    cascade_top = cascade.rerank_unified_results([dict(result) for result in results], "faute et responsabilité")
+    exhaustive_top = exhaustive.rerank_unified_results([dict(result) for result in results], "faute et responsabilité")
+
+    assert [result['chunk_id'] for result in cascade_top] == [result['chunk_id'] for result in exhaustive_top]
+    assert [result['final_score'] for result in cascade_top] == [result['final_score'] for result in exhaustive_top]
+    assert exhaustive_scorer.pairs_scored == len(results)
+    assert cascade_scorer.pairs_scored <= len(results)
+    if correlated:
+        assert cascade_scorer.pairs_scored < len(results)
+
+    stats = cascade.cascade.get_stats()['last_request']
+    assert stats['scored'] == cascade_scorer.pairs_scored
+    assert stats['skipped_cutoff'] == len(results) - stats['scored']
+
+
+def test_cutoff_bound_holds_for_unscored_candidates(monkeypatch, tmp_path):
+    """Aucun candidat coupé n'aurait dépassé le k-ième score final, même avec un score cross-encoder de 1"""
+    results = make_results(120, 5)
+    scores = {result['content']: result['relevance_score'] for result in results}
+    reranker, _ = make_reranker(monkeypatch, tmp_path, scores, {**CASCADE_CONFIG, "max_candidates": 120})
+
+    top = reranker.rerank_unified_results([dict(result) for result in results], "faute et responsabilité")
+    kth_score = top[-1]['final_score']
+    stats = reranker.cascade.last_stats
+    assert stats['skipped_cutoff'] > 0
+
+    _, cheap_scores = reranker._cheap_unified_scores(results, "faute et responsabilité")
+    order = sorted(range(len(results)), key=lambda index: cheap_scores[index], reverse=True)
+    top_ids = {result['chunk_id'] for result in top}
+    for index in order[stats['scored']:stats['budget']]:
+        assert results[index]['chunk_id'] not in top_ids
+        assert UNIFIED_CROSS_ENCODER_WEIGHT + cheap_scores[index] <= kth_score + 1e-3
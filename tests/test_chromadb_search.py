@@ -0,0 +1,66 @@
+"""
+Tests de la recherche unifiée : clé du cache de résultats et diffusion progressive des collections
+"""
+
+import time
+
+import pytest
+
+import chromadb_search
+from chromadb_search import ChromaDBSearch
+from config import RAG_CONFIG
+from result_cache import SearchResultCache
+
+
+@pytest.fixture(autouse=True)
+def result_cache_enabled(monkeypatch):
+    # make_key est statique : pas de fichier SQLite créé pour construire les clés
+    monkeypatch.setitem(RAG_CONFIG["result_cache"], "enabled", True)
+    monkeypatch.setattr(chromadb_search, "get_search_result_cache", lambda: SearchResultCache)
+
+
+@pytest.fixture
+def search():
+    return ChromaDBSearch()
+
+
+def cache_key(search):
+    return search._unified_cache_key("secret médical", 10, None, True, None)
+
+
+def test_cache_key_does_not_open_chromadb(search):
+    cache_key(search)
+    assert search._collections is None
+
+
+@pytest.mark.parametrize("section, setting, value", [
+    ("retrieval", "vector_backend", "numpy_int8"),
+    ("retrieval", "collection_layout", "merged"),
+    ("retrieval", "two_phase_fetch", False),
+    ("retrieval", "preselect_candidates", 60),
+    ("reranking", "inference_backend", "onnx"),
+    ("reranking", "cascade", {**RAG_CONFIG["reranking"]["cascade"], "enabled": False}),
+])
+def test_cache_key_changes_with_the_pipeline_settings(monkeypatch, section, setting, value):
+    before = cache_key(ChromaDBSearch())
+    monkeypatch.setitem(RAG_CONFIG[section], setting, value)
+    assert cache_key(ChromaDBSearch()) != before
+
+
+def test_cache_key_changes_with_filters(search):
+    assert search._unified_cache_key("secret médical", 10, None, True, {"collections": ["csp"]}) != cache_key(search)
+
+
+def slow_collection_task(collection_name):
+    time.sleep({"rapide": 0.0, "moyenne": 0.05, "bloquee": 1.0}[collection_name])
+    return collection_name
+
+
+def test_stream_fan_out_does_not_count_the_consumer_time(search, monkeypatch):
+    monkeypatch.setattr(search, "parallel_search", True)
+    monkeypatch.setattr(search, "collection_timeout", 0.3)
+    streamed = []
+    for collection_name, _ in search._stream_fan_out(slow_collection_task, ["rapide", "moyenne", "bloquee"]):
+        streamed.append(collection_name)
+        time.sleep(0.4)  # affichage plus long que l'échéance des collections
+    assert streamed == ["rapide", "moyenne"]
@@ -0,0 +1,46 @@
+"""
+Tests du découpage des situations longues en fenêtres de phrases
+"""
+
+from query_expansion import segment_situation
+
+
+def make_situation(n_sentences: int, words_per_sentence: int = 12) -> str:
+    return " ".join(
+        f"Phrase {index} " + " ".join(["mot"] * (words_per_sentence - 2)) + "."
+        for index in range(n_sentences)
+    )
+
+
+def test_short_situation_is_not_segmented():
+    assert segment_situation("Le chirurgien a oublié une compresse.", min_words=120) == []
+
+
+def test_few_sentences_are_not_segmented():
+    situation = make_situation(3, words_per_sentence=60)
+    assert segment_situation(situation, window_sentences=3, min_words=120) == []
+
+
+def test_windows_overlap_by_one_sentence():
+    situation = make_situation(7)
+    windows = segment_situation(situation, window_sentences=3, max_windows=10, min_words=50)
+    assert [window.split()[1] for window in windows] == ["0", "2", "4"]
+    assert windows[-1].endswith("mot.")
+    assert "Phrase 6" in windows[-1]
+
+
+def test_every_sentence_is_covered():
+    situation = make_situation(10)
+    windows = segment_situation(situation, window_sentences=3, max_windows=10, min_words=50)
+    for index in range(10):
+        assert any(f"Phrase {index} " in window for window in windows)
+
+
+def test_max_windows_keeps_first_and_last():
+    situation = make_situation(40)
+    all_windows = segment_situation(situation, window_sentences=3, max_windows=100, min_words=50)
+    windows = segment_situation(situation, window_sentences=3, max_windows=6, min_words=50)
+    assert len(windows) == 6
+    assert windows[0] == all_windows[0]
+    assert windows[-1] == all_windows[-1]
+    assert all(window in all_windows for window in windows)
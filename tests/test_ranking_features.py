@@ -0,0 +1,196 @@
+"""
+Parité des bonus vectorisés (ranking_features) avec les bonus scalaires
+historiques du reranker ChromaDB (_calculate_*_bonus)
+
+Les bonus historiques cherchaient les motifs ('l.1142', 'r.4127', ...) dans
+l'article brut en minuscules; les bonus vectorisés les cherchent dans
+l'identifiant normalisé (normalize_article_id). La parité est donc vérifiée
+sur l'article normalisé, et l'écart voulu sur les articles bruts est documenté.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from ranking_features import (ChunkFeatureStore, article_bonuses, deontologie_bonuses, normalize_article_id,
+                              type_bonuses, unified_source_bonuses)
+
+COLLECTIONS = ["deontologie", "csp", "css", "penal", "civil", "legal_corpus"]
+DOC_TYPES = ["", "deontologie", "Code de la santé publique", "code_civil"]
+ARTICLES = [
+    "", "R.4127-4", "R.4127-36", "R.4127-104", "R.4127-1", "r4127-35", "Article R. 4127-72",
+    "L.1142-1", "Article L. 1142-1", "l1143-2", "L.1110-4", "1382", "art. 1383", "121-1",
+    "121-2", "121-3", "D.6124-1", "Préambule",
+]
+QUERIES = [
+    "secret médical et consentement éclairé",
+    "faute du chirurgien et dommage",
+    "infraction pénale et sanction",
+    "remboursement par l'assurance maladie et la sécurité sociale",
+    "éthique du médecin",
+    "information du patient sur les risques",
+    "question sans mot-clé",
+]
+
+
+# --- Bonus scalaires historiques (chromadb_reranker avant vectorisation) ---
+
+def reference_type_bonus(collection: str, doc_type: str) -> float:
+    collection_lower = collection.lower()
+    doc_type_lower = doc_type.lower()
+    if 'deontologie' in collection_lower or 'deontologie' in doc_type_lower:
+        return 0.3
+    elif 'csp' in collection_lower or 'santé' in doc_type_lower:
+        return 0.2
+    elif 'civil' in collection_lower:
+        return 0.15
+    elif 'penal' in collection_lower:
+        return 0.15
+    elif 'css' in collection_lower:
+        return 0.1
+    return 0.0
+
+
+def reference_article_bonus(article: str, query: str) -> float:
+    if not article:
+        return 0.0
+    query_lower = query.lower()
+    article_lower = article.lower()
+    deontologie_keywords = ['secret', 'consentement', 'information', 'responsabilité', 'confidentialité']
+    if any(keyword in query_lower for keyword in deontologie_keywords):
+        if 'r.4127' in article_lower:
+            return 0.2
+    csp_keywords = ['responsabilité', 'faute', 'accident', 'erreur', 'maladie']
+    if any(keyword in query_lower for keyword in csp_keywords):
+        if 'l.1142' in article_lower or 'l.1143' in article_lower:
+            return 0.2
+    return 0.0
+
+
+def reference_deontologie_bonus(article: str, query: str) -> float:
+    if not article:
+        return 0.0
+    query_lower = query.lower()
+    article_lower = article.lower()
+    deontologie_mapping = {
+        'secret': ['r.4127-4', 'r.4127-72', 'r.4127-104'],
+        'consentement': ['r.4127-36', 'r.4127-37', 'r.4127-38'],
+        'information': ['r.4127-35', 'r.4127-47', 'r.4127-48'],
+        'responsabilité': ['r.4127-95', 'r.4127-96', 'r.4127-97'],
+        'confidentialité': ['r.4127-4', 'r.4127-72', 'r.4127-104'],
+        'éthique': ['r.4127-1', 'r.4127-2', 'r.4127-3']
+    }
+    for theme, articles in deontologie_mapping.items():
+        if theme in query_lower:
+            if any(art in article_lower for art in articles):
+                return 0.4
+    if 'r.4127' in article_lower:
+        return 0.2
+    return 0.0
+
+
+def reference_unified_source_bonus(collection: str, article: str, query: str) -> float:
+    if not article:
+        return 0.0
+    query_lower = query.lower()
+    collection_lower = collection.lower()
+    article_lower = article.lower()
+    collection_bonus = 0.0
+    if 'deontologie' in collection_lower:
+        collection_bonus = 0.4
+        deontologie_keywords = ['secret', 'consentement', 'information', 'responsabilité', 'confidentialité', 'éthique']
+        if any(keyword in query_lower for keyword in deontologie_keywords):
+            if 'r.4127' in article_lower:
+                return 0.4
+    elif 'csp' in collection_lower:
+        collection_bonus = 0.3
+        csp_keywords = ['responsabilité', 'faute', 'accident', 'erreur', 'maladie', 'santé']
+        if any(keyword in query_lower for keyword in csp_keywords):
+            if 'l.1142' in article_lower or 'l.1143' in article_lower:
+                return 0.4
+    elif 'civil' in collection_lower:
+        collection_bonus = 0.25
+        civil_keywords = ['responsabilité', 'dommage', 'faute', 'réparation']
+        if any(keyword in query_lower for keyword in civil_keywords):
+            if '1382' in article_lower or '1383' in article_lower:
+                return 0.3
+    elif 'penal' in collection_lower:
+        collection_bonus = 0.25
+        penal_keywords = ['faute', 'délit', 'infraction', 'sanction']
+        if any(keyword in query_lower for keyword in penal_keywords):
+            if '121-1' in article_lower or '121-2' in article_lower:
+                return 0.3
+    elif 'css' in collection_lower:
+        collection_bonus = 0.2
+        css_keywords = ['sécurité sociale', 'assurance', 'remboursement']
+        if any(keyword in query_lower for keyword in css_keywords):
+            return 0.25
+    return collection_bonus
+
+
+# --- Tests ---
+
+@pytest.fixture(scope="module")
+def results():
+    return [
+        {'collection': collection, 'article': article, 'doc_type': doc_type,
+         'chunk_id': f"{collection}-{position}", 'metadata': {'doc_type': doc_type}}
+        for position, (collection, article, doc_type) in enumerate(itertools.product(COLLECTIONS, ARTICLES, DOC_TYPES))
+    ]
+
+
+@pytest.fixture(scope="module")
+def features(results, tmp_path_factory):
+    # Dossier sans table annexe : caractéristiques calculées à la volée
+    store = ChunkFeatureStore(chroma_path=str(tmp_path_factory.mktemp("chroma_db")))
+    return store.features_for(results)
+
+
+def test_type_bonuses_match_reference(results, features):
+    expected = [reference_type_bonus(result['collection'], result['doc_type']) for result in results]
+    np.testing.assert_allclose(type_bonuses(features), expected)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_article_bonuses_match_reference(results, features, query):
+    expected = [reference_article_bonus(normalize_article_id(result['article']), query) for result in results]
+    np.testing.assert_allclose(article_bonuses(features, query), expected)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_deontologie_bonuses_match_reference(results, features, query):
+    expected = [reference_deontologie_bonus(normalize_article_id(result['article']), query) for result in results]
+    np.testing.assert_allclose(deontologie_bonuses(features, query), expected)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_unified_source_bonuses_match_reference(results, features, query):
+    expected = [
+        reference_unified_source_bonus(result['collection'], normalize_article_id(result['article']), query)
+        for result in results
+    ]
+    np.testing.assert_allclose(unified_source_bonuses(features, query), expected)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_bonuses_match_reference_on_canonical_articles(results, features, query):
+    """Articles déjà au format canonique (L.1142-1, R.4127-4) : parité exacte avec l'article brut"""
+    canonical = [index for index, result in enumerate(results)
+                 if normalize_article_id(result['article']) == result['article'].lower()]
+    expected = [reference_unified_source_bonus(results[index]['collection'], results[index]['article'], query)
+                for index in canonical]
+    np.testing.assert_allclose(unified_source_bonuses(features, query)[canonical], expected)
+
+
+def test_normalization_rewards_spaced_references(tmp_path):
+    """Écart voulu : "Article L. 1142-1" était manqué par le test de sous-chaîne sur l'article brut"""
+    query = "faute du chirurgien"
+    raw_article = "Article L. 1142-1"
+    store = ChunkFeatureStore(chroma_path=str(tmp_path))
+    features = store.features_for([{'collection': 'csp', 'article': raw_article, 'doc_type': '', 'chunk_id': 'c1'}])
+
+    assert reference_unified_source_bonus('csp', raw_article, query) == pytest.approx(0.3)
+    assert reference_article_bonus(raw_article, query) == 0.0
+    assert unified_source_bonuses(features, query)[0] == pytest.approx(0.4)
+    assert article_bonuses(features, query)[0] == pytest.approx(0.2)
@@ -0,0 +1,70 @@
+"""
+Tests de la version du corpus qui invalide le cache des résultats
+"""
+
+import json
+
+import pytest
+
+from corpus_manifest import get_manifest_path
+from result_cache import SearchResultCache, compute_corpus_version
+
+chromadb = pytest.importorskip("chromadb")
+
+
+def add_chunks(collection, start: int, count: int):
+    collection.add(
+        ids=[f"chunk-{index}" for index in range(start, start + count)],
+        documents=[f"Article L.1142-{index} : responsabilité médicale" for index in range(start, start + count)],
+        embeddings=[[float(index), 1.0, 0.0] for index in range(start, start + count)]
+    )
+
+
+@pytest.fixture
+def chroma_path(tmp_path):
+    path = tmp_path / "chroma_db"
+    client = chromadb.PersistentClient(path=str(path))
+    add_chunks(client.create_collection("csp_legislation"), 0, 5)
+    return str(path)
+
+
+def test_version_is_stable_across_reads(chroma_path):
+    version = compute_corpus_version(chroma_path)
+    collection = chromadb.PersistentClient(path=chroma_path).get_collection("csp_legislation")
+    collection.get(limit=5)
+    collection.query(query_embeddings=[[1.0, 1.0, 0.0]], n_results=2)
+    assert compute_corpus_version(chroma_path) == version
+
+
+def test_version_changes_after_an_update_of_the_same_size(chroma_path):
+    version = compute_corpus_version(chroma_path)
+    collection = chromadb.PersistentClient(path=chroma_path).get_collection("csp_legislation")
+    entry = collection.get(ids=["chunk-1"], include=["documents", "embeddings"])
+    collection.update(ids=["chunk-1"], documents=[entry["documents"][0].upper()], embeddings=entry["embeddings"])
+    assert compute_corpus_version(chroma_path) != version
+
+
+def test_version_changes_when_chunks_are_added(chroma_path):
+    version = compute_corpus_version(chroma_path)
+    add_chunks(chromadb.PersistentClient(path=chroma_path).get_collection("csp_legislation"), 5, 1)
+    assert compute_corpus_version(chroma_path) != version
+
+
+def test_version_follows_the_manifest_hash(chroma_path):
+    manifest_path = get_manifest_path(chroma_path)
+    manifest_path.write_text(json.dumps({"content_hash": "aaaa"}), encoding="utf-8")
+    version = compute_corpus_version(chroma_path)
+    manifest_path.write_text(json.dumps({"content_hash": "bbbb"}), encoding="utf-8")
+    assert compute_corpus_version(chroma_path) != version
+
+
+def test_missing_database_has_a_version(tmp_path):
+    assert compute_corpus_version(str(tmp_path / "absent")) == compute_corpus_version(str(tmp_path / "absent"))
+
+
+def test_cache_rechecks_the_version_on_access(chroma_path, tmp_path):
+    cache = SearchResultCache(str(tmp_path / "results.sqlite3"), chroma_path=chroma_path)
+    version = cache.corpus_version
+    assert cache.corpus_version == version
+    add_chunks(chromadb.PersistentClient(path=chroma_path).get_collection("csp_legislation"), 5, 2)
+    assert cache.corpus_version != version
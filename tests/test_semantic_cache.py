@@ -0,0 +1,77 @@
+"""
+Tests du cache sémantique : réutilisation des recherches et des analyses Grok-4
+"""
+
+import math
+
+import pytest
+
+from semantic_cache import SemanticQueryCache
+
+ORIGINAL = "Le chirurgien a oublié une compresse dans l'abdomen lors de l'opération du 12 mars."
+REWORDED = "Lors de l'opération du 12 mars, une compresse a été oubliée dans l'abdomen par le chirurgien."
+RELATED = "Le chirurgien a oublié un instrument dans le ventre lors de l'intervention du 3 avril."
+LONGER = ORIGINAL + " La patiente a souffert d'une infection, a été réopérée deux fois et demande réparation."
+
+
+def vector_at(similarity):
+    """Vecteur unitaire dont le cosinus avec [1, 0] vaut similarity"""
+    return [similarity, math.sqrt(1 - similarity ** 2)]
+
+
+EMBEDDINGS = {
+    ORIGINAL: [1.0, 0.0],
+    REWORDED: vector_at(0.99),
+    RELATED: vector_at(0.94),
+    LONGER: vector_at(0.995),
+}
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticQueryCache(embedding_function=EMBEDDINGS.__getitem__, similarity_threshold=0.92,
+                               analysis_similarity_threshold=0.97, max_length_ratio=1.25)
+    cache.store_bundle(ORIGINAL, {"chroma": ["L.1142-1"]})
+    cache.store_analysis(ORIGINAL, "chromadb_rag", False, "analyse Grok-4")
+    return cache
+
+
+def test_reworded_situation_reuses_the_cached_analysis(cache):
+    cached = cache.lookup(REWORDED, "chromadb_rag", False)
+    assert cached["similarity"] == pytest.approx(0.99)
+    assert cached["bundle"] == {"chroma": ["L.1142-1"]}
+    assert cached["analysis"] == "analyse Grok-4"
+    assert cache.get_stats()["analysis_hits"] == 1
+
+
+def test_same_normalized_situation_reuses_the_analysis(cache):
+    cached = cache.lookup("  " + ORIGINAL.upper() + " ", "chromadb_rag", False)
+    assert cached["similarity"] == 1.0
+    assert cached["analysis"] == "analyse Grok-4"
+
+
+def test_related_situation_reuses_only_the_search_results(cache):
+    cached = cache.lookup(RELATED, "chromadb_rag", False)
+    assert cached["bundle"] == {"chroma": ["L.1142-1"]}
+    assert cached["analysis"] is None
+    assert cache.get_stats()["analysis_hits"] == 0
+
+
+def test_analysis_is_kept_per_mode(cache):
+    assert cache.lookup(REWORDED, "grok", False)["analysis"] is None
+    assert cache.lookup(REWORDED, "chromadb_rag", True)["analysis"] is None
+
+
+def test_length_guard_blocks_a_much_longer_situation(cache):
+    assert cache.lookup(LONGER, "chromadb_rag", False) is None
+
+
+def test_analysis_threshold_is_never_below_the_bundle_threshold():
+    cache = SemanticQueryCache(embedding_function=EMBEDDINGS.__getitem__, similarity_threshold=0.95,
+                               analysis_similarity_threshold=0.9)
+    assert cache.analysis_similarity_threshold == 0.95
+
+
+def test_cache_analysis_disabled(cache):
+    cache.cache_analysis = False
+    assert cache.lookup(REWORDED, "chromadb_rag", False)["analysis"] is None
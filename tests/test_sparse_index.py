@@ -0,0 +1,31 @@
+"""
+Tests de la fusion de classements (Reciprocal Rank Fusion)
+"""
+
+import pytest
+
+from sparse_index import reciprocal_rank_fusion
+
+
+def test_rrf_single_ranking_scores_by_rank():
+    fused = reciprocal_rank_fusion([["a", "b", "c"]], k=60)
+    assert fused == pytest.approx({"a": 1 / 61, "b": 1 / 62, "c": 1 / 63})
+
+
+def test_rrf_sums_contributions_across_rankings():
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=10)
+    assert fused["a"] == pytest.approx(1 / 11)
+    assert fused["b"] == pytest.approx(1 / 12 + 1 / 11)
+    assert fused["c"] == pytest.approx(1 / 12)
+    assert max(fused, key=fused.get) == "b"
+
+
+def test_rrf_document_first_everywhere_reaches_best_possible_score():
+    rankings = [["a", "b"], ["a", "c"], ["a"]]
+    fused = reciprocal_rank_fusion(rankings, k=60)
+    assert fused["a"] == pytest.approx(len(rankings) / 61)
+
+
+def test_rrf_empty_rankings():
+    assert reciprocal_rank_fusion([]) == {}
+    assert reciprocal_rank_fusion([[], []]) == {}
@@ -0,0 +1,81 @@
+"""
+Tests de la reconstruction des collections avec de nouveaux paramètres HNSW
+"""
+
+import pytest
+
+import result_cache
+from tune_hnsw import apply_hnsw_params, get_hnsw_params_path
+
+chromadb = pytest.importorskip("chromadb")
+from chromadb.api.models.Collection import Collection  # noqa: E402
+from chromadb.config import Settings  # noqa: E402
+
+COLLECTION = "csp_legislation"
+
+
+def open_client(chroma_path):
+    # Mêmes réglages que tune_hnsw : Chroma refuse deux clients aux réglages différents
+    return chromadb.PersistentClient(path=chroma_path, settings=Settings(anonymized_telemetry=False))
+
+
+class FakeResultCache:
+    def invalidate(self):
+        pass
+
+
+@pytest.fixture
+def chroma_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "get_search_result_cache", FakeResultCache)
+    path = str(tmp_path / "chroma_db")
+    collection = open_client(path).create_collection(
+        COLLECTION, metadata={"hnsw:space": "cosine"}, embedding_function=None
+    )
+    collection.add(
+        ids=[f"chunk-{index}" for index in range(5)],
+        documents=[f"Article L.1142-{index}" for index in range(5)],
+        embeddings=[[float(index), 1.0, 0.5] for index in range(5)],
+        metadatas=[{"article": f"L.1142-{index}"} for index in range(5)]
+    )
+    return path
+
+
+def collection_names(chroma_path):
+    return sorted(collection.name for collection in open_client(chroma_path).list_collections())
+
+
+def test_rebuild_replaces_the_collection(chroma_path):
+    assert apply_hnsw_params({"M": 32, "search_ef": 50}, chroma_path) == {COLLECTION: 5}
+
+    assert collection_names(chroma_path) == [COLLECTION]
+    collection = open_client(chroma_path).get_collection(COLLECTION, embedding_function=None)
+    assert collection.count() == 5
+    assert collection.metadata["hnsw:M"] == 32
+    assert collection.metadata["hnsw:space"] == "cosine"
+    assert get_hnsw_params_path(chroma_path).exists()
+
+
+def test_failed_rename_restores_the_original(chroma_path, monkeypatch):
+    original_modify = Collection.modify
+
+    def failing_modify(self, name=None, **kwargs):
+        if name == COLLECTION and self.name.endswith("_hnsw_rebuild"):
+            raise RuntimeError("renommage impossible")
+        return original_modify(self, name=name, **kwargs)
+
+    monkeypatch.setattr(Collection, "modify", failing_modify)
+    with pytest.raises(RuntimeError):
+        apply_hnsw_params({"M": 32}, chroma_path)
+
+    assert COLLECTION in collection_names(chroma_path)
+    collection = open_client(chroma_path).get_collection(COLLECTION, embedding_function=None)
+    assert collection.count() == 5
+    assert "hnsw:M" not in collection.metadata
+
+
+def test_leftover_backup_is_never_overwritten(chroma_path):
+    client = open_client(chroma_path)
+    client.create_collection(f"{COLLECTION}_hnsw_backup", embedding_function=None)
+    with pytest.raises(ValueError):
+        apply_hnsw_params({"M": 32}, chroma_path, collection_names=[COLLECTION])
+    assert client.get_collection(COLLECTION, embedding_function=None).count() == 5
@@ -0,0 +1,122 @@
+"""
+Tests des backends vectoriels : filtres `where`, contrôle de fraîcheur de l'export à plat et export int8
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from corpus_manifest import get_manifest_path
+from vector_backends import NumpyFlatBackend, QuantizedFlatBackend, matches_where, quantize_flat_index
+
+METADATA = {"code": "csp", "article": "L.1142-1", "page": 12}
+
+
+@pytest.mark.parametrize("where", [
+    None,
+    {},
+    {"code": "csp"},
+    {"code": {"$eq": "csp"}},
+    {"code": {"$ne": "civil"}},
+    {"article": {"$in": ["L.1142-1", "L.1142-2"]}},
+    {"article": {"$nin": ["R.4127-4"]}},
+    {"$and": [{"code": "csp"}, {"page": 12}]},
+    {"$or": [{"code": "civil"}, {"article": "L.1142-1"}]},
+    {"$and": [{"code": "csp"}, {"$or": [{"page": 1}, {"page": 12}]}]},
+])
+def test_matches_where_accepts(where):
+    assert matches_where(METADATA, where)
+
+
+@pytest.mark.parametrize("where", [
+    {"code": "civil"},
+    {"code": {"$eq": "civil"}},
+    {"code": {"$ne": "csp"}},
+    {"article": {"$in": ["R.4127-4"]}},
+    {"article": {"$nin": ["L.1142-1"]}},
+    {"$and": [{"code": "csp"}, {"page": 13}]},
+    {"$or": [{"code": "civil"}, {"code": "penal"}]},
+    {"missing": "value"},
+])
+def test_matches_where_rejects(where):
+    assert not matches_where(METADATA, where)
+
+
+def test_matches_where_without_metadata():
+    assert matches_where(None, None)
+    assert not matches_where(None, {"code": "csp"})
+    assert matches_where(None, {"code": {"$ne": "csp"}})
+
+
+def test_matches_where_unsupported_operator():
+    with pytest.raises(ValueError):
+        matches_where(METADATA, {"page": {"$gt": 3}})
+
+
+def write_flat_export(index_dir, content_hash="aaaa", count=3):
+    """Export à plat minimal d'une collection (comme export_flat_index)"""
+    index_dir.mkdir(parents=True, exist_ok=True)
+    matrix = np.eye(count, 4, dtype=np.float32)
+    np.save(index_dir / "csp_legislation.npy", matrix)
+    np.save(index_dir / "csp_legislation.norms.npy", np.einsum("ij,ij->i", matrix, matrix))
+    (index_dir / "csp_legislation.json").write_text(json.dumps({
+        "ids": [f"c{index}" for index in range(count)],
+        "documents": [f"document {index}" for index in range(count)],
+        "metadatas": [{"article": f"L.1142-{index}"} for index in range(count)],
+        "space": "l2"
+    }), encoding="utf-8")
+    (index_dir / "flat_index.json").write_text(json.dumps({"collections": {
+        "csp_legislation": {"count": count, "dimension": 4, "space": "l2", "content_hash": content_hash}
+    }}), encoding="utf-8")
+
+
+def write_corpus_manifest(chroma_path, content_hash="aaaa", count=3):
+    chroma_path.mkdir(parents=True, exist_ok=True)
+    get_manifest_path(str(chroma_path)).write_text(json.dumps({"collections": {
+        "csp_legislation": {"count": count, "content_hash": content_hash}
+    }}), encoding="utf-8")
+
+
+def test_flat_backend_without_manifest_skips_the_check_without_opening_chroma(tmp_path, monkeypatch):
+    chromadb = pytest.importorskip("chromadb")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("ChromaDB ne doit pas être ouvert au démarrage du backend à plat")
+
+    monkeypatch.setattr(chromadb, "PersistentClient", fail)
+    write_flat_export(tmp_path / "flat")
+    backend = NumpyFlatBackend(str(tmp_path / "flat"), chroma_path=str(tmp_path / "chroma_db"))
+    assert backend.get_collection("csp_legislation").count() == 3
+
+
+def test_flat_backend_accepts_an_export_matching_the_manifest(tmp_path):
+    write_flat_export(tmp_path / "flat")
+    write_corpus_manifest(tmp_path / "chroma_db")
+    assert NumpyFlatBackend(str(tmp_path / "flat"), chroma_path=str(tmp_path / "chroma_db")).list_collections() == [
+        "csp_legislation"
+    ]
+
+
+@pytest.mark.parametrize("manifest_hash, manifest_count", [("bbbb", 3), ("", 4)])
+def test_flat_backend_refuses_a_stale_export(tmp_path, manifest_hash, manifest_count):
+    write_flat_export(tmp_path / "flat")
+    write_corpus_manifest(tmp_path / "chroma_db", content_hash=manifest_hash, count=manifest_count)
+    with pytest.raises(ValueError):
+        NumpyFlatBackend(str(tmp_path / "flat"), chroma_path=str(tmp_path / "chroma_db"))
+
+
+def test_quantized_collection_reads_documents_on_demand(tmp_path):
+    write_flat_export(tmp_path / "flat", count=4)
+    quantize_flat_index(str(tmp_path / "flat"))
+    collection = QuantizedFlatBackend(str(tmp_path / "flat")).get_collection("csp_legislation")
+    exact = NumpyFlatBackend(str(tmp_path / "flat")).get_collection("csp_legislation")
+
+    assert not hasattr(collection, "documents") and not hasattr(collection, "metadatas")
+    query = [[0.0, 1.0, 0.2, 0.0]]
+    assert collection.query(query_embeddings=query, n_results=2) == exact.query(query_embeddings=query, n_results=2)
+    assert collection.get(ids=["c3", "c1"]) == exact.get(ids=["c3", "c1"])
+
+    where = {"article": {"$in": ["L.1142-0", "L.1142-2"]}}
+    assert collection.get(where=where)["documents"] == ["document 0", "document 2"]
+    assert collection.query(query_embeddings=query, n_results=4, where=where)["ids"] == [["c2", "c0"]]
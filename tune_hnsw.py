@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Réglage des paramètres HNSW pour LegalDocBot
+Reconstruit une collection avec des paramètres candidats dans un dossier de travail,
+mesure rappel@k (par rapport aux voisins exacts), latence et taille d'index,
+puis applique les paramètres retenus aux collections de production
+"""
+
+import json
+import logging
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import RETRIEVAL_BENCHMARK_QUERIES
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HNSW_PARAMS_FILENAME = "hnsw_params.json"
+HNSW_PARAM_KEYS = ("space", "M", "construction_ef", "search_ef")
+DEFAULT_SCRATCH_PATH = ".cache/hnsw_tuning"
+
+# Paramètres candidats (l'espace de distance est celui de la collection, sauf mention)
+DEFAULT_HNSW_GRID = [
+    {"M": 16, "construction_ef": 100, "search_ef": 10},
+    {"M": 16, "construction_ef": 100, "search_ef": 50},
+    {"M": 16, "construction_ef": 100, "search_ef": 100},
+    {"M": 32, "construction_ef": 200, "search_ef": 100},
+    {"M": 32, "construction_ef": 400, "search_ef": 200},
+    {"M": 48, "construction_ef": 400, "search_ef": 400},
+]
+
+
+def get_hnsw_params_path(chroma_path: str = "chroma_db") -> Path:
+    """Retourne le chemin des paramètres HNSW retenus pour une base ChromaDB"""
+    return Path(chroma_path) / HNSW_PARAMS_FILENAME
+
+
+def load_hnsw_params(chroma_path: str = "chroma_db") -> Dict:
+    """
+    Lit les paramètres HNSW retenus pour une base ChromaDB
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+
+    Returns:
+        Paramètres (space, M, construction_ef, search_ef); vide si aucun réglage n'a été appliqué
+    """
+    params_path = get_hnsw_params_path(chroma_path)
+    if not params_path.exists():
+        return {}
+    try:
+        with open(params_path, "r", encoding="utf-8") as f:
+            return {key: value for key, value in json.load(f).items() if key in HNSW_PARAM_KEYS}
+    except Exception as e:
+        logger.warning(f"⚠️ Paramètres HNSW illisibles ({params_path}): {e}")
+        return {}
+
+
+def hnsw_collection_metadata(params: Dict, metadata: Optional[Dict] = None) -> Dict:
+    """
+    Ajoute des paramètres HNSW aux métadonnées de création d'une collection
+
+    Args:
+        params: Paramètres (space, M, construction_ef, search_ef), éventuellement partiels
+        metadata: Métadonnées de la collection (les anciennes clés hnsw:* sont remplacées)
+
+    Returns:
+        Métadonnées à passer à create_collection
+    """
+    merged = {key: value for key, value in (metadata or {}).items() if not key.startswith("hnsw:")}
+    merged.update({f"hnsw:{key}": value for key, value in params.items() if key in HNSW_PARAM_KEYS})
+    return merged
+
+
+def read_collection_params(collection) -> Dict:
+    """Retourne les paramètres HNSW déclarés par une collection ChromaDB"""
+    metadata = collection.metadata or {}
+    params = {key: metadata[f"hnsw:{key}"] for key in HNSW_PARAM_KEYS if f"hnsw:{key}" in metadata}
+    params.setdefault("space", "l2")
+    return params
+
+
+def copy_collection(source, target, page_size: int = 1000) -> int:
+    """
+    Copie chunks, embeddings et métadonnées d'une collection vers une autre
+
+    Args:
+        source: Collection ChromaDB lue
+        target: Collection ChromaDB écrite
+        page_size: Nombre de chunks copiés par page
+
+    Returns:
+        Nombre de chunks copiés
+    """
+    copied = 0
+    while True:
+        page = source.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=copied)
+        if not page["ids"]:
+            break
+        target.add(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"],
+                   metadatas=page["metadatas"])
+        copied += len(page["ids"])
+        if len(page["ids"]) < page_size:
+            break
+    return copied
+
+
+def exact_neighbours(embeddings: np.ndarray, query_embeddings: np.ndarray, k: int, space: str) -> List[List[int]]:
+    """
+    Calcule les k plus proches voisins exacts (recherche exhaustive)
+
+    Args:
+        embeddings: Vecteurs de la collection (n x d)
+        query_embeddings: Vecteurs des requêtes (q x d)
+        k: Nombre de voisins
+        space: Espace de distance ChromaDB ("l2", "cosine" ou "ip")
+
+    Returns:
+        Positions des voisins, du plus proche au plus lointain, pour chaque requête
+    """
+    if space == "cosine":
+        embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        query_embeddings = query_embeddings / np.maximum(np.linalg.norm(query_embeddings, axis=1, keepdims=True), 1e-12)
+    scores = query_embeddings @ embeddings.T
+    if space == "l2":
+        # Distance euclidienne au carré, au terme constant de la requête près
+        scores = 2 * scores - np.einsum("ij,ij->i", embeddings, embeddings)[np.newaxis, :]
+    k = min(k, embeddings.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1).tolist()
+
+
+def directory_size(path: Path) -> int:
+    """Retourne la taille totale (octets) des fichiers d'un dossier"""
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def evaluate_hnsw_params(collection_name: str, grid: Optional[List[Dict]] = None, chroma_path: str = "chroma_db",
+                         scratch_path: str = DEFAULT_SCRATCH_PATH, queries: Optional[List[str]] = None,
+                         k: int = 10, repeats: int = 5) -> Dict:
+    """
+    Reconstruit une collection pour chaque jeu de paramètres et mesure rappel, latence et taille
+
+    La collection de production n'est pas modifiée : chaque essai est construit
+    dans son propre sous-dossier du dossier de travail, supprimé à la fin.
+
+    Args:
+        collection_name: Collection de production à copier
+        grid: Paramètres candidats (défaut: DEFAULT_HNSW_GRID)
+        chroma_path: Dossier de la base ChromaDB de production
+        scratch_path: Dossier de travail des reconstructions
+        queries: Requêtes de test (défaut: RETRIEVAL_BENCHMARK_QUERIES)
+        k: Nombre de voisins comparés
+        repeats: Passages par requête pour la latence (après un passage de préchauffage)
+
+    Returns:
+        Paramètres actuels de la collection et résultats par essai
+    """
+    import chromadb
+    from chromadb.config import Settings
+    from embedding_cache import QueryEmbeddingCache
+
+    grid = grid or DEFAULT_HNSW_GRID
+    queries = queries or RETRIEVAL_BENCHMARK_QUERIES
+    source = chromadb.PersistentClient(path=chroma_path, settings=Settings(anonymized_telemetry=False)).get_collection(collection_name)
+    current = read_collection_params(source)
+
+    # Vecteurs de la collection en mémoire pour la vérité terrain exacte
+    page = source.get(include=["embeddings"])
+    ids = page["ids"]
+    embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+    query_embeddings = np.asarray(QueryEmbeddingCache(max_size=len(queries)).get_embeddings(queries), dtype=np.float32)
+    exact_by_space = {}
+
+    trials = []
+    shutil.rmtree(scratch_path, ignore_errors=True)
+    for trial_number, params in enumerate(grid):
+        params = dict({"space": current["space"]}, **params)
+        if params["space"] not in exact_by_space:
+            exact_by_space[params["space"]] = [
+                [ids[position] for position in positions]
+                for positions in exact_neighbours(embeddings, query_embeddings, k, params["space"])
+            ]
+        exact = exact_by_space[params["space"]]
+
+        # Un dossier par essai : ChromaDB garde les bases ouvertes pendant tout le processus
+        scratch = Path(scratch_path) / f"trial_{trial_number}"
+        client = chromadb.PersistentClient(path=str(scratch), settings=Settings(anonymized_telemetry=False))
+        trial = client.create_collection(
+            collection_name, metadata=hnsw_collection_metadata(params), embedding_function=None
+        )
+
+        start = time.perf_counter()
+        copy_collection(source, trial)
+        build_seconds = time.perf_counter() - start
+
+        recalls = []
+        timings = []
+        for query_embedding, exact_ids in zip(query_embeddings.tolist(), exact):
+            for attempt in range(repeats + 1):
+                start = time.perf_counter()
+                results = trial.query(query_embeddings=[query_embedding], n_results=k, include=["distances"])
+                if attempt:
+                    timings.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(set(results["ids"][0]) & set(exact_ids)) / max(1, len(exact_ids)))
+
+        # Taille de l'index HNSW : dossiers de segments, hors base SQLite des documents
+        index_bytes = sum(directory_size(path) for path in scratch.iterdir() if path.is_dir())
+        timings.sort()
+        trials.append({
+            "params": params,
+            "recall": round(float(np.mean(recalls)), 4),
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 3),
+            "index_bytes": index_bytes,
+            "build_seconds": round(build_seconds, 2)
+        })
+        logger.info(f"📏 {collection_name} {params}: rappel@{k} {trials[-1]['recall']:.3f}, "
+                    f"p95 {trials[-1]['p95_ms']} ms, {index_bytes // 1024} KB")
+        del client
+
+    shutil.rmtree(scratch_path, ignore_errors=True)
+    return {"collection": collection_name, "count": len(ids), "k": k, "current": current, "trials": trials}
+
+
+def choose_hnsw_params(report: Dict, min_recall: float = 0.95) -> Optional[Dict]:
+    """
+    Retient l'essai le plus rapide (p95) parmi ceux qui atteignent le rappel minimal
+
+    Args:
+        report: Résultat de evaluate_hnsw_params
+        min_recall: Rappel@k minimal accepté
+
+    Returns:
+        Paramètres retenus, ou None si aucun essai n'atteint le rappel minimal
+    """
+    eligible = [trial for trial in report["trials"] if trial["recall"] >= min_recall]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda trial: (trial["p95_ms"], trial["index_bytes"]))["params"]
+
+
+def apply_hnsw_params(params: Dict, chroma_path: str = "chroma_db",
+                      collection_names: Optional[List[str]] = None) -> Dict:
+    """
+    Reconstruit les collections de production avec les paramètres retenus et les enregistre
+
+    Les paramètres HNSW sont fixés à la création d'une collection : chaque
+    collection est recopiée dans une collection temporaire, qui remplace ensuite
+    l'originale. L'originale est d'abord renommée en sauvegarde et n'est supprimée
+    qu'une fois la copie en place (restaurée si le renommage échoue). Les ingestions
+    suivantes (document_processor, legal_corpus) relisent les paramètres enregistrés.
+
+    Args:
+        params: Paramètres (space, M, construction_ef, search_ef)
+        chroma_path: Dossier de la base ChromaDB
+        collection_names: Collections à reconstruire (défaut: toutes)
+
+    Returns:
+        Nombre de chunks recopiés par collection
+    """
+    import chromadb
+    from chromadb.config import Settings
+    from result_cache import get_search_result_cache
+
+    params = {key: value for key, value in params.items() if key in HNSW_PARAM_KEYS}
+    client = chromadb.PersistentClient(path=chroma_path, settings=Settings(anonymized_telemetry=False))
+    available = [collection.name for collection in client.list_collections()]
+    collection_names = collection_names or available
+
+    rebuilt = {}
+    for collection_name in collection_names:
+        if collection_name not in available:
+            logger.warning(f"⚠️ Collection {collection_name} absente, ignorée")
+            continue
+        temporary_name = f"{collection_name}_hnsw_rebuild"
+        backup_name = f"{collection_name}_hnsw_backup"
+        if backup_name in available:
+            # Reste d'une reconstruction interrompue : seule copie possible des données, jamais écrasée
+            raise ValueError(f"Sauvegarde {backup_name} déjà présente, à vérifier avant de reconstruire {collection_name}")
+        if temporary_name in available:
+            client.delete_collection(temporary_name)
+
+        source = client.get_collection(collection_name, embedding_function=None)
+        # Paramètres non précisés (espace de distance, ...) : ceux de la collection d'origine
+        collection_params = dict(read_collection_params(source), **params)
+        temporary = client.create_collection(
+            temporary_name, metadata=hnsw_collection_metadata(collection_params, source.metadata),
+            embedding_function=None
+        )
+        rebuilt[collection_name] = copy_collection(source, temporary)
+        if rebuilt[collection_name] != source.count():
+            client.delete_collection(temporary_name)
+            raise ValueError(f"Copie incomplète de {collection_name}, collection d'origine conservée")
+
+        # Remplacement : originale -> sauvegarde, copie -> nom de l'originale, puis suppression de la sauvegarde
+        source.modify(name=backup_name)
+        try:
+            temporary.modify(name=collection_name)
+        except Exception:
+            source.modify(name=collection_name)
+            logger.error(f"❌ Remplacement de {collection_name} impossible, collection d'origine restaurée "
+                         f"(copie conservée dans {temporary_name})")
+            raise
+        client.delete_collection(backup_name)
+        logger.info(f"✅ {collection_name} reconstruite: {rebuilt[collection_name]} chunks, {collection_params}")
+
+    with open(get_hnsw_params_path(chroma_path), "w", encoding="utf-8") as f:
+        json.dump(params, f, ensure_ascii=False, indent=2)
+
+    # Nouveaux index : les résultats en cache peuvent différer
+    get_search_result_cache().invalidate()
+    return rebuilt
+
+
+def _print_report(report: Dict):
+    """Affiche le tableau des essais d'une collection"""
+    print(f"\n📖 {report['collection']} ({report['count']} chunks) - actuel: {report['current']}")
+    print(f"  {'space':<7}{'M':>4}{'c_ef':>6}{'s_ef':>6}{'rappel@' + str(report['k']):>11}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'index KB':>10}{'build s':>9}")
+    for trial in report["trials"]:
+        params = trial["params"]
+        print(f"  {params['space']:<7}{params['M']:>4}{params['construction_ef']:>6}{params['search_ef']:>6}"
+              f"{trial['recall']:>11.3f}{trial['p50_ms']:>9.2f}{trial['p95_ms']:>9.2f}"
+              f"{trial['index_bytes'] // 1024:>10}{trial['build_seconds']:>9.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "tune":
+        print("🎛️ RÉGLAGE HNSW : RAPPEL, LATENCE ET TAILLE D'INDEX")
+        print("=" * 40)
+        result = evaluate_hnsw_params(sys.argv[2])
+        _print_report(result)
+        chosen = choose_hnsw_params(result)
+        if chosen:
+            print(f"\n💡 Plus rapide à rappel@{result['k']} >= 0.95: {chosen}")
+            print(f"   Appliquer: python tune_hnsw.py apply {chosen['M']} {chosen['construction_ef']} "
+                  f"{chosen['search_ef']} {chosen['space']}")
+        else:
+            print("\n⚠️ Aucun essai n'atteint un rappel de 0.95")
+    elif len(sys.argv) > 4 and sys.argv[1] == "apply":
+        print("🔧 APPLICATION DES PARAMÈTRES HNSW")
+        print("=" * 40)
+        chosen = {"M": int(sys.argv[2]), "construction_ef": int(sys.argv[3]), "search_ef": int(sys.argv[4])}
+        if len(sys.argv) > 5:
+            chosen["space"] = sys.argv[5]
+        result = apply_hnsw_params(chosen, collection_names=sys.argv[6:] or None)
+        for name, count in result.items():
+            print(f"  - {name}: {count} chunks")
+        print(f"  Paramètres enregistrés dans {get_hnsw_params_path()}")
+    else:
+        print("Usage: python tune_hnsw.py tune <collection>")
+        print("       python tune_hnsw.py apply <M> <construction_ef> <search_ef> [space] [collections...]")
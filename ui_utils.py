@@ -13,11 +13,14 @@ import streamlit as st
 import pandas as pd
 import time
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from analytics_module import analytics
+from config import RAG_CONFIG
 from export_utils import export_to_pdf, export_letter_to_pdf, export_plea_to_pdf, compare_analyses
 from letter_generator import generate_professional_letter, generate_exceptional_plea
 from enhanced_analysis_module import EnhancedAnalysisModule
+from semantic_cache import get_semantic_cache
 # from bot_core import MedicalLegalBotHybrid  # Module supprimé
 
 # Configuration pour les systèmes disponibles
@@ -188,6 +191,19 @@ def get_grok_client():
     from grok_client import get_grok_client as get_grok
     return get_grok()
 
+def get_chromadb_corpus_label():
+    """
+    Libellé de la base ChromaDB, avec le nombre de chunks lu dans le manifeste du corpus
+    """
+    try:
+        from chromadb_search import get_chromadb_search
+        total_chunks = get_chromadb_search().get_total_chunks()
+        if total_chunks is None:
+            return "Base ChromaDB de textes juridiques (n/a chunks) - Reranking cross-encoder"
+        return f"Base ChromaDB avec {total_chunks:,} chunks de textes juridiques - Reranking cross-encoder"
+    except Exception:
+        return "Base ChromaDB de textes juridiques - Reranking cross-encoder"
+
 # --- CACHE PERSISTANT DES RÉSULTATS ---
 @st.cache_data(ttl=7200)  # Cache pour 2 heures
 def cached_analysis_result(situation_description, mode, fast_mode):
@@ -218,6 +234,47 @@ def create_mode_usage_chart(analytics):
     
     st.bar_chart(mode_data.set_index('Mode'))
 
+def display_cache_stats():
+    """Affiche le taux de succès des caches de recherche et de reranking"""
+    from result_cache import get_search_result_cache
+    from score_cache import get_score_cache
+    
+    caches = [("Scores cross-encoder", get_score_cache()), ("Situations similaires", get_semantic_cache())]
+    if RAG_CONFIG["result_cache"]["enabled"]:
+        caches.append(("Résultats de recherche", get_search_result_cache()))
+    
+    columns = st.columns(len(caches))
+    for column, (label, cache) in zip(columns, caches):
+        with column:
+            if cache is None:
+                st.metric(label, "désactivé")
+                continue
+            stats = cache.get_stats()
+            st.metric(label, f"{stats['hit_ratio']:.0%}", help=f"{stats['hits']} succès, {stats['misses']} échecs")
+
+def display_rerank_cascade_stats():
+    """Affiche le budget et l'efficacité du reranking en cascade (si le reranker a déjà servi)"""
+    import chromadb_reranker
+    
+    reranker = chromadb_reranker.chromadb_reranker  # Pas de chargement du modèle depuis l'onglet Analytics
+    if reranker is None or not reranker.cascade.get_stats()['requests']:
+        st.caption("Aucun reranking unifié pour le moment.")
+        return
+    
+    stats = reranker.cascade.get_stats()
+    last = stats['last_request']
+    columns = st.columns(3)
+    with columns[0]:
+        st.metric("Paires scorées", f"{stats['scored_ratio']:.0%}",
+                  help=f"{stats['scored']} paires scorées sur {stats['candidates']} candidats ({stats['requests']} requêtes)")
+    with columns[1]:
+        st.metric("Dernière requête", f"{last['scored']}/{last['candidates']}",
+                  help=f"Budget {last['budget']}, {last['skipped_budget']} hors budget, {last['skipped_cutoff']} coupées")
+    with columns[2]:
+        latency = f"{stats['ms_per_pair']:.1f} ms" if stats['ms_per_pair'] else "?"
+        st.metric("Latence par paire", latency,
+                  help=f"Budget {stats['latency_budget_ms']} ms, entre {stats['min_candidates']} et {stats['max_candidates']} candidats")
+
 def generate_structured_analysis(situation, top_chunks):
     context_text = "\n\n".join([
         f"{chunk.get('article') or chunk.get('section') or f'Page {chunk.get('page', '')}'}\n{chunk.get('texte')[:1000]}..."
@@ -382,7 +439,7 @@ def cached_analysis(situation_description, mode, fast_mode):
                     
                     total_results = len(unified_results)
                     chromadb_enrichment += f"✅ **{total_results} articles juridiques pertinents trouvés dans la base de connaissances**\n\n"
-                    chromadb_enrichment += "*Base ChromaDB avec 12,024 chunks de textes juridiques - Reranking cross-encoder*\n\n"
+                    chromadb_enrichment += f"*{get_chromadb_corpus_label()}*\n\n"
                 else:
                     chromadb_enrichment = "\n\nℹ️ *Aucun article juridique pertinent trouvé dans la base de connaissances*\n\n"
                     
@@ -583,7 +640,7 @@ def clean_and_structure_analysis(analysis_result, jurisprudence_results, oniam_r
         "🔍 Autres Sources Juridiques",
         "ARTICLES DE LOI PERTINENTS INTÉGRÉS :",
         "✅ **10 articles juridiques pertinents trouvés dans la base de connaissances**",
-        "Base ChromaDB avec 12,024 chunks de textes juridiques - Reranking cross-encoder"
+        get_chromadb_corpus_label()
     ]
     
     cleaned_analysis = analysis_result
@@ -795,7 +852,10 @@ def build_enriched_context(situation, juris, oniam, chroma):
     if chroma:
         ctx += "**ARTICLES DE LOI PERTINENTS :**\n"
         for a in chroma[:5]:
-            ctx += f"- {a.get('source_type', 'Code')} Article {a.get('article', '')} : {a.get('content', '')[:250]}...\n"
+            # Texte recollé avec les chunks voisins s'il est disponible (article complet)
+            text = a.get('context') or a.get('content', '')
+            limit = 1000 if a.get('context') else 250
+            ctx += f"- {a.get('source_type', 'Code')} Article {a.get('article', '')} : {text[:limit]}...\n"
         ctx += "\n"
     
     if juris:
@@ -812,6 +872,35 @@ def build_enriched_context(situation, juris, oniam, chroma):
     
     return ctx
 
+def stream_chromadb_preview(chromadb_search, situation, top_k=10):
+    """
+    Recherche ChromaDB progressive : affiche les premiers articles de chaque code dès leur arrivée
+    
+    Args:
+        chromadb_search: Système de recherche ChromaDB
+        situation: Situation à analyser
+        top_k: Nombre de résultats finaux
+        
+    Returns:
+        Résultats finaux (rerankés sur toutes les sources)
+    """
+    placeholder = st.empty()
+    preview_lines = []
+    final_results = []
+    for event in chromadb_search.stream_unified_legal_knowledge(situation, top_k=top_k):
+        if event['event'] == 'collection' and event['results']:
+            best = event['results'][0]
+            preview_lines.append(
+                f"- {best.get('source_type', event['collection'])} - Article {best.get('article', '')} "
+                f"({len(event['results'])} candidats, {event['elapsed']:.1f}s)"
+            )
+            placeholder.markdown("🔍 **Premiers articles trouvés :**\n" + "\n".join(preview_lines))
+        elif event['event'] == 'final':
+            final_results = event['results']
+    placeholder.empty()
+    print(f"✅ {len(final_results)} résultats ChromaDB classés")
+    return final_results
+
 def run_exceptional_analysis(situation, mode, fast):
     """
     Pipeline complet : search → enrich → analyse → UI 10/10
@@ -823,23 +912,49 @@ def run_exceptional_analysis(situation, mode, fast):
 
     print("🚀 ANALYSE EXCEPTIONNELLE 10/10 - Démarrage...")
     
-    try:
-        # 2. Recherche multi-sources
-        print("🔍 Recherche multi-sources...")
-        juris, oniam = organize_google_results(situation)
-        
-        # Recherche ChromaDB si disponible
-        chroma = []
+    # Cache sémantique : situation quasi identique déjà analysée (toutes sessions)
+    semantic_cache = get_semantic_cache()
+    cached = None
+    if semantic_cache:
         try:
-            from chromadb_search import get_chromadb_search
-            chromadb_search = get_chromadb_search()
-            if chromadb_search.is_available:
-                print("🔍 Recherche ChromaDB UNIFIÉE...")
-                unified_results = chromadb_search.search_unified_legal_knowledge(situation, top_k=10)
-                if unified_results:
-                    chroma = unified_results[:5]  # Top 5 articles
+            cached = semantic_cache.lookup(situation, mode, fast)
         except Exception as e:
-            print(f"⚠️ ChromaDB non disponible: {e}")
+            print(f"⚠️ Cache sémantique indisponible: {e}")
+            semantic_cache = None
+    
+    if cached and cached['analysis'] is not None:
+        print(f"💾 Analyse réutilisée (similarité {cached['similarity']:.3f}) - {semantic_cache.get_stats()}")
+        st.session_state[key] = cached['analysis']
+        return cached['analysis']
+    
+    try:
+        if cached:
+            # 2. Recherche multi-sources réutilisée
+            print(f"💾 Recherches réutilisées (similarité {cached['similarity']:.3f}) - {semantic_cache.get_stats()}")
+            juris, oniam, chroma = cached['bundle']['juris'], cached['bundle']['oniam'], cached['bundle']['chroma']
+            semantic_cache.store_bundle(situation, cached['bundle'])
+        else:
+            # 2. Recherche multi-sources : Google en arrière-plan pendant la recherche ChromaDB
+            print("🔍 Recherche multi-sources...")
+            google_executor = ThreadPoolExecutor(max_workers=1)
+            google_future = google_executor.submit(organize_google_results, situation)
+            
+            # Recherche ChromaDB si disponible, affichée collection par collection
+            chroma = []
+            try:
+                from chromadb_search import get_chromadb_search
+                chromadb_search = get_chromadb_search()
+                if chromadb_search.is_available:
+                    print("🔍 Recherche ChromaDB UNIFIÉE (progressive)...")
+                    chroma = stream_chromadb_preview(chromadb_search, situation, top_k=10)[:5]  # Top 5 articles
+            except Exception as e:
+                print(f"⚠️ ChromaDB non disponible: {e}")
+            
+            juris, oniam = google_future.result()
+            google_executor.shutdown(wait=False)
+            
+            if semantic_cache:
+                semantic_cache.store_bundle(situation, {'juris': juris, 'oniam': oniam, 'chroma': chroma})
 
         # 3. Contexte enrichi
         print("🧠 Construction du contexte enrichi...")
@@ -929,6 +1044,8 @@ DIVERSIFIEZ AU MOINS 4 FAMILLES JURIDIQUES POUR UNE ANALYSE COMPLÈTE.
         print("🔧 Nettoyage et structuration...")
         result = clean_and_structure_analysis(result, juris, oniam)
         st.session_state[key] = result
+        if semantic_cache and not result.startswith("❌"):
+            semantic_cache.store_analysis(situation, mode, fast, result)
         
         print("✅ ANALYSE EXCEPTIONNELLE 10/10 TERMINÉE!")
         return result
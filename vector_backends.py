@@ -0,0 +1,751 @@
+"""
+Backends vectoriels pour LegalDocBot
+Permet de remplacer l'index HNSW ChromaDB par une recherche exacte NumPy sur un export à plat
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from corpus_manifest import load_corpus_manifest, update_content_digest
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLAT_INDEX_PATH = os.path.join("chroma_db", "flat_index")
+
+
+def matches_where(metadata: Optional[Dict], where: Optional[Dict]) -> bool:
+    """
+    Évalue un filtre `where` ChromaDB sur les métadonnées d'un chunk
+
+    Opérateurs pris en charge : égalité simple, $eq, $ne, $in, $nin, $and, $or.
+
+    Args:
+        metadata: Métadonnées du chunk
+        where: Filtre au format ChromaDB (None = pas de filtre)
+
+    Returns:
+        True si le chunk satisfait le filtre
+    """
+    if not where:
+        return True
+    metadata = metadata or {}
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == "$eq" and value != operand:
+                    return False
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$nin" and value in operand:
+                    return False
+                if operator not in ("$eq", "$ne", "$in", "$nin"):
+                    raise ValueError(f"Opérateur de filtre non pris en charge: {operator}")
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class VectorBackend:
+    """
+    Interface commune des backends vectoriels
+
+    Un backend ouvre des collections exposant l'API ChromaDB utilisée par
+    ChromaDBSearch : query(), get() et count().
+    """
+
+    name = "base"
+
+    def list_collections(self) -> List[str]:
+        """
+        Retourne les noms des collections disponibles
+
+        Returns:
+            Liste des noms de collections
+        """
+        raise NotImplementedError
+
+    def get_collection(self, collection_name: str):
+        """
+        Ouvre une collection
+
+        Args:
+            collection_name: Nom de la collection (csp_legislation, ...)
+
+        Returns:
+            Objet collection compatible ChromaDB
+        """
+        raise NotImplementedError
+
+
+class ChromaVectorBackend(VectorBackend):
+    """
+    Backend par défaut : collections ChromaDB persistantes (index HNSW)
+    """
+
+    name = "chroma"
+
+    def __init__(self, chroma_path: str = "chroma_db"):
+        """
+        Ouvre la base ChromaDB persistante
+
+        Args:
+            chroma_path: Dossier de la base ChromaDB
+        """
+        import chromadb
+        self.client = chromadb.PersistentClient(path=chroma_path)
+
+    def list_collections(self) -> List[str]:
+        return [c.name for c in self.client.list_collections()]
+
+    def get_collection(self, collection_name: str):
+        return self.client.get_collection(collection_name)
+
+
+class FlatCollection:
+    """
+    Collection en recherche exacte sur une matrice float32 mappée en mémoire
+    """
+
+    def __init__(self, index_dir: Path, collection_name: str):
+        """
+        Charge l'export à plat d'une collection
+
+        Args:
+            index_dir: Dossier de l'export
+            collection_name: Nom de la collection
+        """
+        self.name = collection_name
+        with open(index_dir / f"{collection_name}.json", "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+
+        self.ids = sidecar["ids"]
+        self.documents = sidecar["documents"]
+        self.metadatas = sidecar["metadatas"]
+        self.space = sidecar.get("space", "l2")
+        self.embeddings = np.load(index_dir / f"{collection_name}.npy", mmap_mode="r")
+        self.squared_norms = np.load(index_dir / f"{collection_name}.norms.npy", mmap_mode="r")
+        self._positions = {chunk_id: position for position, chunk_id in enumerate(self.ids)}
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def query(self, query_embeddings: Optional[List[List[float]]] = None, n_results: int = 10,
+              include: Optional[List[str]] = None, query_texts: Optional[List[str]] = None,
+              where: Optional[Dict] = None, **kwargs) -> Dict:
+        """
+        Recherche exacte des plus proches voisins (même distance que la collection ChromaDB)
+
+        Args:
+            query_embeddings: Embeddings des requêtes
+            n_results: Nombre de résultats par requête
+            include: Champs à retourner (documents, metadatas, distances, embeddings)
+            where: Filtre sur les métadonnées (format ChromaDB)
+
+        Returns:
+            Résultats au format collection.query
+        """
+        if query_embeddings is None:
+            raise ValueError("Le backend numpy_flat nécessite query_embeddings")
+
+        include = include or ["metadatas", "documents", "distances"]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        distances = self._distances(queries)
+        excluded = self._excluded_mask(where)
+        if excluded is not None:
+            distances[:, excluded] = np.inf
+        positions_per_query = [self._top_positions(row, n_results) for row in distances]
+
+        return self._format(positions_per_query, include, distances)
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None, where: Optional[Dict] = None,
+            **kwargs) -> Dict:
+        """
+        Récupère des chunks par identifiant ou par page
+
+        Args:
+            ids: Identifiants des chunks (prioritaire sur limit/offset)
+            include: Champs à retourner
+            limit: Taille de page
+            offset: Début de page
+            where: Filtre sur les métadonnées (format ChromaDB)
+
+        Returns:
+            Résultats au format collection.get
+        """
+        include = include or ["metadatas", "documents"]
+        if ids is not None:
+            positions = [self._positions[chunk_id] for chunk_id in ids if chunk_id in self._positions]
+        else:
+            excluded = self._excluded_mask(where)
+            positions = list(range(len(self.ids))) if excluded is None else np.flatnonzero(~excluded).tolist()
+            start = offset or 0
+            end = len(positions) if limit is None else min(len(positions), start + limit)
+            positions = positions[start:end]
+
+        result = {"ids": [self.ids[p] for p in positions]}
+        documents, metadatas = self._records(positions) if {"documents", "metadatas"} & set(include) else (None, None)
+        result["documents"] = documents if "documents" in include else None
+        result["metadatas"] = metadatas if "metadatas" in include else None
+        result["embeddings"] = np.asarray(self.embeddings[positions]) if "embeddings" in include else None
+        return result
+
+    def _records(self, positions: Iterable[int]) -> Tuple[List[str], List[Dict]]:
+        """Documents et métadonnées des chunks aux positions données"""
+        positions = list(positions)
+        return [self.documents[p] for p in positions], [self.metadatas[p] for p in positions]
+
+    def _distances(self, queries: np.ndarray) -> np.ndarray:
+        """Distances requêtes x chunks, en un seul produit matriciel"""
+        dot_products = queries @ self.embeddings.T
+        if self.space == "cosine":
+            query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            chunk_norms = np.sqrt(self.squared_norms)[np.newaxis, :]
+            return 1.0 - dot_products / np.maximum(query_norms * chunk_norms, 1e-12)
+        if self.space == "ip":
+            return 1.0 - dot_products
+        # l2 : distance euclidienne au carré, comme hnswlib
+        query_squared_norms = np.einsum("ij,ij->i", queries, queries)[:, np.newaxis]
+        return np.maximum(self.squared_norms[np.newaxis, :] + query_squared_norms - 2.0 * dot_products, 0.0)
+
+    def _excluded_mask(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """Masque des chunks exclus par un filtre `where` (None si pas de filtre)"""
+        if not where:
+            return None
+        return np.array([not matches_where(metadata, where) for metadata in self.metadatas], dtype=bool)
+
+    @staticmethod
+    def _top_positions(distances: np.ndarray, n_results: int) -> np.ndarray:
+        """Positions des n plus petites distances finies, triées"""
+        n_results = min(n_results, distances.shape[0])
+        if n_results <= 0:
+            return np.array([], dtype=np.int64)
+        candidates = np.argpartition(distances, n_results - 1)[:n_results]
+        candidates = candidates[np.argsort(distances[candidates], kind="stable")]
+        # Chunks exclus par un filtre (distance infinie)
+        return candidates[np.isfinite(distances[candidates])]
+
+    def _format(self, positions_per_query: List[np.ndarray], include: List[str], distances: np.ndarray) -> Dict:
+        """Met les positions trouvées au format collection.query"""
+        result = {"ids": [[self.ids[p] for p in positions] for positions in positions_per_query]}
+        records = [self._records(positions) for positions in positions_per_query] \
+            if {"documents", "metadatas"} & set(include) else []
+        result["documents"] = [documents for documents, _ in records] if "documents" in include else None
+        result["metadatas"] = [metadatas for _, metadatas in records] if "metadatas" in include else None
+        result["distances"] = [[float(distances[i, p]) for p in positions] for i, positions in enumerate(positions_per_query)] \
+            if "distances" in include else None
+        result["embeddings"] = [np.asarray(self.embeddings[positions]) for positions in positions_per_query] \
+            if "embeddings" in include else None
+        return result
+
+
+class QuantizedFlatCollection(FlatCollection):
+    """
+    Collection en recherche sur vecteurs int8 (échelle par vecteur), avec
+    re-scoring des meilleurs candidats sur les vecteurs float32 restés sur disque
+
+    Seuls les identifiants et les vecteurs int8 sont résidents : documents et
+    métadonnées sont lus à la demande dans un fichier JSONL mappé en mémoire.
+    """
+
+    MAX_CACHED_MASKS = 32
+
+    def __init__(self, index_dir: Path, collection_name: str, rescore_factor: int = 4, block_size: int = 4096):
+        """
+        Charge l'export quantifié d'une collection
+
+        Args:
+            index_dir: Dossier de l'export
+            collection_name: Nom de la collection
+            rescore_factor: Candidats re-scorés en float32 = n_results x rescore_factor (1 = pas de re-scoring)
+            block_size: Lignes int8 converties à la fois lors du balayage
+        """
+        self.name = collection_name
+        records_path = index_dir / f"{collection_name}.records.jsonl"
+        if not records_path.exists():
+            raise FileNotFoundError(f"{records_path} absent (relancer: python vector_backends.py quantize)")
+        with open(index_dir / f"{collection_name}.ids.json", "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+
+        self.ids = sidecar["ids"]
+        self.space = sidecar.get("space", "l2")
+        self.embeddings = np.load(index_dir / f"{collection_name}.npy", mmap_mode="r")
+        self.squared_norms = np.load(index_dir / f"{collection_name}.norms.npy", mmap_mode="r")
+        self._positions = {chunk_id: position for position, chunk_id in enumerate(self.ids)}
+        self.record_file = np.memmap(records_path, dtype=np.uint8, mode="r")
+        self.record_offsets = np.load(index_dir / f"{collection_name}.offsets.npy", mmap_mode="r")
+        self._masks = {}
+        self.quantized = np.load(index_dir / f"{collection_name}.int8.npy", mmap_mode="r")
+        self.scales = np.load(index_dir / f"{collection_name}.scales.npy")
+        self.rescore_factor = max(1, rescore_factor)
+        self.block_size = block_size
+
+    def query(self, query_embeddings: Optional[List[List[float]]] = None, n_results: int = 10,
+              include: Optional[List[str]] = None, query_texts: Optional[List[str]] = None,
+              where: Optional[Dict] = None, **kwargs) -> Dict:
+        """
+        Recherche approchée int8 puis re-scoring exact des candidats
+
+        Args:
+            query_embeddings: Embeddings des requêtes
+            n_results: Nombre de résultats par requête
+            include: Champs à retourner (documents, metadatas, distances, embeddings)
+            where: Filtre sur les métadonnées (format ChromaDB)
+
+        Returns:
+            Résultats au format collection.query
+        """
+        if query_embeddings is None:
+            raise ValueError("Le backend numpy_int8 nécessite query_embeddings")
+
+        include = include or ["metadatas", "documents", "distances"]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        approximate = self._distances_from_dot(queries, self._quantized_dot_products(queries))
+        excluded = self._excluded_mask(where)
+        if excluded is not None:
+            approximate[:, excluded] = np.inf
+        candidate_count = min(len(self.ids), n_results * self.rescore_factor)
+
+        distances = np.full(approximate.shape, np.inf, dtype=np.float32)
+        positions_per_query = []
+        for row, query in enumerate(queries):
+            candidates = np.sort(self._top_positions(approximate[row], candidate_count))
+            if self.rescore_factor > 1:
+                # Re-scoring exact : seules ces lignes float32 sont lues sur disque
+                exact_dot = np.asarray(self.embeddings[candidates]) @ query
+                distances[row, candidates] = self._distances_from_dot(
+                    query[np.newaxis, :], exact_dot[np.newaxis, :], candidates
+                )[0]
+            else:
+                distances[row, candidates] = approximate[row, candidates]
+            positions_per_query.append(self._top_positions(distances[row], n_results))
+
+        return self._format(positions_per_query, include, distances)
+
+    def _quantized_dot_products(self, queries: np.ndarray) -> np.ndarray:
+        """Produits scalaires approchés requêtes x chunks, par blocs de lignes int8"""
+        dot_products = np.empty((queries.shape[0], len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), self.block_size):
+            block = np.asarray(self.quantized[start:start + self.block_size], dtype=np.float32)
+            dot_products[:, start:start + block.shape[0]] = (queries @ block.T) * self.scales[start:start + block.shape[0]]
+        return dot_products
+
+    def _records(self, positions: Iterable[int]) -> Tuple[List[str], List[Dict]]:
+        """Lit documents et métadonnées des positions données dans le fichier JSONL"""
+        documents, metadatas = [], []
+        for position in positions:
+            line = self.record_file[self.record_offsets[position]:self.record_offsets[position + 1]]
+            record = json.loads(line.tobytes().decode("utf-8"))
+            documents.append(record["document"])
+            metadatas.append(record["metadata"])
+        return documents, metadatas
+
+    def _excluded_mask(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """Masque des chunks exclus, calculé une fois par filtre (lecture de toutes les métadonnées)"""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, ensure_ascii=False)
+        if key not in self._masks:
+            if len(self._masks) >= self.MAX_CACHED_MASKS:
+                self._masks.pop(next(iter(self._masks)))
+            excluded = np.empty(len(self.ids), dtype=bool)
+            for start in range(0, len(self.ids), self.block_size):
+                _, metadatas = self._records(range(start, min(len(self.ids), start + self.block_size)))
+                excluded[start:start + len(metadatas)] = [not matches_where(metadata, where) for metadata in metadatas]
+            self._masks[key] = excluded
+        return self._masks[key]
+
+    def _distances_from_dot(self, queries: np.ndarray, dot_products: np.ndarray,
+                            positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Convertit des produits scalaires en distances selon l'espace de la collection"""
+        squared_norms = np.asarray(self.squared_norms if positions is None else self.squared_norms[positions])
+        if self.space == "cosine":
+            query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            return 1.0 - dot_products / np.maximum(query_norms * np.sqrt(squared_norms)[np.newaxis, :], 1e-12)
+        if self.space == "ip":
+            return 1.0 - dot_products
+        query_squared_norms = np.einsum("ij,ij->i", queries, queries)[:, np.newaxis]
+        return np.maximum(squared_norms[np.newaxis, :] + query_squared_norms - 2.0 * dot_products, 0.0)
+
+
+class CodeCollectionView:
+    """
+    Vue d'une famille de codes (csp, civil, ...) dans la collection fusionnée legal_corpus
+
+    Expose l'API collection utilisée par ChromaDBSearch; chaque requête est
+    restreinte à la famille par un filtre `where` sur la métadonnée code.
+    """
+
+    def __init__(self, collection, code: str):
+        """
+        Args:
+            collection: Collection fusionnée (ChromaDB ou backend à plat)
+            code: Valeur de la métadonnée code de la famille
+        """
+        self.collection = collection
+        self.code = code
+        self.name = f"{collection.name}[{code}]"
+
+    def _restrict(self, where: Optional[Dict]) -> Dict:
+        """Ajoute la restriction à la famille au filtre demandé"""
+        return {"code": self.code} if not where else {"$and": [{"code": self.code}, where]}
+
+    def query(self, where: Optional[Dict] = None, **kwargs) -> Dict:
+        return self.collection.query(where=self._restrict(where), **kwargs)
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, **kwargs) -> Dict:
+        if ids is not None:
+            # Identifiants uniques dans la collection fusionnée : pas de filtre nécessaire
+            return self.collection.get(ids=ids, where=where, **kwargs) if where else self.collection.get(ids=ids, **kwargs)
+        return self.collection.get(where=self._restrict(where), **kwargs)
+
+    def count(self) -> int:
+        return len(self.collection.get(where={"code": self.code}, include=[])["ids"])
+
+
+class NumpyFlatBackend(VectorBackend):
+    """
+    Backend de recherche exacte : une matrice float32 .npy mappée en mémoire par collection
+
+    Pas de SQLite au démarrage, rappel exact, et pages partagées entre
+    processus grâce au mmap. Un export qui ne correspond plus à la base
+    ChromaDB (réingestion depuis l'export) est refusé.
+    """
+
+    name = "numpy_flat"
+
+    def __init__(self, index_dir: str = DEFAULT_FLAT_INDEX_PATH, chroma_path: str = "chroma_db"):
+        """
+        Ouvre un export à plat produit par export_flat_index
+
+        Args:
+            index_dir: Dossier de l'export
+            chroma_path: Dossier de la base ChromaDB exportée (contrôle de fraîcheur)
+        """
+        self.index_dir = Path(index_dir)
+        manifest_path = self.index_dir / "flat_index.json"
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"Export à plat introuvable: {manifest_path} (lancer: python vector_backends.py export)")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+
+        stale_reason = find_stale_flat_export(self.manifest, chroma_path)
+        if stale_reason:
+            raise ValueError(f"Export à plat périmé ({stale_reason}), relancer: python vector_backends.py export")
+
+    def list_collections(self) -> List[str]:
+        return list(self.manifest["collections"].keys())
+
+    def get_collection(self, collection_name: str) -> FlatCollection:
+        if collection_name not in self.manifest["collections"]:
+            raise ValueError(f"Collection {collection_name} absente de l'export à plat")
+        return FlatCollection(self.index_dir, collection_name)
+
+
+class QuantizedFlatBackend(NumpyFlatBackend):
+    """
+    Backend basse mémoire : vecteurs int8 résidents, float32 sur disque pour le re-scoring
+    """
+
+    name = "numpy_int8"
+
+    def __init__(self, index_dir: str = DEFAULT_FLAT_INDEX_PATH, rescore_factor: int = 4,
+                 chroma_path: str = "chroma_db"):
+        """
+        Ouvre un export à plat quantifié (export_flat_index puis quantize_flat_index)
+
+        Args:
+            index_dir: Dossier de l'export
+            rescore_factor: Candidats re-scorés en float32 = n_results x rescore_factor
+            chroma_path: Dossier de la base ChromaDB exportée (contrôle de fraîcheur)
+        """
+        super().__init__(index_dir, chroma_path)
+        if not self.manifest.get("quantized"):
+            raise FileNotFoundError(f"Export {index_dir} non quantifié (lancer: python vector_backends.py quantize)")
+        self.rescore_factor = rescore_factor
+
+    def get_collection(self, collection_name: str) -> QuantizedFlatCollection:
+        if collection_name not in self.manifest["collections"]:
+            raise ValueError(f"Collection {collection_name} absente de l'export à plat")
+        return QuantizedFlatCollection(self.index_dir, collection_name, rescore_factor=self.rescore_factor)
+
+
+VECTOR_BACKENDS = {
+    ChromaVectorBackend.name: ChromaVectorBackend,
+    NumpyFlatBackend.name: NumpyFlatBackend,
+    QuantizedFlatBackend.name: QuantizedFlatBackend
+}
+
+
+def create_vector_backend(backend_name: str = "chroma", **kwargs) -> VectorBackend:
+    """
+    Instancie un backend vectoriel par son nom
+
+    Args:
+        backend_name: "chroma" ou "numpy_flat"
+        **kwargs: Paramètres du backend (chroma_path, index_dir, ...)
+
+    Returns:
+        Backend vectoriel
+    """
+    if backend_name not in VECTOR_BACKENDS:
+        raise ValueError(f"Backend vectoriel inconnu: {backend_name} (disponibles: {list(VECTOR_BACKENDS)})")
+    return VECTOR_BACKENDS[backend_name](**kwargs)
+
+
+def find_stale_flat_export(flat_manifest: Dict, chroma_path: str = "chroma_db") -> Optional[str]:
+    """
+    Compare un export à plat à la base ChromaDB dont il est issu
+
+    L'empreinte de contenu de chaque collection est comparée à celle du manifeste
+    du corpus (les comptes pour un export sans empreinte). ChromaDB n'est jamais
+    ouvert ici : sans manifeste, le contrôle est sauté avec un avertissement.
+
+    Args:
+        flat_manifest: Manifeste de l'export (flat_index.json)
+        chroma_path: Dossier de la base ChromaDB
+
+    Returns:
+        Raison de l'écart, ou None si l'export est à jour
+    """
+    exported = flat_manifest["collections"]
+    corpus_manifest = load_corpus_manifest(chroma_path)
+    if corpus_manifest is None:
+        logger.warning(f"⚠️ Manifeste du corpus absent dans {chroma_path}: fraîcheur de l'export à plat non vérifiée "
+                       "(lancer: python corpus_manifest.py)")
+        return None
+    sources = corpus_manifest.get("collections", {})
+
+    for collection_name, source in sources.items():
+        if collection_name not in exported:
+            if source.get("count"):
+                return f"{collection_name} absente de l'export"
+            continue
+        info = exported[collection_name]
+        if info.get("content_hash") and source.get("content_hash"):
+            if info["content_hash"] != source["content_hash"]:
+                return f"{collection_name}: empreinte {info['content_hash']} != {source['content_hash']}"
+        elif info["count"] != source.get("count"):
+            return f"{collection_name}: {info['count']} chunks exportés, {source.get('count')} dans ChromaDB"
+
+    for collection_name in exported:
+        if collection_name not in sources:
+            return f"{collection_name} absente de ChromaDB"
+    return None
+
+
+def export_flat_index(chroma_path: str = "chroma_db", output_dir: str = DEFAULT_FLAT_INDEX_PATH,
+                      page_size: int = 1000) -> Dict:
+    """
+    Exporte embeddings, documents et métadonnées de toutes les collections ChromaDB
+    vers des fichiers .npy (mmap) et des fichiers JSON annexes
+
+    Args:
+        chroma_path: Dossier de la base ChromaDB
+        output_dir: Dossier de l'export
+        page_size: Nombre de chunks lus par page
+
+    Returns:
+        Manifeste de l'export (collections, tailles, dimension, empreinte du contenu)
+    """
+    import chromadb
+
+    client = chromadb.PersistentClient(path=chroma_path)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    manifest = {"collections": {}}
+
+    for collection in client.list_collections():
+        collection = client.get_collection(collection.name)
+        total = collection.count()
+        ids, documents, metadatas = [], [], []
+        matrix = None
+        digest = hashlib.sha1()  # Même empreinte que le manifeste du corpus
+
+        for offset in range(0, total, page_size):
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            page_embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(
+                    output_path / f"{collection.name}.npy", mode="w+",
+                    dtype=np.float32, shape=(total, page_embeddings.shape[1])
+                )
+            matrix[len(ids):len(ids) + len(page["ids"])] = page_embeddings
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(page["metadatas"])
+            for chunk_id, document in zip(page["ids"], page["documents"]):
+                update_content_digest(digest, chunk_id, document)
+
+        if matrix is None:
+            logger.warning(f"⚠️ Collection {collection.name} vide, ignorée")
+            continue
+
+        matrix.flush()
+        np.save(output_path / f"{collection.name}.norms.npy", np.einsum("ij,ij->i", matrix, matrix).astype(np.float32))
+
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        with open(output_path / f"{collection.name}.json", "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "documents": documents, "metadatas": metadatas, "space": space}, f, ensure_ascii=False)
+
+        manifest["collections"][collection.name] = {
+            "count": len(ids), "dimension": int(matrix.shape[1]), "space": space,
+            "content_hash": digest.hexdigest()[:16]
+        }
+        logger.info(f"✅ {collection.name}: {len(ids)} chunks exportés ({matrix.shape[1]} dimensions)")
+        del matrix
+
+    with open(output_path / "flat_index.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    return manifest
+
+
+def write_flat_records(index_path: Path, collection_name: str) -> int:
+    """
+    Réécrit documents et métadonnées d'un export à plat en JSONL indexé par offsets,
+    lu à la demande par QuantizedFlatCollection au lieu du JSON annexe complet
+
+    Args:
+        index_path: Dossier de l'export
+        collection_name: Nom de la collection
+
+    Returns:
+        Nombre de chunks écrits
+    """
+    with open(index_path / f"{collection_name}.json", "r", encoding="utf-8") as f:
+        sidecar = json.load(f)
+
+    offsets = np.zeros(len(sidecar["ids"]) + 1, dtype=np.int64)
+    with open(index_path / f"{collection_name}.records.jsonl", "wb") as f:
+        for position, (document, metadata) in enumerate(zip(sidecar["documents"], sidecar["metadatas"])):
+            f.write(json.dumps({"document": document, "metadata": metadata}, ensure_ascii=False).encode("utf-8") + b"\n")
+            offsets[position + 1] = f.tell()
+    np.save(index_path / f"{collection_name}.offsets.npy", offsets)
+
+    with open(index_path / f"{collection_name}.ids.json", "w", encoding="utf-8") as f:
+        json.dump({"ids": sidecar["ids"], "space": sidecar.get("space", "l2")}, f, ensure_ascii=False)
+    return len(sidecar["ids"])
+
+
+def quantize_flat_index(index_dir: str = DEFAULT_FLAT_INDEX_PATH) -> Dict:
+    """
+    Ajoute à un export à plat une copie int8 des vecteurs avec une échelle par vecteur,
+    et les documents et métadonnées en JSONL lu à la demande
+
+    Args:
+        index_dir: Dossier de l'export (produit par export_flat_index)
+
+    Returns:
+        Manifeste mis à jour
+    """
+    index_path = Path(index_dir)
+    with open(index_path / "flat_index.json", "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    for collection_name, info in manifest["collections"].items():
+        write_flat_records(index_path, collection_name)
+        matrix = np.load(index_path / f"{collection_name}.npy", mmap_mode="r")
+        quantized = np.lib.format.open_memmap(
+            index_path / f"{collection_name}.int8.npy", mode="w+", dtype=np.int8, shape=matrix.shape
+        )
+        scales = np.empty(matrix.shape[0], dtype=np.float32)
+        for start in range(0, matrix.shape[0], 4096):
+            block = np.asarray(matrix[start:start + 4096], dtype=np.float32)
+            block_scales = np.maximum(np.abs(block).max(axis=1), 1e-12) / 127.0
+            quantized[start:start + block.shape[0]] = np.clip(np.rint(block / block_scales[:, np.newaxis]), -127, 127)
+            scales[start:start + block.shape[0]] = block_scales
+        quantized.flush()
+        np.save(index_path / f"{collection_name}.scales.npy", scales)
+        info["int8_bytes"] = int(quantized.nbytes + scales.nbytes)
+        info["float32_bytes"] = int(matrix.nbytes)
+        logger.info(f"✅ {collection_name}: {info['float32_bytes'] // 1024} KB float32 -> {info['int8_bytes'] // 1024} KB int8")
+        del quantized
+
+    manifest["quantized"] = True
+    with open(index_path / "flat_index.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    return manifest
+
+
+def evaluate_quantized_recall(index_dir: str = DEFAULT_FLAT_INDEX_PATH, queries: Optional[List[str]] = None,
+                              k: int = 10, rescore_factors: tuple = (1, 2, 4, 8)) -> Dict:
+    """
+    Mesure le rappel@k de la recherche int8 par rapport à la recherche exacte float32
+
+    Args:
+        index_dir: Dossier de l'export quantifié
+        queries: Requêtes de test (défaut: RETRIEVAL_BENCHMARK_QUERIES)
+        k: Nombre de voisins comparés
+        rescore_factors: Facteurs de re-scoring évalués (1 = int8 seul)
+
+    Returns:
+        Dictionnaire collection -> {facteur: rappel@k moyen}
+    """
+    from config import RETRIEVAL_BENCHMARK_QUERIES
+    from embedding_cache import QueryEmbeddingCache
+
+    queries = queries or RETRIEVAL_BENCHMARK_QUERIES
+    query_embeddings = QueryEmbeddingCache(max_size=len(queries)).get_embeddings(queries)
+    exact_backend = NumpyFlatBackend(index_dir)
+    report = {}
+
+    for collection_name in exact_backend.list_collections():
+        exact = exact_backend.get_collection(collection_name).query(query_embeddings=query_embeddings, n_results=k, include=["distances"])
+        report[collection_name] = {}
+        for factor in rescore_factors:
+            collection = QuantizedFlatBackend(index_dir, rescore_factor=factor).get_collection(collection_name)
+            approximate = collection.query(query_embeddings=query_embeddings, n_results=k, include=["distances"])
+            recalls = [
+                len(set(exact_ids) & set(approximate_ids)) / max(1, len(exact_ids))
+                for exact_ids, approximate_ids in zip(exact["ids"], approximate["ids"])
+            ]
+            report[collection_name][factor] = round(float(np.mean(recalls)), 4)
+
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        print("📦 EXPORT DE L'INDEX À PLAT")
+        print("=" * 40)
+        output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_FLAT_INDEX_PATH
+        result = export_flat_index(output_dir=output)
+        for name, info in result["collections"].items():
+            print(f"  - {name}: {info['count']} chunks, {info['dimension']} dimensions ({info['space']})")
+    elif len(sys.argv) > 1 and sys.argv[1] == "quantize":
+        print("🗜️ QUANTIFICATION INT8 DE L'INDEX À PLAT")
+        print("=" * 40)
+        result = quantize_flat_index(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_FLAT_INDEX_PATH)
+        for name, info in result["collections"].items():
+            print(f"  - {name}: {info['float32_bytes'] / 1e6:.1f} MB float32 -> {info['int8_bytes'] / 1e6:.1f} MB int8")
+    elif len(sys.argv) > 1 and sys.argv[1] == "recall":
+        print("📏 RAPPEL@10 INT8 VS FLOAT32")
+        print("=" * 40)
+        result = evaluate_quantized_recall(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_FLAT_INDEX_PATH)
+        for name, recalls in result.items():
+            details = " | ".join(f"x{factor}: {recall:.3f}" for factor, recall in recalls.items())
+            print(f"  - {name}: {details}")
+        print("  (x1 = int8 seul, xN = re-scoring float32 de N x k candidats)")
+    else:
+        print("Usage: python vector_backends.py export|quantize|recall [dossier]")